@@ -1,4 +1,10 @@
 from .extrude import extrude
+from .extrude_array import (
+    extrude_array,
+    extrude_normal_array,
+    extrude_scale_array,
+    extrude_scale_from_centre_array,
+)
 from .extrude_normal import extrude_normal
 from .extrude_scale import extrude_scale, extrude_scale_from_centre
 from .fluxsurface import (
@@ -8,9 +14,15 @@ from .fluxsurface import (
 )
 from .fourier_decomp import (
     create_boundary_from_fourier_1d,
+    create_boundary_from_fourier_1d_array,
     create_boundary_from_fourier_2d,
+    create_boundary_from_fourier_2d_array,
     decomp_fourier_1d,
+    decomp_fourier_1d_array,
     decomp_fourier_2d,
+    decomp_fourier_2d_array,
+    fourier_spectrum_2d,
+    smooth_fourier_2d_array,
 )
 from .geqdsk import (
     get_normalised_psi_for_boundary,
@@ -27,10 +39,20 @@ __all__ = [
     "extrude_normal",
     "extrude_scale",
     "extrude_scale_from_centre",
+    "extrude_array",
+    "extrude_normal_array",
+    "extrude_scale_array",
+    "extrude_scale_from_centre_array",
     "decomp_fourier_1d",
     "decomp_fourier_2d",
     "create_boundary_from_fourier_1d",
     "create_boundary_from_fourier_2d",
+    "decomp_fourier_1d_array",
+    "decomp_fourier_2d_array",
+    "create_boundary_from_fourier_1d_array",
+    "create_boundary_from_fourier_2d_array",
+    "fourier_spectrum_2d",
+    "smooth_fourier_2d_array",
     "create_miller_boundary",
     "find_flux_surface",
     "get_psi_for_boundary",
@@ -0,0 +1,145 @@
+"""
+Array-backed extrusion of boundaries, extruding an (N, 2) array of points by any number
+of distances at once and returning a (D, N, 2) stack of extruded boundaries, one per
+distance.
+
+Each method gives the same boundaries as its list-of-tuples equivalent.
+"""
+
+from typing import Callable, List, Tuple, Union
+
+from numpy import (
+    array_equal,
+    asarray,
+    atleast_1d,
+    concatenate,
+    empty,
+    hypot,
+    minimum,
+    ndarray,
+    roll,
+    stack,
+    where,
+)
+
+Points = Union[ndarray, List[Tuple[float, float]]]
+Distances = Union[float, ndarray, List[float]]
+
+
+def _as_points(points: Points) -> ndarray:
+    return asarray(points, dtype=float).reshape(-1, 2)
+
+
+def _as_distances(distances: Distances) -> ndarray:
+    return atleast_1d(asarray(distances, dtype=float))
+
+
+def extrude_normal_array(points: Points, distances: Distances) -> ndarray:
+    """
+    Array form of extrude_normal. As there, if the boundary is closed (its last point
+    repeating its first) the repeated point is dropped.
+    """
+
+    points = _as_points(points)
+    distances = _as_distances(distances)
+
+    if len(points) > 0 and array_equal(points[-1], points[0]):
+        points = points[:-1]
+
+    prior_vec = roll(points, 1, axis=0) - points
+    next_vec = points - roll(points, -1, axis=0)
+
+    prior_grad = prior_vec / hypot(prior_vec[:, 0], prior_vec[:, 1])[:, None]
+    next_grad = next_vec / hypot(next_vec[:, 0], next_vec[:, 1])[:, None]
+
+    grad = (prior_grad + next_grad) / 2.0
+    grad /= hypot(grad[:, 0], grad[:, 1])[:, None]
+
+    normal = concatenate([-grad[:, 1:2], grad[:, 0:1]], axis=1)
+
+    return points[None, :, :] + distances[:, None, None] * normal[None, :, :]
+
+
+def extrude_scale_from_centre_array(
+    points: Points,
+    distances: Distances,
+    centre: Tuple[float, float],
+    scale_pow: float = 1.0,
+) -> ndarray:
+    """
+    Array form of extrude_scale_from_centre.
+    """
+
+    points = _as_points(points)
+    distances = _as_distances(distances)
+
+    origin_vec = points - asarray(centre, dtype=float)
+
+    scaled = origin_vec[None, :, :] * distances[:, None, None]
+
+    return points[None, :, :] + where(scaled >= 0.0, 1.0, -1.0) * (
+        abs(scaled) ** scale_pow
+    )
+
+
+def extrude_scale_array(
+    points: Points,
+    distances: Distances,
+    weighted_centre: bool = True,
+    scale_pow: float = 1.0,
+) -> ndarray:
+    """
+    Array form of extrude_scale.
+    """
+
+    points = _as_points(points)
+
+    if weighted_centre:
+        centre = points.mean(axis=0)
+    else:
+        # As in extrude_scale, a point only counts towards the maximum in each
+        # direction if it did not lower the running minimum in that direction.
+        running_min = minimum.accumulate(concatenate([[[9999.0, 9999.0]], points]))
+        lowers_min = points < running_min[:-1]
+
+        extent_min = running_min[-1]
+        extent_max = [
+            max([0.0, *points[~lowers_min[:, axis], axis].tolist()])
+            for axis in range(2)
+        ]
+
+        centre = (extent_min + asarray(extent_max)) / 2.0
+
+    return extrude_scale_from_centre_array(points, distances, centre, scale_pow)
+
+
+def extrude_array(
+    extrude_method: Union[str, Callable],
+    points: Points,
+    distances: Distances,
+    *args,
+    **kwargs
+) -> ndarray:
+    """
+    Array form of extrude, extruding the points by each of the distances given and
+    returning a (D, N, 2) stack of extruded boundaries. A callable extrusion method is
+    called once per distance with the points and that distance.
+    """
+
+    if type(extrude_method) is str:
+        if extrude_method == "scale":
+            return extrude_scale_array(points, distances, *args, **kwargs)
+        elif extrude_method == "normal":
+            return extrude_normal_array(points, distances, *args, **kwargs)
+        else:
+            print("Invalid extrusion method:", extrude_method)
+            return empty((0, 0, 2))
+    elif callable(extrude_method):
+        return stack(
+            [
+                _as_points(extrude_method(points, distance, *args, **kwargs))
+                for distance in _as_distances(distances).tolist()
+            ]
+        )
+
+    return empty((0, 0, 2))
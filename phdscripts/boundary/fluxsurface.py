@@ -13,7 +13,7 @@ from phdscripts.input.reader import (
     read_jorek_RZpsi_profile,
 )
 
-from .fourier_decomp import create_boundary_from_fourier_2d, decomp_fourier_2d
+from .fourier_decomp import smooth_fourier_2d_array
 
 REAL_PATTERN = r"-?[0-9]+.[0-9]+E[+-][0-9][0-9]"
 FLUXSURFACE_RESULTS_PATTERN = r"(" + REAL_PATTERN + r")\s+(" + REAL_PATTERN + r")"
@@ -248,26 +248,9 @@ def __smooth_points_fourier(
     Smooths out a list of points using a Fourier decomposition truncation approach.
     """
 
-    curr_modes = start_modes
-    decomp_result = decomp_fourier_2d(points, start_modes)
-
-    def __decomp_result_bad() -> bool:
-        return (
-            decomp_result[curr_modes[0]][0] > threshold
-            or decomp_result[curr_modes[0]][1] > threshold
-            or decomp_result[curr_modes[0]][2] > threshold
-            or decomp_result[curr_modes[0]][3] > threshold
-            or decomp_result[curr_modes[1]][0] > threshold
-            or decomp_result[curr_modes[1]][1] > threshold
-            or decomp_result[curr_modes[1]][2] > threshold
-            or decomp_result[curr_modes[1]][3] > threshold
-        )
-
-    while __decomp_result_bad():
-        curr_modes = (curr_modes[0] - 1, curr_modes[1] + 1)
-        decomp_result = decomp_fourier_2d(points, curr_modes)
+    smoothed_points, _ = smooth_fourier_2d_array(points, threshold, start_modes)
 
-    return create_boundary_from_fourier_2d(decomp_result, len(points))
+    return [tuple(point) for point in smoothed_points.tolist()]
 
 
 def __adjust_boundary_RZ_to_match_flux_surface(
@@ -1,5 +1,194 @@
-import math
-from typing import Dict, List, Tuple
+"""
+Fourier decomposition of boundaries, and reconstruction of boundaries from Fourier
+coefficients.
+
+The *_array functions operate on NumPy arrays, computing all modes at once with an FFT,
+while the remaining functions are adapters keeping the dictionary-of-tuples form.
+
+For mode m of a boundary of N points x_k, the cosine and sine coefficients are
+    ( 1/N sum_k x_k cos(2 pi k m / N), 1/N sum_k x_k sin(2 pi k m / N) ),
+i.e. the real part and negated imaginary part of the m-th term of the (normalised) DFT
+of the boundary. The DFT is periodic in m with period N, so any mode range can be
+obtained from a single FFT.
+"""
+
+from typing import Dict, List, Optional, Tuple, Union
+
+from numpy import (
+    arange,
+    asarray,
+    concatenate,
+    cos,
+    flatnonzero,
+    hypot,
+    ndarray,
+    outer,
+    pi,
+    sin,
+)
+from numpy.fft import fft
+
+
+def _mode_numbers(modes: Union[Tuple[int, int], ndarray, List[int]]) -> ndarray:
+    """
+    Obtains the mode numbers given either an inclusive (lowest, highest) range of modes
+    or the mode numbers themselves.
+    """
+
+    if isinstance(modes, tuple):
+        return arange(modes[0], modes[1] + 1)
+
+    return asarray(modes, dtype=int)
+
+
+def _cos_sin_coefficients(values: ndarray, modes: ndarray) -> ndarray:
+    """
+    Computes the cosine and sine coefficients of the given modes for each column of
+    values, returning an array of shape (M, 2 * columns) ordered as
+        ( column 0 cos-mode, column 0 sin-mode, column 1 cos-mode, ... ).
+    """
+
+    N = values.shape[0]
+
+    spectrum = fft(values, axis=0)[modes % N] / N
+
+    coefficients = concatenate(
+        [spectrum.real[:, :, None], -spectrum.imag[:, :, None]], axis=2
+    )
+
+    return coefficients.reshape(len(modes), -1)
+
+
+def decomp_fourier_1d_array(
+    geo: Tuple[float, float],
+    points: Union[ndarray, List[Tuple[float, float]]],
+    modes: Union[Tuple[int, int], ndarray, List[int]],
+) -> ndarray:
+    """
+    Array form of decomp_fourier_1d, taking an (N, 2) array of points and returning an
+    (M, 2) array of coefficients, one row per mode in order of the modes given.
+    """
+
+    points = asarray(points, dtype=float)
+
+    R = hypot(points[:, 0] - geo[0], points[:, 1] - geo[1])
+
+    return _cos_sin_coefficients(R[:, None], _mode_numbers(modes))
+
+
+def decomp_fourier_2d_array(
+    points: Union[ndarray, List[Tuple[float, float]]],
+    modes: Union[Tuple[int, int], ndarray, List[int]],
+) -> ndarray:
+    """
+    Array form of decomp_fourier_2d, taking an (N, 2) array of points and returning an
+    (M, 4) array of coefficients, one row per mode in order of the modes given.
+    """
+
+    points = asarray(points, dtype=float)
+
+    return _cos_sin_coefficients(points, _mode_numbers(modes))
+
+
+def create_boundary_from_fourier_1d_array(
+    coefficients: ndarray, modes: Union[Tuple[int, int], ndarray, List[int]], N: int
+) -> ndarray:
+    """
+    Array form of create_boundary_from_fourier_1d, taking an (M, 2) array of
+    coefficients for the given modes and returning an (N + 1, 2) array of points.
+    """
+
+    coefficients = asarray(coefficients, dtype=float).reshape(-1, 2)
+
+    theta = 2 * pi * arange(N + 1) / float(N)
+    args = outer(theta, _mode_numbers(modes))
+
+    R = cos(args) @ coefficients[:, 0] + sin(args) @ coefficients[:, 1]
+
+    return concatenate([(R * cos(theta))[:, None], (R * sin(theta))[:, None]], axis=1)
+
+
+def create_boundary_from_fourier_2d_array(
+    coefficients: ndarray, modes: Union[Tuple[int, int], ndarray, List[int]], N: int
+) -> ndarray:
+    """
+    Array form of create_boundary_from_fourier_2d, taking an (M, 4) array of
+    coefficients for the given modes and returning an (N + 1, 2) array of points.
+    """
+
+    coefficients = asarray(coefficients, dtype=float).reshape(-1, 4)
+
+    theta = 2 * pi * arange(N + 1) / float(N)
+    args = outer(theta, _mode_numbers(modes))
+
+    cos_args = cos(args)
+    sin_args = sin(args)
+
+    x = cos_args @ coefficients[:, 0] + sin_args @ coefficients[:, 1]
+    y = cos_args @ coefficients[:, 2] + sin_args @ coefficients[:, 3]
+
+    return concatenate([x[:, None], y[:, None]], axis=1)
+
+
+def fourier_spectrum_2d(points: Union[ndarray, List[Tuple[float, float]]]) -> ndarray:
+    """
+    Computes the coefficients of every distinct mode of a boundary, returning an (N, 4)
+    array whose row m holds the coefficients of mode m (and of every mode m + jN, which
+    alias it), in the order of decomp_fourier_2d.
+    """
+
+    points = asarray(points, dtype=float)
+
+    return _cos_sin_coefficients(points, arange(points.shape[0]))
+
+
+def smooth_fourier_2d_array(
+    points: Union[ndarray, List[Tuple[float, float]]],
+    threshold: float = 0.002,
+    start_modes: Tuple[int, int] = (-20, 20),
+    modes: Optional[Tuple[int, int]] = None,
+) -> Tuple[ndarray, Tuple[int, int]]:
+    """
+    Smooths a boundary by truncating its Fourier decomposition, returning the (N + 1, 2)
+    array of smoothed points and the mode range kept.
+
+    Starting from start_modes, the mode range is widened by one mode on each side until
+    no coefficient of either of its outermost modes exceeds the threshold. The spectrum
+    is computed once and the widening searched over all at once, rather than the
+    decomposition being redone for each candidate range. As modes alias every N modes,
+    the search ends after N widenings.
+
+    If modes is given, the search is skipped and that range kept, e.g. to reuse the
+    range found for a previous, similar, boundary.
+    """
+
+    spectrum = fourier_spectrum_2d(points)
+
+    N = spectrum.shape[0]
+
+    if modes is None:
+        widenings = arange(N + 1)
+
+        lowest_modes = (start_modes[0] - widenings) % N
+        highest_modes = (start_modes[1] + widenings) % N
+
+        bad = (spectrum[lowest_modes] > threshold).any(axis=1) | (
+            spectrum[highest_modes] > threshold
+        ).any(axis=1)
+
+        good = flatnonzero(~bad)
+        widening = int(good[0]) if len(good) > 0 else N
+
+        modes = (start_modes[0] - widening, start_modes[1] + widening)
+
+    mode_numbers = _mode_numbers(modes)
+
+    return (
+        create_boundary_from_fourier_2d_array(
+            spectrum[mode_numbers % N], mode_numbers, N
+        ),
+        modes,
+    )
 
 
 def decomp_fourier_1d(
@@ -13,30 +202,12 @@ def decomp_fourier_1d(
         ( a cos-mode, a sin-mode ).
     """
 
-    coefficients: Dict[int, Tuple[float, float]] = {}
-
-    N = float(len(points))
-    freq = 1.0 / N
-
-    for mode in range(modes[0], modes[1] + 1):
-        coefficients[mode] = (0.0, 0.0)
-        for idx in range(len(points)):
-            arg = 2 * math.pi * freq * float(idx) * float(mode)
+    coefficients = decomp_fourier_1d_array(geo, points, modes)
 
-            R = math.sqrt(
-                math.pow(points[idx][0] - geo[0], 2.0)
-                + math.pow(points[idx][1] - geo[1], 2.0)
-            )
-
-            coefficients[mode] = (
-                coefficients[mode][0] + R * math.cos(arg),
-                coefficients[mode][1] + R * math.sin(arg),
-            )
-
-    for mode, coeffs in coefficients.items():
-        coefficients[mode] = (coeffs[0] / N, coeffs[1] / N)
-
-    return coefficients
+    return {
+        mode: tuple(coeffs)
+        for mode, coeffs in zip(range(modes[0], modes[1] + 1), coefficients.tolist())
+    }
 
 
 def decomp_fourier_2d(
@@ -50,70 +221,29 @@ def decomp_fourier_2d(
         ( R cos-mode, R sin-mode, Z cos-mode, Z sin-mode ).
     """
 
-    coefficients: Dict[int, Tuple[float, float, float, float]] = {}
-
-    N = float(len(points))
-    freq = 1.0 / N
-
-    for mode in range(modes[0], modes[1] + 1):
-        coefficients[mode] = (0.0, 0.0, 0.0, 0.0)
-        for idx in range(len(points)):
-            arg = 2 * math.pi * freq * float(idx) * float(mode)
+    coefficients = decomp_fourier_2d_array(points, modes)
 
-            coefficients[mode] = (
-                coefficients[mode][0] + points[idx][0] * math.cos(arg),
-                coefficients[mode][1] + points[idx][0] * math.sin(arg),
-                coefficients[mode][2] + points[idx][1] * math.cos(arg),
-                coefficients[mode][3] + points[idx][1] * math.sin(arg),
-            )
-
-    for mode, coeffs in coefficients.items():
-        coefficients[mode] = (
-            coeffs[0] / N,
-            coeffs[1] / N,
-            coeffs[2] / N,
-            coeffs[3] / N,
-        )
-
-    return coefficients
+    return {
+        mode: tuple(coeffs)
+        for mode, coeffs in zip(range(modes[0], modes[1] + 1), coefficients.tolist())
+    }
 
 
 def create_boundary_from_fourier_1d(
     coefficients: Dict[int, Tuple[float, float]], N: int
 ) -> List[Tuple[float, float]]:
-    points: List[Tuple[float, float]] = []
-
-    freq = 1.0 / float(N)
-
-    for idx in range(N + 1):
-        theta = 2 * math.pi * freq * float(idx)
-        R = 0.0
-        for mode, coeffs in coefficients.items():
-            arg = theta * float(mode)
-
-            R += coeffs[0] * math.cos(arg) + coeffs[1] * math.sin(arg)
+    points = create_boundary_from_fourier_1d_array(
+        list(coefficients.values()), list(coefficients.keys()), N
+    )
 
-        points.append((R * math.cos(theta), R * math.sin(theta)))
-
-    return points
+    return [tuple(point) for point in points.tolist()]
 
 
 def create_boundary_from_fourier_2d(
     coefficients: Dict[int, Tuple[float, float, float, float]], N: int
 ) -> List[Tuple[float, float]]:
-    points: List[Tuple[float, float]] = []
-
-    freq = 1.0 / float(N)
-
-    for idx in range(N + 1):
-        x = 0.0
-        y = 0.0
-        for mode, coeffs in coefficients.items():
-            arg = 2 * math.pi * freq * float(idx) * float(mode)
-
-            x += coeffs[0] * math.cos(arg) + coeffs[1] * math.sin(arg)
-            y += coeffs[2] * math.cos(arg) + coeffs[3] * math.sin(arg)
-
-        points.append((x, y))
+    points = create_boundary_from_fourier_2d_array(
+        list(coefficients.values()), list(coefficients.keys()), N
+    )
 
-    return points
+    return [tuple(point) for point in points.tolist()]
@@ -1,5 +1,7 @@
 from typing import Callable, List, Tuple, Union
 
+from numpy import array
+
 from phdscripts.data import G_EQDSK
 
 from .extrude import extrude
@@ -12,14 +14,15 @@ def get_psi_for_boundary(
     Obtains psi values for a given set of points in a G EQDSK equilibrium.
     """
 
-    psis = []
-    for point in boundary:
-        if geqdsk.holds_point(point):
-            return False, []
+    if any(geqdsk.holds_point(point) for point in boundary):
+        return False, []
 
-        psis.append(geqdsk.psi_at(point))
+    if len(boundary) == 0:
+        return True, []
 
-    return True, psis
+    points = array(boundary, dtype=float)
+
+    return True, geqdsk.psi_at(points[:, 0], points[:, 1]).tolist()
 
 
 def get_normalised_psi_for_boundary(
@@ -29,14 +32,15 @@ def get_normalised_psi_for_boundary(
     Obtains psi values for a given set of points in a G EQDSK equilibrium.
     """
 
-    psis = []
-    for point in boundary:
-        if geqdsk.holds_point(point):
-            return False, []
+    if any(geqdsk.holds_point(point) for point in boundary):
+        return False, []
 
-        psis.append(geqdsk.psi_normalised_at(point))
+    if len(boundary) == 0:
+        return True, []
+
+    points = array(boundary, dtype=float)
 
-    return True, psis
+    return True, geqdsk.psi_normalised_at(points[:, 0], points[:, 1]).tolist()
 
 
 def get_psi_for_extruded_boundary(
@@ -57,14 +61,15 @@ def get_psi_for_extruded_boundary(
         print("Invalid extrusion method:", extrude_method)
         return False, []
 
-    RZpsis = []
-    for point in extruded_points:
-        if geqdsk.holds_point(point):
-            return False, []
+    if any(geqdsk.holds_point(point) for point in extruded_points):
+        return False, []
 
-        RZpsis.append((point[0], point[1], geqdsk.psi_at(point)))
+    points = array(extruded_points, dtype=float)
+    psis = geqdsk.psi_at(points[:, 0], points[:, 1]).tolist()
 
-    return True, RZpsis
+    return True, [
+        (point[0], point[1], psi) for point, psi in zip(extruded_points, psis)
+    ]
 
 
 def get_normalised_psi_for_extruded_boundary(
@@ -85,11 +90,12 @@ def get_normalised_psi_for_extruded_boundary(
         print("Invalid extrusion method:", extrude_method)
         return False, []
 
-    RZpsis = []
-    for point in extruded_points:
-        if geqdsk.holds_point(point):
-            return False, []
+    if any(geqdsk.holds_point(point) for point in extruded_points):
+        return False, []
 
-        RZpsis.append((point[0], point[1], geqdsk.psi_normalised_at(point)))
+    points = array(extruded_points, dtype=float)
+    psis = geqdsk.psi_normalised_at(points[:, 0], points[:, 1]).tolist()
 
-    return True, RZpsis
+    return True, [
+        (point[0], point[1], psi) for point, psi in zip(extruded_points, psis)
+    ]
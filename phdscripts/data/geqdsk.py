@@ -1,5 +1,6 @@
 from typing import Any, Optional, Tuple, Union
 
+from numpy import asarray, ndarray
 from scipy.interpolate import RectBivariateSpline
 
 
@@ -11,6 +12,10 @@ class G_EQDSK(dict):
     def __init__(self):
         self.__preset_parameters()
 
+        # The spline of psi over the grid, alongside the grid_R, grid_Z and psi_grid it
+        # was fitted to, so that it is refitted should any of them be replaced.
+        self.__setattr__("_psi_spline", None)
+
     def __getattr__(self, name) -> Any:
         return self.__dict__.__getitem__(name)
 
@@ -45,34 +50,92 @@ class G_EQDSK(dict):
         self.__setattr__("boundary", [])
         self.__setattr__("limiter_surface", [])
 
-    def psi_at(
-        self, R: Union[float, Tuple[float, float]], Z: Optional[float] = None
-    ) -> float:
-        spline = RectBivariateSpline(self["grid_R"], self["grid_Z"], self["psi_grid"])
+    def __spline(self) -> RectBivariateSpline:
+        grid_R, grid_Z, psi_grid = self["grid_R"], self["grid_Z"], self["psi_grid"]
+
+        cached = self._psi_spline
+        if (
+            cached is None
+            or cached[0] is not grid_R
+            or cached[1] is not grid_Z
+            or cached[2] is not psi_grid
+        ):
+            cached = (
+                grid_R,
+                grid_Z,
+                psi_grid,
+                RectBivariateSpline(grid_R, grid_Z, psi_grid),
+            )
+            self.__setattr__("_psi_spline", cached)
 
+        return cached[3]
+
+    def invalidate_spline(self) -> None:
+        """
+        Forces the spline of psi to be refitted, needed only if grid_R, grid_Z or
+        psi_grid are modified in place rather than replaced.
+        """
+        self.__setattr__("_psi_spline", None)
+
+    def __evaluate(
+        self,
+        R: Union[float, Tuple[float, float], ndarray],
+        Z: Optional[Union[float, ndarray]],
+        dR: int = 0,
+        dZ: int = 0,
+    ) -> Union[float, ndarray]:
+        """
+        Evaluates the spline of psi, or its derivatives, at a point given as (R, Z) or
+        as separate floats, or pointwise at arrays of R and Z.
+        """
         if isinstance(R, float) and not isinstance(Z, float):
             return 99999.0
-        elif not isinstance(R, float):
+        elif Z is None:
             Z = R[1]
             R = R[0]
 
-        return spline(R, Z).tolist()[0][0]
+        if isinstance(R, float) and isinstance(Z, float):
+            return float(self.__spline().ev(R, Z, dx=dR, dy=dZ))
 
-    def psi_normalised_at(
-        self, R: Union[float, Tuple[float, float]], Z: Optional[float] = None
-    ) -> float:
-        spline = RectBivariateSpline(self["grid_R"], self["grid_Z"], self["psi_grid"])
+        return self.__spline().ev(asarray(R), asarray(Z), dx=dR, dy=dZ)
 
+    def psi_at(
+        self,
+        R: Union[float, Tuple[float, float], ndarray],
+        Z: Optional[Union[float, ndarray]] = None,
+    ) -> Union[float, ndarray]:
+        """
+        Obtains psi at a point, or at each of the points of arrays of R and Z.
+        """
+        return self.__evaluate(R, Z)
+
+    def psi_normalised_at(
+        self,
+        R: Union[float, Tuple[float, float], ndarray],
+        Z: Optional[Union[float, ndarray]] = None,
+    ) -> Union[float, ndarray]:
+        """
+        Obtains normalised psi at a point, or at each of the points of arrays of R and
+        Z.
+        """
         if isinstance(R, float) and not isinstance(Z, float):
             return 99999.0
-        elif not isinstance(R, float):
-            Z = R[1]
-            R = R[0]
 
-        return (spline(R, Z).tolist()[0][0] - self["psi_mag"]) / (
+        return (self.__evaluate(R, Z) - self["psi_mag"]) / (
             self["psi_bnd"] - self["psi_mag"]
         )
 
+    def grad_psi_at(
+        self,
+        R: Union[float, Tuple[float, float], ndarray],
+        Z: Optional[Union[float, ndarray]] = None,
+    ) -> Tuple[Union[float, ndarray], Union[float, ndarray]]:
+        """
+        Obtains the gradient of psi, (dpsi/dR, dpsi/dZ), at a point, or at each of the
+        points of arrays of R and Z.
+        """
+        return self.__evaluate(R, Z, dR=1), self.__evaluate(R, Z, dZ=1)
+
     def holds_point(self, point: Tuple[float, float]) -> bool:
         return (
             point[0] < self["origin"][0]
@@ -6,6 +6,7 @@ from .elite import (
 from .geqdsk import read_geqdsk
 from .jorek import (
     read_jorek_equilibrium_file,
+    read_jorek_equilibrium_files,
     read_jorek_input_profiles,
     read_jorek_namelist,
     read_jorek_output,
@@ -19,6 +20,7 @@ __all__ = [
     "extract_from_scene_elite_input",
     "read_geqdsk",
     "read_jorek_equilibrium_file",
+    "read_jorek_equilibrium_files",
     "read_jorek_input_profiles",
     "read_jorek_output",
     "read_jorek_profile",
@@ -0,0 +1,186 @@
+"""
+On-disk cache of the values read from input files (e.g. G EQDSKs), so that files read
+repeatedly, as by scripts ran over many scan directories, are only parsed once.
+
+Caching is opted into by readers' callers. The values read from a file are stored in a
+directory beside it,
+    .<file name>.<reader>.<arguments hash>.v<version>.cache
+or, if a cache directory is given, in that directory as
+    <file name>.<path hash>.<reader>.<arguments hash>.v<version>.cache
+the path hash telling apart files of the same name in different directories. Arrays are
+stored as .npy files, memory-mapped when loaded so that only the parts of them used are
+read, and everything else as JSON. An entry holds while the file's path, size and
+modification time are unchanged, and is replaced once read again otherwise. Storing an
+entry removes those of other versions of the reader for the same file and arguments.
+
+Entries are written to a temporary directory before being moved into place, so they are
+never seen partially written. Failing to write an entry, as in read-only directories,
+isn't an error, the file is just parsed again when next read.
+"""
+
+from hashlib import sha256
+from json import dump, dumps, load
+from os import listdir, makedirs, replace, stat
+from os.path import abspath, basename, dirname, isdir, join as join_path
+from shutil import rmtree
+from typing import Any, Dict, Optional
+from uuid import uuid4
+
+from numpy import generic, load as load_array, ndarray, save as save_array
+
+_ENTRY_FILENAME = "entry.json"
+
+
+def __entry_prefix(
+    filepath: str, reader: str, args: Any, cache_dir: Optional[str]
+) -> str:
+    """
+    Path of the entries of the file for the reader given the arguments, less the
+    version of the reader.
+    """
+
+    args_hash = sha256(dumps(args, sort_keys=True).encode("utf-8")).hexdigest()
+
+    if cache_dir is None:
+        return join_path(
+            dirname(abspath(filepath)),
+            f".{basename(filepath)}.{reader}.{args_hash[:16]}",
+        )
+
+    path_hash = sha256(abspath(filepath).encode("utf-8")).hexdigest()
+
+    return join_path(
+        cache_dir, f"{basename(filepath)}.{path_hash[:16]}.{reader}.{args_hash[:16]}"
+    )
+
+
+def __entry_dir(entry_prefix: str, version: int) -> str:
+    return f"{entry_prefix}.v{version}.cache"
+
+
+def __remove_other_versions(entry_prefix: str, entry_dir: str) -> None:
+    entries_dir, prefix = dirname(entry_prefix), f"{basename(entry_prefix)}.v"
+
+    for name in listdir(entries_dir):
+        if (
+            name.startswith(prefix)
+            and name.endswith(".cache")
+            and join_path(entries_dir, name) != entry_dir
+        ):
+            rmtree(join_path(entries_dir, name), ignore_errors=True)
+
+
+def __source_key(filepath: str) -> Dict[str, Any]:
+    source = stat(filepath)
+
+    return {
+        "path": abspath(filepath),
+        "size": source.st_size,
+        "mtime_ns": source.st_mtime_ns,
+    }
+
+
+def __encode(value: Any, arrays: Dict[str, ndarray]) -> Any:
+    """
+    Encodes the value as JSON, but for arrays, which are instead added to those to be
+    stored as .npy files and referred to by their filename.
+    """
+
+    if isinstance(value, ndarray):
+        filename = f"{len(arrays)}.npy"
+        arrays[filename] = value
+        return {"array": filename}
+    elif isinstance(value, generic):
+        return value.item()
+    elif isinstance(value, tuple):
+        return {"tuple": [__encode(x, arrays) for x in value]}
+    elif isinstance(value, list):
+        return [__encode(x, arrays) for x in value]
+    elif isinstance(value, dict):
+        return {"dict": [[key, __encode(x, arrays)] for key, x in value.items()]}
+
+    return value
+
+
+def __decode(value: Any, entry_dir: str) -> Any:
+    if isinstance(value, list):
+        return [__decode(x, entry_dir) for x in value]
+    elif not isinstance(value, dict):
+        return value
+    elif "array" in value:
+        # Copy-on-write, so the arrays may still be modified in memory.
+        return load_array(join_path(entry_dir, value["array"]), mmap_mode="c")
+    elif "tuple" in value:
+        return tuple(__decode(x, entry_dir) for x in value["tuple"])
+
+    return {key: __decode(x, entry_dir) for key, x in value["dict"]}
+
+
+def load_cached(
+    filepath: str,
+    reader: str,
+    version: int = 0,
+    args: Any = None,
+    cache_dir: Optional[str] = None,
+) -> Optional[Any]:
+    """
+    Obtains the values read from the file by the named reader, given the arguments, if
+    cached (in cache_dir if given, otherwise beside the file) and still current. None
+    otherwise.
+    """
+
+    entry_dir = __entry_dir(__entry_prefix(filepath, reader, args, cache_dir), version)
+
+    try:
+        with open(join_path(entry_dir, _ENTRY_FILENAME), "r") as f:
+            entry = load(f)
+
+        if entry["source"] != __source_key(filepath):
+            return None
+
+        return __decode(entry["value"], entry_dir)
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def store_cached(
+    filepath: str,
+    value: Any,
+    reader: str,
+    version: int = 0,
+    args: Any = None,
+    cache_dir: Optional[str] = None,
+) -> bool:
+    """
+    Caches the values read from the file by the named reader, given the arguments, in
+    cache_dir if given, otherwise beside the file. Returns if the values were cached.
+    """
+
+    entry_prefix = __entry_prefix(filepath, reader, args, cache_dir)
+    entry_dir = __entry_dir(entry_prefix, version)
+    temp_dir = f"{entry_dir}.{uuid4().hex}"
+
+    try:
+        source = __source_key(filepath)
+
+        arrays: Dict[str, ndarray] = {}
+        encoded = __encode(value, arrays)
+
+        makedirs(temp_dir)
+        for filename, array in arrays.items():
+            save_array(join_path(temp_dir, filename), array)
+
+        with open(join_path(temp_dir, _ENTRY_FILENAME), "w") as f:
+            dump({"source": source, "value": encoded}, f)
+
+        # An out of date entry is removed first, as directories only replace empty ones.
+        if isdir(entry_dir):
+            rmtree(entry_dir, ignore_errors=True)
+        replace(temp_dir, entry_dir)
+
+        __remove_other_versions(entry_prefix, entry_dir)
+    except (OSError, TypeError, ValueError):
+        rmtree(temp_dir, ignore_errors=True)
+        return False
+
+    return True
@@ -1,5 +1,13 @@
 from os.path import isfile
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Set, Tuple
+
+from numpy import array, ascontiguousarray, ndarray
+
+from .cache import load_cached, store_cached
+from .values import parse_values
+
+# Version of the parameters extracted, for caching them, see cache.
+ELITE_CACHE_VERSION = 1
 
 
 def __read_flux_metadata(lines: List[str]) -> Tuple[bool, int, int]:
@@ -27,129 +35,144 @@ def __read_flux_metadata(lines: List[str]) -> Tuple[bool, int, int]:
     return (True, int(metadata[0]), int(metadata[1]))
 
 
-def __extract_per_flux_profile(
-    lines: List[str], param: str, flux_surface_count: int
-) -> Tuple[bool, List[float]]:
+def __index_blocks(lines: List[str], params: Set[str]) -> Dict[str, int]:
     """
-    Extracts the named parameter from the provided Elite input lines. The assumption is
-    that the Elite input file has the parameter provided as a block where each value in
-    the block is the value of that parameter on a given flux surface.
+    Finds the line on which the block of values of each of the named parameters starts,
+    in a single pass over the provided Elite input lines. The block of a parameter
+    follows the first line naming it.
     """
 
-    values: List[float] = []
+    index: Dict[str, int] = {}
+
+    for line_idx, line in enumerate(lines):
+        param = line.strip()
+        if param in params and param not in index:
+            index[param] = line_idx + 1
 
-    found_start = False
-    for line in lines:
-        # If we have found the start of the values for this parameter,
-        # then handle ingestion.
-        if found_start:
-            # If we have ingested all the values, break.
-            if len(values) == flux_surface_count:
+            if len(index) == len(params):
                 break
-            # Get values on this line.
-            values_str = line.split()
-            for value_str in values_str:
-                # For each value on line, try to convert to a float, if we
-                # can't then input file is ill-formatted.
-                try:
-                    values.append(float(value_str.strip()))
-                except ValueError:
-                    return (False, [])
-        # If we haven't yet found the start of the values for this parameter,
-        # check if we have encountered the start.
-        elif line.strip() == param:
-            found_start = True
-
-    # If we don't have flux_surface_count number of
-    # values, then te input file was ill-formatted, return
-    # failure.
-    if len(values) != flux_surface_count:
-        return False, values
+
+    return index
+
+
+def __block_end(lines: List[str], start: int, block_size: int, block_count: int) -> int:
+    """
+    Finds the end of block_count blocks of block_size values from the start line, each
+    block starting on a new line, by counting the values on each line.
+    """
+
+    line_idx = start
+    for _ in range(block_count):
+        value_count = 0
+        while value_count < block_size:
+            if line_idx == len(lines):
+                return line_idx
+
+            value_count += len(lines[line_idx].split())
+            line_idx += 1
+
+    return line_idx
+
+
+def __extract_blocks(
+    lines: List[str], start: int, block_size: int, block_count: int
+) -> Tuple[bool, ndarray]:
+    """
+    Extracts block_count blocks of block_size values from the provided Elite input lines
+    from the start line, each block starting on a new line.
+    """
+
+    value_count = block_size * block_count
+
+    # Assuming each line holds as many values as the first, the lines holding the blocks
+    # are known without reading them, otherwise they are found by counting values.
+    values_per_line = len(lines[start].split()) if start < len(lines) else 0
+    if values_per_line > 0:
+        lines_per_block = -(-block_size // values_per_line)
+
+        values = parse_values(
+            "".join(lines[start : start + lines_per_block * block_count])
+        )
+        if values is not None and len(values) == value_count:
+            return True, values
+
+    values = parse_values(
+        "".join(lines[start : __block_end(lines, start, block_size, block_count)])
+    )
+    if values is None or len(values) != value_count:
+        return False, array([])
 
     return True, values
 
 
+def __extract_per_flux_profile(
+    lines: List[str], start: int, flux_surface_count: int
+) -> Tuple[bool, ndarray]:
+    """
+    Extracts a parameter from the provided Elite input lines whose block starts on the
+    start line. The assumption is that the Elite input file has the parameter provided
+    as a block where each value in the block is the value of that parameter on a given
+    flux surface.
+    """
+
+    return __extract_blocks(lines, start, flux_surface_count, 1)
+
+
 def __extract_per_point_profile(
     lines: List[str],
-    param: str,
-    flux_surface_target: int,
+    start: int,
     flux_surface_count: int,
     flux_surface_point_count: int,
-) -> Tuple[bool, List[float]]:
-    """
-    Extracts the named parameter from the provided Elite input lines. The assumption is
-    that the Elite input file has the parameter provided in blocks where each block is
-    given as a point in terms of some parameter (usually poloidal angle) and each value
-    in a block is the value of that point on one of the flux surfaces.
-    """
-
-    values: List[float] = []
-
-    flux_cursor = 0
-    point_values: List[float] = [None] * flux_surface_count
-
-    # In this function, we iterate over lines to get values, where the values
-    # are stored in blocks all for the same point (say in terms of poloidal
-    # angle), where there are flux_surface_count number of values in each block.
-    #   Each value in these blocks corresponds to one of the flux surfaces, with
-    #   values going in order from central flux to edge flux surfaces.
-    found_start = False
-    for line in lines:
-        # If we have found the start of the values for this parameter,
-        # then handle ingestion.
-        if found_start:
-            # If we have flux cursor equal to flux target, then we can
-            # retrieve the value for the point on the target flux surface.
-            if flux_cursor >= flux_surface_target:
-                values.append(point_values[flux_cursor - 1])
-            # If we have hit end of flux surfaces for this point, wrap flux
-            # cursor.
-            if flux_cursor == flux_surface_count:
-                flux_cursor -= flux_surface_target
-            # If we have ingested all the values, break.
-            if len(values) == flux_surface_point_count:
-                break
-            # Get values on this line.
-            values_str = line.split()
-            for value_str in values_str:
-                # For each value on line, try to convert to a float, if we
-                # can't then input file is ill-formatted.
-                try:
-                    point_values[flux_cursor] = float(value_str.strip())
-                except ValueError:
-                    return (False, [])
-                # Increment flux cursor.
-                flux_cursor += 1
-        # If we haven't yet found the start of the values for this parameter,
-        # check if we have encountered the start.
-        elif line.strip() == param:
-            found_start = True
-
-    # If we don't have flux_surface_point_count number of
-    # values, then te input file was ill-formatted, return
-    # failure.
-    if len(values) != flux_surface_point_count:
-        return False, values
+) -> Tuple[bool, ndarray]:
+    """
+    Extracts a parameter from the provided Elite input lines whose blocks start on the
+    start line. The assumption is that the Elite input file has the parameter provided
+    in blocks where each block is given as a point in terms of some parameter (usually
+    poloidal angle) and each value in a block is the value of that point on one of the
+    flux surfaces, going in order from central flux to edge flux surfaces. The values
+    are returned as a grid indexed [flux surface][point].
+    """
 
-    return True, values
+    success, values = __extract_blocks(
+        lines, start, flux_surface_count, flux_surface_point_count
+    )
+    if not success:
+        return False, array([])
+
+    return True, ascontiguousarray(
+        values.reshape((flux_surface_point_count, flux_surface_count)).transpose()
+    )
 
 
 def extract_from_elite_input(
     elite_filepath: str,
     per_flux_params: Dict[str, str],
     per_point_params: Dict[str, str],
-) -> Tuple[bool, Dict[str, List[float]]]:
+    cache: bool = False,
+    cache_dir: Optional[str] = None,
+) -> Tuple[bool, Dict[str, ndarray]]:
     """
     Extracts the named parameters from an elite input file. Renaming parameters with
     canonical names provided. Keys of param dictionaries are parameter names as in elite
     file, while values are the canonical parameter names used in the returned
-    dictionary.
+    dictionary. Per point parameters are given as their values on the boundary and, as
+    <canonical name>_grid, on every flux surface indexed [flux surface][point]. If cache
+    is set, the parameters extracted are cached, in cache_dir if given and otherwise
+    beside the file, and reused while it is unchanged.
     """
 
     if not isfile(elite_filepath):
         print("    File does not exist!")
         return False, {}
 
+    cache_args = [list(per_flux_params.items()), list(per_point_params.items())]
+    if cache:
+        params = load_cached(
+            elite_filepath, "elite", ELITE_CACHE_VERSION, cache_args, cache_dir
+        )
+        if params is not None:
+            return True, params
+
     elite_lines = []
     with open(elite_filepath, "r") as elite_file:
         elite_lines = elite_file.readlines()
@@ -173,12 +196,18 @@ def extract_from_elite_input(
         )
         return False, {}
 
-    params: Dict[str, List[float]] = {}
+    block_starts = __index_blocks(
+        elite_lines, set(per_flux_params.keys()) | set(per_point_params.keys())
+    )
+
+    params: Dict[str, ndarray] = {}
 
     for param, canonical in per_flux_params.items():
-        success, values = __extract_per_flux_profile(
-            elite_lines, param, flux_surface_count
-        )
+        success = param in block_starts
+        if success:
+            success, values = __extract_per_flux_profile(
+                elite_lines, block_starts[param], flux_surface_count
+            )
 
         if not success:
             print(f"    Could not parse parameter, {param}.")
@@ -187,21 +216,28 @@ def extract_from_elite_input(
         params[canonical] = values
 
     for param, canonical in per_point_params.items():
-        # Only want the boundary information for these parameters, and they have
-        # per point, per flux surface values so need special parsing.
-        success, values = __extract_per_point_profile(
-            elite_lines,
-            param,
-            flux_surface_count,
-            flux_surface_count,
-            flux_surface_point_count,
-        )
+        # These parameters have per point, per flux surface values, given in full as a
+        # grid, alongside the boundary values, those of the edge flux surface.
+        success = param in block_starts
+        if success:
+            success, grid = __extract_per_point_profile(
+                elite_lines,
+                block_starts[param],
+                flux_surface_count,
+                flux_surface_point_count,
+            )
 
         if not success:
             print(f"    Could not parse parameter, {param}.")
             return False, {}
 
-        params[canonical] = values
+        params[canonical] = grid[-1]
+        params[f"{canonical}_grid"] = grid
+
+    if cache:
+        store_cached(
+            elite_filepath, params, "elite", ELITE_CACHE_VERSION, cache_args, cache_dir
+        )
 
     return True, params
 
@@ -228,7 +264,7 @@ HELENA_PER_POINT_PARAMS = {"R:": "R", "z:": "Z"}
 
 def extract_from_scene_elite_input(
     elite_filepath: str,
-) -> Tuple[bool, Dict[str, List[float]]]:
+) -> Tuple[bool, Dict[str, ndarray]]:
     """
     Extracts a set of parameters from an elite input matching the format generated by
     scene. The parameters extracted a sufficient for building a jorek-starwall namelist.
@@ -240,7 +276,7 @@ def extract_from_scene_elite_input(
 
 def extract_from_helena_elite_input(
     elite_filepath: str,
-) -> Tuple[bool, Dict[str, List[float]]]:
+) -> Tuple[bool, Dict[str, ndarray]]:
     """
     Extracts a set of parameters from an elite input matching the format generated by
     helena. The parameters extracted a sufficient for building a jorek-starwall
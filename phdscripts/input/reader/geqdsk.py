@@ -1,13 +1,31 @@
 from os.path import isfile
 from re import findall
-from typing import List, Tuple
-
-from numpy import linspace, ndarray, zeros
+from typing import List, Optional, Tuple
+
+from numpy import (
+    array,
+    frombuffer,
+    full,
+    hstack,
+    isin,
+    linspace,
+    ndarray,
+    uint8,
+)
 
 from phdscripts.data import G_EQDSK
 
+from .cache import load_cached, store_cached
+from .values import parse_values
+
 FORTRAN_INTEGERS_AND_FLOATS_PATTERN = r"\s?([-]?[0-9]+(\.[0-9]+)?([eE][+-][0-9]+)?)"
 
+# G EQDSK values are written in fields of this width, as by Fortran's 5e16.9.
+GEQDSK_FIELD_WIDTH = 16
+
+# Bytes a field of a value may end with, as right-aligned numbers or blank padding.
+_FIELD_ENDINGS = array([ord(c) for c in "0123456789 "], dtype=uint8)
+
 
 def __parse_header(header: str) -> Tuple[bool, str, int, int]:
     """
@@ -26,7 +44,7 @@ def __parse_header(header: str) -> Tuple[bool, str, int, int]:
 
 
 def __parse_domain(
-    raw_values: List[str],
+    raw_values: ndarray,
 ) -> Tuple[bool, Tuple[float, float], Tuple[float, float]]:
     try:
         return (
@@ -39,7 +57,7 @@ def __parse_domain(
 
 
 def __parse_axes(
-    raw_values: List[str],
+    raw_values: ndarray,
 ) -> Tuple[bool, float, float, float, float, float]:
     try:
         return (
@@ -54,7 +72,7 @@ def __parse_axes(
         return False, 0.0, 0.0, 0.0, 0.0, 0.0
 
 
-def __parse_current_and_psi_bnd(raw_values: List[str]) -> Tuple[bool, float, float]:
+def __parse_current_and_psi_bnd(raw_values: ndarray) -> Tuple[bool, float, float]:
     try:
         return True, float(raw_values[8]), float(raw_values[10])
     except Exception:
@@ -62,68 +80,64 @@ def __parse_current_and_psi_bnd(raw_values: List[str]) -> Tuple[bool, float, flo
 
 
 def __parse_profile(
-    raw_values: List[str], length: int, offset: int
+    raw_values: ndarray, length: int, offset: int
 ) -> Tuple[bool, List[float]]:
-    profile = []
-
-    try:
-        for val in raw_values[offset : offset + length]:
-            profile.append(float(val))
-    except Exception:
-        return False, []
+    """
+    Parses the profile of the given length at the offset. Profiles cut short, as in
+    truncated files, are returned as far as they go.
+    """
 
-    return True, profile
+    return True, raw_values[offset : offset + length].tolist()
 
 
-def __parse_f_poloidal(raw_values: List[str], nr: int) -> Tuple[bool, List[float]]:
+def __parse_f_poloidal(raw_values: ndarray, nr: int) -> Tuple[bool, List[float]]:
     return __parse_profile(raw_values, nr, 20)
 
 
-def __parse_pressure(raw_values: List[str], nr: int) -> Tuple[bool, List[float]]:
+def __parse_pressure(raw_values: ndarray, nr: int) -> Tuple[bool, List[float]]:
     return __parse_profile(raw_values, nr, 20 + nr)
 
 
-def __parse_ffprime(raw_values: List[str], nr: int) -> Tuple[bool, List[float]]:
+def __parse_ffprime(raw_values: ndarray, nr: int) -> Tuple[bool, List[float]]:
     return __parse_profile(raw_values, nr, 20 + 2 * nr)
 
 
-def __parse_pprime(raw_values: List[str], nr: int) -> Tuple[bool, List[float]]:
+def __parse_pprime(raw_values: ndarray, nr: int) -> Tuple[bool, List[float]]:
     return __parse_profile(raw_values, nr, 20 + 3 * nr)
 
 
-def __parse_psi_grid(
-    raw_values: List[str], nr: int, nz: int
-) -> Tuple[bool, List[float]]:
-    success, profile = __parse_profile(raw_values, nr * nz, 20 + 4 * nr)
-    if not success:
+def __parse_psi_grid(raw_values: ndarray, nr: int, nz: int) -> Tuple[bool, ndarray]:
+    offset = 20 + 4 * nr
+    if len(raw_values) < offset + nr * nz:
         return False, []
 
-    psi_grid = zeros((nr, nz))
-    for j in range(nz):
-        for i in range(nr):
-            idx = j * nr + i
-            psi_grid[i][j] = profile[idx]
-
-    return True, psi_grid
+    # Stored with R varying fastest, so as rows of Z, where psi_grid is indexed [R][Z].
+    return (
+        True,
+        raw_values[offset : offset + nr * nz].reshape((nz, nr)).transpose().copy(),
+    )
 
 
-def __parse_q(raw_values: List[str], nr: int, nz: int) -> Tuple[bool, List[float]]:
+def __parse_q(raw_values: ndarray, nr: int, nz: int) -> Tuple[bool, List[float]]:
     return __parse_profile(raw_values, nr, 20 + 4 * nr + nr * nz)
 
 
-def __parse_num_bnd_lim(
-    raw_values: List[str], nr: int, nz: int
-) -> Tuple[bool, int, int]:
+def __parse_num_bnd_lim(raw_values: ndarray, nr: int, nz: int) -> Tuple[bool, int, int]:
     offset = 20 + 5 * nr + nr * nz
 
     try:
-        return True, int(raw_values[offset]), int(raw_values[offset + 1])
+        nbnd, nlim = float(raw_values[offset]), float(raw_values[offset + 1])
     except Exception:
         return False, 0, 0
 
+    if not (nbnd.is_integer() and nlim.is_integer()) or nbnd < 0 or nlim < 0:
+        return False, 0, 0
+
+    return True, int(nbnd), int(nlim)
+
 
 def __parse_boundary(
-    raw_values: List[str], nr: int, nz: int, nbnd: int
+    raw_values: ndarray, nr: int, nz: int, nbnd: int
 ) -> Tuple[bool, List[float]]:
     success, profile = __parse_profile(raw_values, nbnd * 2, 20 + 5 * nr + nr * nz + 2)
     if not success:
@@ -133,7 +147,7 @@ def __parse_boundary(
 
 
 def __parse_limiter_surface(
-    raw_values: List[str], nr: int, nz: int, nbnd: int, nlim: int
+    raw_values: ndarray, nr: int, nz: int, nbnd: int, nlim: int
 ) -> Tuple[bool, List[float]]:
     success, profile = __parse_profile(
         raw_values, nlim * 2, 20 + 5 * nr + nr * nz + 2 + 2 * nbnd
@@ -144,6 +158,59 @@ def __parse_limiter_surface(
     return True, [(profile[i], profile[i + 1]) for i in range(0, nlim * 2, 2)]
 
 
+def __fixed_width_values(lines: List[str]) -> ndarray:
+    """
+    Parses the values of lines of fixed width fields in bulk. The fields are separated
+    by whitespace before parsing, so that values filling their field, as negative
+    values do, are told apart from those before them. Returns an empty array if the
+    lines aren't of fixed width fields.
+    """
+
+    lines = [line.rstrip("\r\n") for line in lines]
+    if len(lines) == 0 or len(lines[0]) % GEQDSK_FIELD_WIDTH != 0:
+        return array([])
+
+    width = max(len(line) for line in lines)
+    width += -width % GEQDSK_FIELD_WIDTH
+
+    try:
+        text = "".join(line.ljust(width) for line in lines).encode("ascii")
+    except UnicodeEncodeError:
+        return array([])
+
+    fields = frombuffer(text, dtype=uint8).reshape((-1, GEQDSK_FIELD_WIDTH))
+    if not isin(fields[:, -1], _FIELD_ENDINGS).all():
+        return array([])
+
+    spaced = hstack((fields, full((len(fields), 1), ord(" "), dtype=uint8)))
+
+    values = parse_values(spaced.tobytes().decode("ascii"))
+
+    return values if values is not None else array([])
+
+
+def __pattern_values(lines: List[str]) -> ndarray:
+    """
+    Parses the values of lines by pattern, for G EQDSKs not written as fixed width
+    fields.
+    """
+
+    # Have to split lines using regex as Fortran doesn't put spaces between floats when
+    # the second float is negative!
+    return array(
+        [
+            float(x[0])
+            for x in findall(FORTRAN_INTEGERS_AND_FLOATS_PATTERN, "".join(lines))
+        ]
+    )
+
+
+def __holds_all_sections(raw_values: ndarray, nr: int, nz: int) -> bool:
+    success, nbnd, nlim = __parse_num_bnd_lim(raw_values, nr, nz)
+
+    return success and len(raw_values) >= 20 + 5 * nr + nr * nz + 2 + 2 * (nbnd + nlim)
+
+
 def __psi_n(nr: int) -> ndarray:
     return [float(i) / float(nr) for i in range(nr)]
 
@@ -172,13 +239,9 @@ def __parse_geqdsk(contents: List[str]) -> Tuple[bool, G_EQDSK]:
         print("Could not parse header of G EQDSK file.")
         return False, G_EQDSK()
 
-    # Have to split lines using regex as Fortran doesn't put spaces between floats when
-    # the second float is negative!
-    raw_values = []
-    for line in contents[1:]:
-        raw_values.extend(
-            [x[0] for x in findall(FORTRAN_INTEGERS_AND_FLOATS_PATTERN, line)]
-        )
+    raw_values = __fixed_width_values(contents[1:])
+    if not __holds_all_sections(raw_values, nr, nz):
+        raw_values = __pattern_values(contents[1:])
 
     success, dimensions, origin = __parse_domain(raw_values)
     if not success:
@@ -267,10 +330,30 @@ def __parse_geqdsk(contents: List[str]) -> Tuple[bool, G_EQDSK]:
     return True, geqdsk
 
 
-def read_geqdsk(filepath: str) -> Tuple[bool, G_EQDSK]:
+def read_geqdsk(
+    filepath: str, cache: bool = False, cache_dir: Optional[str] = None
+) -> Tuple[bool, G_EQDSK]:
+    """
+    Reads a G EQDSK file. If cache is set, the values read are cached, in cache_dir if
+    given and otherwise beside the file, and reused while it is unchanged, with psi_grid
+    memory-mapped. Files cut short before the end of the psi grid, boundary or limiter
+    surface fail to be read.
+    """
     if not isfile(filepath):
         print("Could not find geqdsk file:", filepath)
         return False, G_EQDSK()
 
+    if cache:
+        values = load_cached(filepath, "geqdsk", cache_dir=cache_dir)
+        if values is not None:
+            geqdsk = G_EQDSK()
+            geqdsk.update(values)
+            return True, geqdsk
+
     with open(filepath, "r") as f:
-        return __parse_geqdsk(f.readlines())
+        success, geqdsk = __parse_geqdsk(f.readlines())
+
+    if success and cache:
+        store_cached(filepath, dict(geqdsk), "geqdsk", cache_dir=cache_dir)
+
+    return success, geqdsk
@@ -1,4 +1,4 @@
-from .equilibrium import read_jorek_equilibrium_file
+from .equilibrium import read_jorek_equilibrium_file, read_jorek_equilibrium_files
 from .input_profiles import read_jorek_input_profiles
 from .namelist import read_jorek_namelist
 from .output import read_jorek_output
@@ -6,6 +6,7 @@ from .profile import read_jorek_profile, read_jorek_RZpsi_profile
 
 __all__ = [
     "read_jorek_equilibrium_file",
+    "read_jorek_equilibrium_files",
     "read_jorek_input_profiles",
     "read_jorek_namelist",
     "read_jorek_output",
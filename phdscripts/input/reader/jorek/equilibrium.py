@@ -1,17 +1,34 @@
-from os.path import isfile
-from typing import Callable, Dict, List, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
+from os.path import isfile, join
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from numpy import ascontiguousarray, ndarray
+
+from ..cache import load_cached, store_cached
+from ..values import parse_values
+
+# Version of the values extracted, for caching them, see cache.
+JOREK_EQUILIBRIUM_CACHE_VERSION = 1
 
 
 def __extract_params(
     names: List[Union[str, Tuple[str, Callable]]],
     lines: List[str],
-    extracted_params: Dict[str, Union[float, List[Tuple[float, float]]]],
-) -> bool:
-    line = lines.pop(0)
-    values = line.strip().split()
+    cursor: int,
+    extracted_params: Dict[str, Union[float, ndarray]],
+) -> Tuple[bool, int]:
+    """
+    Extracts the named parameters from the line at the cursor, returning the cursor
+    moved past it.
+    """
+
+    if cursor >= len(lines):
+        return False, cursor
+
+    values = lines[cursor].strip().split()
 
     if len(values) != len(names):
-        return False
+        return False, cursor
 
     try:
         for name_idx in range(len(names)):
@@ -22,127 +39,130 @@ def __extract_params(
             else:
                 extracted_params[names[name_idx]] = float(values[name_idx])
     except ValueError:
-        return False
+        return False, cursor
 
-    return True
+    return True, cursor + 1
 
 
 def __extract_profile_params(
-    names: List[Union[str, Tuple[str, Callable]]],
+    names: List[str],
     lines: List[str],
-    extracted_params: Dict[str, Union[float, List[Tuple[float, float]]]],
-) -> bool:
+    cursor: int,
+    extracted_params: Dict[str, Union[float, ndarray]],
+) -> Tuple[bool, int]:
+    """
+    Extracts the named profiles from the block of lines at the cursor, a line giving
+    the length of the profiles followed by a line of their values at each point,
+    returning the cursor moved past the block.
+    """
+
     profile_length = {}
-    if not __extract_params([("length", int)], lines, profile_length):
-        return False
+    success, cursor = __extract_params([("length", int)], lines, cursor, profile_length)
+    if not success:
+        return False, cursor
 
     profile_length = profile_length["length"]
+    if profile_length < 0 or cursor + profile_length > len(lines):
+        return False, cursor
 
+    values = parse_values("".join(lines[cursor : cursor + profile_length]))
+    if values is None or len(values) != profile_length * len(names):
+        return False, cursor
+
+    values = values.reshape((profile_length, len(names)))
     for name_idx in range(len(names)):
-        if type(names[name_idx]) is tuple:
-            extracted_params[names[name_idx][0]] = [None] * profile_length
-        else:
-            extracted_params[names[name_idx]] = [None] * profile_length
-
-    for profile_idx in range(profile_length):
-        line = lines.pop(0)
-        values = line.strip().split()
-
-        if len(values) != len(names):
-            return False
-
-        try:
-            for name_idx in range(len(names)):
-                if type(names[name_idx]) is tuple:
-                    extracted_params[names[name_idx][0]][profile_idx] = names[name_idx][
-                        1
-                    ](values[name_idx])
-                else:
-                    extracted_params[names[name_idx]][profile_idx] = float(
-                        values[name_idx]
-                    )
-        except ValueError:
-            return False
-
-    return True
+        extracted_params[names[name_idx]] = ascontiguousarray(values[:, name_idx])
+
+    return True, cursor + profile_length
 
 
 def __extract_equilibrium_axis_params(
     lines: List[str],
-    extracted_params: Dict[str, Union[float, List[Tuple[float, float]]]],
-) -> bool:
+    cursor: int,
+    extracted_params: Dict[str, Union[float, ndarray]],
+) -> Tuple[bool, int]:
     # Extract magnetic axis coords and F0.
-    if not __extract_params(
-        ["R_magnetic_axis", "Z_magnetic_axis", "F0"], lines, extracted_params
-    ):
-        return False
+    success, cursor = __extract_params(
+        ["R_magnetic_axis", "Z_magnetic_axis", "F0"], lines, cursor, extracted_params
+    )
+    if not success:
+        return False, cursor
 
     # Extract psi boundary and psi axis.
-    if not __extract_params(["psi_boundary", "psi_axis"], lines, extracted_params):
-        return False
-
-    return True
+    return __extract_params(
+        ["psi_boundary", "psi_axis"], lines, cursor, extracted_params
+    )
 
 
 def __extract_equilibrium_boundary(
     lines: List[str],
-    extracted_params: Dict[str, Union[float, List[Tuple[float, float]]]],
-) -> bool:
+    cursor: int,
+    extracted_params: Dict[str, Union[float, ndarray]],
+) -> Tuple[bool, int]:
     # Extract boundary points.
-    if not __extract_profile_params(["R", "Z"], lines, extracted_params):
-        return False
-
-    return True
+    return __extract_profile_params(["R", "Z"], lines, cursor, extracted_params)
 
 
 def __extract_equilibrium_geometry_and_magnetics(
     lines: List[str],
-    extracted_params: Dict[str, Union[float, List[Tuple[float, float]]]],
-) -> bool:
+    cursor: int,
+    extracted_params: Dict[str, Union[float, ndarray]],
+) -> Tuple[bool, int]:
     # Extract minor and major radius, and magnetic field on geometric axis.
-    if not __extract_params(
+    success, cursor = __extract_params(
         ["minor_radius", "major_radius", "magnetic_field_on_geometric_axis"],
         lines,
+        cursor,
         extracted_params,
-    ):
-        return False
+    )
+    if not success:
+        return False, cursor
 
     # Extract current, beta poloidal, and beta toroidal.
-    if not __extract_params(
-        ["current", "beta_poloidal", "beta_toroidal"], lines, extracted_params
-    ):
-        return False
+    success, cursor = __extract_params(
+        ["current", "beta_poloidal", "beta_toroidal"], lines, cursor, extracted_params
+    )
+    if not success:
+        return False, cursor
 
     # Extract beta normalised.
-    if not __extract_params(["beta_normalised"], lines, extracted_params):
-        return False
-
-    return True
+    return __extract_params(["beta_normalised"], lines, cursor, extracted_params)
 
 
 def __extract_equilibrium_profiles(
     lines: List[str],
-    extracted_params: Dict[str, Union[float, List[Tuple[float, float]]]],
-) -> bool:
+    cursor: int,
+    extracted_params: Dict[str, Union[float, ndarray]],
+) -> Tuple[bool, int]:
     # Extract profiles.
-    if not __extract_profile_params(
-        ["psi", "pprime", "zjzprime", "q"], lines, extracted_params
-    ):
-        return False
-
-    return True
+    return __extract_profile_params(
+        ["psi", "pprime", "zjzprime", "q"], lines, cursor, extracted_params
+    )
 
 
 def read_jorek_equilibrium_file(
-    filepath: str,
-) -> Dict[str, Union[float, List[Tuple[float, float]]]]:
+    filepath: str, cache: bool = False, cache_dir: Optional[str] = None
+) -> Dict[str, Union[float, ndarray]]:
     """
-    Extracts the values stored in the equilibrium file generated by JOREK.
+    Extracts the values stored in the equilibrium file generated by JOREK, with the
+    boundary (R, Z) and profiles (psi, pprime, zjzprime, q) as arrays. Empty if the
+    file couldn't be read. If cache is set, the values extracted are cached, in
+    cache_dir if given and otherwise beside the file, and reused while it is unchanged.
     """
 
     if not isfile(filepath):
         print(f"JOREK equilibrium file does not exist:\n    {filepath}")
-        return False, {}
+        return {}
+
+    if cache:
+        extracted_params = load_cached(
+            filepath,
+            "jorek_equilibrium",
+            JOREK_EQUILIBRIUM_CACHE_VERSION,
+            cache_dir=cache_dir,
+        )
+        if extracted_params is not None:
+            return extracted_params
 
     lines = []
     with open(filepath, "r") as equilibrium_file:
@@ -150,20 +170,53 @@ def read_jorek_equilibrium_file(
 
     if lines is None or (len(lines) == 1 and lines[0] == ""):
         print(f"JOREK equilibrium file at:\n    {filepath}\nis empty!")
-        return False, {}
+        return {}
 
     extracted_params = {}
+    cursor = 0
+
+    for extract in [
+        __extract_equilibrium_axis_params,
+        __extract_equilibrium_boundary,
+        __extract_equilibrium_geometry_and_magnetics,
+        __extract_equilibrium_profiles,
+    ]:
+        success, cursor = extract(lines, cursor, extracted_params)
+        if not success:
+            return {}
+
+    if cache:
+        store_cached(
+            filepath,
+            extracted_params,
+            "jorek_equilibrium",
+            JOREK_EQUILIBRIUM_CACHE_VERSION,
+            cache_dir=cache_dir,
+        )
 
-    if not __extract_equilibrium_axis_params(lines, extracted_params):
-        return {}
+    return extracted_params
 
-    if not __extract_equilibrium_boundary(lines, extracted_params):
-        return {}
 
-    if not __extract_equilibrium_geometry_and_magnetics(lines, extracted_params):
-        return {}
+def read_jorek_equilibrium_files(
+    run_directories: List[str],
+    equilibrium_filename: str = "equilibrium.txt",
+    cache: bool = False,
+    workers: int = 8,
+    cache_dir: Optional[str] = None,
+) -> Dict[str, Dict[str, Union[float, ndarray]]]:
+    """
+    Extracts the values stored in the equilibrium files generated by JOREK in each of
+    the run directories, reading up to workers files at a time. Keyed by run directory,
+    the values of those whose file couldn't be read being empty. Caching is as for
+    read_jorek_equilibrium_file.
+    """
 
-    if not __extract_equilibrium_profiles(lines, extracted_params):
-        return {}
+    with ThreadPoolExecutor(max(1, workers)) as executor:
+        equilibria = executor.map(
+            lambda run_directory: read_jorek_equilibrium_file(
+                join(run_directory, equilibrium_filename), cache, cache_dir
+            ),
+            run_directories,
+        )
 
-    return extracted_params
+        return dict(zip(run_directories, equilibria))
@@ -0,0 +1,20 @@
+from typing import Optional
+from warnings import catch_warnings, simplefilter
+
+from numpy import fromstring, ndarray
+
+
+def parse_values(text: str) -> Optional[ndarray]:
+    """
+    Parses whitespace separated values in bulk. None if anything in the text isn't a
+    value.
+    """
+
+    # Depending on the version of NumPy, parsing either raises on anything that isn't a
+    # value or warns and stops there, the latter made to raise too.
+    with catch_warnings():
+        simplefilter("error")
+        try:
+            return fromstring(text, sep=" ")
+        except (ValueError, DeprecationWarning):
+            return None
@@ -1,7 +1,9 @@
 from os.path import join
 from typing import Callable, Dict, List, Tuple, Union
 
-from phdscripts.boundary import decomp_fourier_2d, extrude
+from numpy import column_stack
+
+from phdscripts.boundary import decomp_fourier_2d, extrude_array
 from phdscripts.validate import validate_required_keys
 
 REQUIRED_PARAMETERS = set({"R", "Z"})
@@ -29,12 +31,10 @@ def write_starwall_files(
         print("    Number of obtained R and Z boundary values are different.")
         return False
 
-    points: List[Tuple[float, float]] = []
-    for idx in range(len(parameters["R"])):
-        points.append((parameters["R"][idx], parameters["Z"][idx]))
+    points = column_stack([parameters["R"], parameters["Z"]])
 
-    extruded_points = extrude(extrude_method, points, wall_distance)
-    if len(extruded_points) == 0 and len(points) != 0:
+    extruded_points = extrude_array(extrude_method, points, wall_distance)
+    if extruded_points.shape[1] == 0 and len(points) != 0:
         print(
             (
                 f"    Wall extrusion method was not recognised: {extrude_method}.\n"
@@ -45,7 +45,7 @@ def write_starwall_files(
         )
         return False
 
-    fourier_coeffs = decomp_fourier_2d(extruded_points, modes)
+    fourier_coeffs = decomp_fourier_2d(extruded_points[0], modes)
 
     n_w_str = ""
     m_w_str = ""
@@ -1,17 +1,37 @@
 from .builder import build_parameter_pack
 from .parameter_pack import ParameterPack
 from .io import (
+    iter_parameter_pack,
+    iter_named_parameter_sets,
     read_parameter_pack,
     read_named_parameter_sets,
     write_parameter_pack,
     write_named_parameter_sets,
 )
+from .register import (
+    IndexedParameterSetMapping,
+    IndexedParameterSets,
+    bash_lookup_parameter_set_name,
+    has_register_index,
+    lookup_named_parameter_set,
+    lookup_parameter_set_name,
+    write_register_index,
+)
 
 __all__ = [
+    "bash_lookup_parameter_set_name",
     "build_parameter_pack",
+    "has_register_index",
+    "iter_parameter_pack",
+    "iter_named_parameter_sets",
+    "lookup_named_parameter_set",
+    "lookup_parameter_set_name",
     "read_parameter_pack",
     "read_named_parameter_sets",
     "write_parameter_pack",
     "write_named_parameter_sets",
+    "write_register_index",
+    "IndexedParameterSetMapping",
+    "IndexedParameterSets",
     "ParameterPack",
 ]
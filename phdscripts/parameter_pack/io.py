@@ -1,66 +1,219 @@
-from json import loads, dumps
-from typing import Dict, List, Union
+"""
+Serialisation of parameter packs as JSON lines, streamed to and from file such that
+memory use doesn't grow with the number of realisations.
+
+If orjson or ujson are installed, they may be used in place of the standard library's
+json module for faster (de)serialisation by passing fast=True. This is off by default,
+as they write JSON without spaces, so registers differ in layout (though not in value)
+from those written otherwise. Values holding NaN or infinities, which they can't write,
+are always written by the json module.
+"""
+
+from json import dumps as _json_dumps
+from json import loads as _json_loads
+from math import isfinite
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Tuple, Union
+
+from numpy import floating, isfinite as _array_isfinite, ndarray
 
 from . import ParameterPack
+from .register import (
+    IndexedParameterSetMapping,
+    has_register_index,
+    write_register_index_offsets,
+)
+
+_BUFFER_SIZE = 1 << 20
+
+try:
+    from orjson import OPT_SERIALIZE_NUMPY
+    from orjson import dumps as _orjson_dumps
+    from orjson import loads as _fast_loads
+
+    def _fast_dumps(obj) -> str:
+        return _orjson_dumps(obj, option=OPT_SERIALIZE_NUMPY).decode("utf-8")
+
+except ImportError:
+    try:
+        from ujson import dumps as _fast_dumps
+        from ujson import loads as _fast_loads
+    except ImportError:
+        _fast_dumps = _json_dumps
+        _fast_loads = _json_loads
+
+
+def _all_finite(obj) -> bool:
+    if isinstance(obj, dict):
+        return all(_all_finite(value) for value in obj.values())
+    elif isinstance(obj, (list, tuple)):
+        return all(_all_finite(value) for value in obj)
+    elif isinstance(obj, (float, floating)):
+        return isfinite(obj)
+    elif isinstance(obj, ndarray) and obj.dtype.kind in "fc":
+        return bool(_array_isfinite(obj).all())
+
+    return True
+
+
+def _dumps(obj) -> str:
+    # The fast path writes NaN and infinities as null (orjson) or rejects them (ujson),
+    # so those are left to the standard library, which writes them as NaN, Infinity.
+    if not _all_finite(obj):
+        return _json_dumps(obj)
+
+    # The fast path may reject types the standard library handles (e.g. ujson and
+    # NumPy scalars), in which case fall back to the standard library.
+    try:
+        return _fast_dumps(obj)
+    except (TypeError, OverflowError):
+        return _json_dumps(obj)
 
 
-def write_parameter_pack(param_pack: Union[ParameterPack, List[dict]], filepath: str):
+def _loads(s: str):
+    # The fast path rejects NaN and infinities, as written by the standard library.
+    try:
+        return _fast_loads(s)
+    except ValueError:
+        return _json_loads(s)
+
+
+def _select_dumps(fast: bool) -> Callable[[object], str]:
+    return _dumps if fast else _json_dumps
+
+
+def _select_loads(fast: bool) -> Callable[[str], object]:
+    return _loads if fast else _json_loads
+
+
+def write_parameter_pack(
+    param_pack: Union[ParameterPack, Iterable[dict]], filepath: str, fast: bool = False
+):
     """
     Serialises a parameter pack, writing a JSON dictionary for each realisation of the
-    pack on separate lines.
+    pack on separate lines. Realisations are streamed through a buffered file handle, so
+    any iterable of realisations may be passed.
     """
 
-    serialised = ""
-    for realisation in param_pack:
-        serialised += f"{dumps(realisation)}\n"
+    dumps = _select_dumps(fast)
 
-    with open(filepath, "w") as f:
-        f.write(serialised)
+    with open(filepath, "w", buffering=_BUFFER_SIZE) as f:
+        for realisation in param_pack:
+            f.write(f"{dumps(realisation)}\n")
 
 
-def write_named_parameter_sets(param_sets: Dict[str, dict], filepath: str):
+def write_named_parameter_sets(
+    param_sets: Union[Dict[str, dict], Iterable[Tuple[str, dict]]],
+    filepath: str,
+    fast: bool = False,
+    index: bool = True,
+):
     """
     Serialises a parameter pack, writing each param set's name and corresponding JSON
-    dictionary on each line. Essentially just wrapping dumps.
+    dictionary on each line. Param sets may be given either as a dictionary of param
+    sets keyed by name, or as any iterable of (name, param set) pairs which is streamed
+    through a buffered file handle.
+
+    Unless told otherwise, an offset index of the register is written alongside it so
+    that param sets can be looked up by index without scanning the register.
     """
 
-    serialised = ""
-    for name, realisation in param_sets.items():
-        serialised += f"{name}, {dumps(realisation)}\n"
+    if isinstance(param_sets, dict):
+        param_sets = param_sets.items()
 
-    with open(filepath, "w") as f:
-        f.write(serialised)
+    dumps = _select_dumps(fast)
 
+    offsets = [0]
 
-def read_parameter_pack(filepath: str) -> List[dict]:
+    with open(filepath, "wb", buffering=_BUFFER_SIZE) as f:
+        for name, realisation in param_sets:
+            line = f"{name}, {dumps(realisation)}\n".encode("utf-8")
+
+            f.write(line)
+
+            if index:
+                offsets.append(offsets[-1] + len(line))
+
+    if index:
+        write_register_index_offsets(filepath, offsets)
+
+
+def iter_parameter_pack(filepath: str, fast: bool = False) -> Iterator[dict]:
     """
-    Deserialises a parameter pack, reading each line as a separate realisation stored
-    as a JSON dictionary.
+    Lazily deserialises a parameter pack, yielding each line as a separate realisation
+    stored as a JSON dictionary.
     """
 
-    realisations = []
-    with open(filepath, "r") as f:
-        for line in f.readlines():
-            realisations.append(loads(line))
+    loads = _select_loads(fast)
+
+    with open(filepath, "r", buffering=_BUFFER_SIZE) as f:
+        for line in f:
+            if line.strip() == "":
+                continue
 
-    return realisations
+            yield loads(line)
 
 
-def read_named_parameter_sets(filepath: str) -> Dict[str, dict]:
+def iter_named_parameter_sets(
+    filepath: str, fast: bool = False
+) -> Iterator[Tuple[str, dict]]:
     """
-    Deserialises a parameter pack, reading each param set's name and corresponding JSON
-    dictionary on each line. Essentially just wrapping loads.
+    Lazily deserialises a parameter pack, yielding each param set's name and
+    corresponding JSON dictionary on each line.
     """
 
-    realisations = {}
-    with open(filepath, "r") as f:
-        for line in f.readlines():
+    loads = _select_loads(fast)
+
+    with open(filepath, "r", buffering=_BUFFER_SIZE) as f:
+        for line in f:
+            if line.strip() == "":
+                continue
+
             parts = line.split(",", maxsplit=1)
 
             # Should always be two parts, first being name of realisation and second the
             # realisation itself.
             assert len(parts) == 2
 
-            realisations[parts[0].strip()] = loads(parts[1])
+            yield parts[0].strip(), loads(parts[1])
+
+
+def read_parameter_pack(filepath: str, fast: bool = False) -> List[dict]:
+    """
+    Deserialises a parameter pack, reading each line as a separate realisation stored
+    as a JSON dictionary.
+    """
+
+    return list(iter_parameter_pack(filepath, fast))
+
+
+class _ReadParameterSets(dict):
+    """
+    Param sets read in full, closed as IndexedParameterSetMapping is, though there is
+    nothing to close.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        pass
+
+
+def read_named_parameter_sets(filepath: str, fast: bool = False) -> Mapping[str, dict]:
+    """
+    Deserialises a parameter pack, reading each param set's name and corresponding JSON
+    dictionary on each line, as a mapping of names to param sets.
+
+    If the register has an up to date offset index, the param sets are instead looked
+    up through it, only being parsed once accessed, with the register held open until
+    the mapping is closed. Either way, the mapping should be closed once done with, e.g.
+    by using it as a context manager.
+    """
+
+    if has_register_index(filepath):
+        return IndexedParameterSetMapping(filepath)
 
-    return realisations
+    return _ReadParameterSets(iter_named_parameter_sets(filepath, fast))
@@ -2,8 +2,10 @@
 Parameter pack handling iterating over every permutation of the packed parameters.
 """
 
-from math import floor
-from typing import List, Union
+from operator import index as operator_index
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from numpy import arange, asarray, empty, int64, ndarray, ones
 
 
 class ParameterPack:
@@ -16,8 +18,10 @@ class ParameterPack:
         self.__parameters = {"include": {}, "exclude": {}}
         self.__groups = []
         self.__realisations = {}
-        self.__grouped_realisation_counts = []
+        self.__axes = []
         self.__ungrouped_params = []
+        self.__constraints = []
+        self.__valid_indices = None
         self.__index = 0
         self.__count = 0
         self.__dirty = False
@@ -100,6 +104,29 @@ class ParameterPack:
 
         self.__dirty = True
 
+    def constrain(
+        self, predicate: Callable[[dict], Union[bool, ndarray]], vectorised: bool = True
+    ):
+        """
+        Adds a constraint across parameters that every realisation must satisfy,
+        realisations not satisfying it are pruned from the parameter pack.
+
+        By default the predicate is evaluated once over every combination of
+        realisations at once: it is given a dict of NumPy arrays, one per parameter,
+        and must return an array of bools (or a single bool), e.g.
+            pack.constrain(lambda p: p["jorek//eta"] <= p["jorek//visco"])
+        If the predicate can't be written with element-wise operations, passing
+        vectorised=False instead evaluates it on each realisation's dict in turn.
+        """
+
+        if self.__iterating:
+            raise RuntimeError(
+                "Cannot change constraints while iterating parameter pack."
+            )
+
+        self.__constraints.append((predicate, vectorised))
+        self.__dirty = True
+
     def __repr__(self):
         return repr(self.__parameters)
 
@@ -117,12 +144,30 @@ class ParameterPack:
         accounting for parameter groupings.
         """
 
+        self.__axes = []
+
         if len(self.__realisations) == 0:
             self.__count = 0
             return
 
         self.__count = 1
-        self.__grouped_realisation_counts = []
+
+        # Each group, and each ungrouped parameter, forms one axis of a mixed-radix
+        # index into the combinations of realisations. Given the stride of an axis is
+        # the product of the counts of all axes preceding it, the realisation index of
+        # that axis for combination idx is then:
+        #       (idx // stride) % count
+        # which produces an index structure across parameters like:
+        #       0 0 0 0 0
+        #       1 0 0 0 0
+        #       0 0 1 0 0
+        #       1 0 1 0 0
+        #       0 0 2 0 0
+        #       1 0 2 0 0
+        #       0 0 0 1 0
+        #       1 0 0 1 0
+        # etc. where in this case the first three parameters had 2, 1 and 3
+        # realisations respectively.
 
         # Go through each group first, finding shortest value count held by a parameter
         # in it.
@@ -132,6 +177,7 @@ class ParameterPack:
             # effect.
             if group[0] not in self.__realisations.keys():
                 self.__count = 0
+                self.__axes = []
                 return
 
             # First param exists, start with it as grouped param with least
@@ -143,14 +189,15 @@ class ParameterPack:
             for param in group[1:]:
                 if param not in self.__realisations:
                     self.__count = 0
+                    self.__axes = []
                     return
 
                 if shortest > len(self.__realisations[param]):
                     shortest = len(self.__realisations[param])
 
-            # Mark this count for iterating later.
+            # Mark this axis for indexing later.
 
-            self.__grouped_realisation_counts.append(shortest)
+            self.__axes.append((group, shortest, self.__count))
 
             # Number of realisation combinations increases as product against number of
             # shortest realisations held by a param in this group.
@@ -161,10 +208,14 @@ class ParameterPack:
         for param in self.__ungrouped_params:
             if param not in self.__realisations:
                 self.__count = 0
+                self.__axes = []
                 return
 
-            if isinstance(self.__realisations[param], list):
-                self.__count *= len(self.__realisations[param])
+            count = len(self.__realisations[param])
+
+            self.__axes.append(([param], count, self.__count))
+
+            self.__count *= count
 
     def __calculate_realisations(self) -> None:
         """
@@ -181,8 +232,8 @@ class ParameterPack:
 
         for param, vals in self.__parameters["include"].items():
             if param in self.__parameters["exclude"]:
-                exclude_vals = self.__parameters["exclude"][param]
-                self.__realisations[param] = [x for x in vals if x not in exclude_vals]
+                is_excluded = self.__exclusion_test(self.__parameters["exclude"][param])
+                self.__realisations[param] = [x for x in vals if not is_excluded(x)]
             else:
                 self.__realisations[param] = vals
 
@@ -207,10 +258,73 @@ class ParameterPack:
 
         self.__calculate_combination_count()
 
+        # Prune any combinations not satisfying the constraints placed on them.
+
+        self.__apply_constraints()
+
         # Done!
 
         self.__dirty = False
 
+    @staticmethod
+    def __exclusion_test(exclude_vals: list) -> Callable[[object], bool]:
+        """
+        Builds a test for whether a value is one of those excluded, using a hashed
+        lookup for all values that can be hashed (i.e. all but list-like values).
+        """
+
+        hashable = set()
+        unhashable = []
+        for x in exclude_vals:
+            try:
+                hashable.add(x)
+            except TypeError:
+                unhashable.append(x)
+
+        def is_excluded(x) -> bool:
+            try:
+                if x in hashable:
+                    return True
+            except TypeError:
+                pass
+
+            return len(unhashable) != 0 and x in unhashable
+
+        return is_excluded
+
+    def __apply_constraints(self) -> None:
+        """
+        Evaluates each constraint over every combination of realisations, keeping the
+        indices of those combinations satisfying all of them.
+        """
+
+        self.__valid_indices = None
+
+        if len(self.__constraints) == 0 or self.__count == 0:
+            return
+
+        indices = arange(self.__count, dtype=int64)
+
+        fields = None
+        if any(vectorised for _, vectorised in self.__constraints):
+            fields = self.__fields(*self.__columns(indices))
+
+        valid = ones(self.__count, dtype=bool)
+        for predicate, vectorised in self.__constraints:
+            if vectorised:
+                valid &= asarray(predicate(fields), dtype=bool)
+            else:
+                valid &= asarray(
+                    [
+                        bool(predicate(self.__realisation_at(index)))
+                        for index in range(self.__count)
+                    ],
+                    dtype=bool,
+                )
+
+        self.__valid_indices = indices[valid]
+        self.__count = len(self.__valid_indices)
+
     def __iter__(self):
         self.__iterating = True
         self.__index = 0
@@ -223,92 +337,184 @@ class ParameterPack:
             self.__iterating = False
             raise StopIteration
 
-        param_set = {}
+        param_set = self.__realisation_at(self.__index)
+
+        self.__index += 1
 
-        idx = self.__index
-        prod_idx = 1
+        return param_set
 
-        # Handle grouped parameters.
+    def __getitem__(self, index: int) -> dict:
+        return self.realisation_at(index)
 
-        for group_idx in range(len(self.__groups)):
-            group = self.__groups[group_idx]
-            count = self.__grouped_realisation_counts[group_idx]
+    def realisation_at(self, index: int) -> dict:
+        """
+        Obtains the realisation at the given index of the parameter pack, as would be
+        produced by the index-th step of iterating over the pack, without needing to
+        iterate over any of the realisations preceding it.
+        """
 
-            if count == 1:
-                for param in group:
-                    if isinstance(self.__realisations[param], list):
-                        param_set[param] = self.__realisations[param][0]
-                    else:
-                        param_set[param] = self.__realisations[param]
-                continue
+        # Any integer type, e.g. NumPy's, is accepted, as for indexing a list.
+        try:
+            index = operator_index(index)
+        except TypeError:
+            raise TypeError(
+                f"Parameter pack indices must be integers, not {type(index).__name__}."
+            )
 
-            if prod_idx == 1:
-                param_idx = idx % count
-            else:
-                # This maths produces indexing that gives us an index structure across
-                # parameters like:
-                #       0 0 0 0 0
-                #       1 0 0 0 0
-                #       0 0 1 0 0
-                #       1 0 1 0 0
-                #       0 0 2 0 0
-                #       1 0 2 0 0
-                #       0 0 0 1 0
-                #       1 0 0 1 0
-                #       0 0 1 1 0
-                #       1 0 1 1 0
-                #       0 0 2 1 0
-                #       1 0 2 1 0
-                # etc. where in this case the first three parameters had 2, 1
-                # and 3 realisations respectively.
-                param_idx = floor(float(idx) / float(prod_idx)) % count
-
-            for param in group:
-                param_set[param] = self.__realisations[param][param_idx]
+        self.__calculate_realisations()
 
-            prod_idx *= count
+        if index < 0:
+            index += self.__count
 
-        # Handle ungrouped parameters.
+        if index < 0 or index >= self.__count:
+            raise IndexError(
+                f"Parameter pack index {index} out of range for {self.__count} "
+                "realisations."
+            )
 
-        for param in self.__ungrouped_params:
-            realisations = self.__realisations[param]
+        return self.__realisation_at(index)
 
-            if not isinstance(realisations, list):
-                param_set[param] = realisations
-                continue
+    def iter_slice(
+        self, start: Optional[int] = None, stop: Optional[int] = None, step: int = 1
+    ) -> Iterator[dict]:
+        """
+        Iterates over only those realisations selected by the given slice of the
+        parameter pack's indices, with the same semantics as slicing a list. No work is
+        done for realisations that are skipped, and unlike iterating over the pack
+        itself, any number of these iterators may be in use at once.
+        """
 
-            if len(realisations) == 1:
-                param_set[param] = realisations[0]
-                continue
+        self.__calculate_realisations()
 
-            if prod_idx == 1:
-                param_idx = idx % len(realisations)
-            else:
-                # This maths produces indexing that gives us an index structure across
-                # parameters like:
-                #       0 0 0 0 0
-                #       1 0 0 0 0
-                #       0 0 1 0 0
-                #       1 0 1 0 0
-                #       0 0 2 0 0
-                #       1 0 2 0 0
-                #       0 0 0 1 0
-                #       1 0 0 1 0
-                #       0 0 1 1 0
-                #       1 0 1 1 0
-                #       0 0 2 1 0
-                #       1 0 2 1 0
-                # etc. where in this case the first three parameters had 2, 1
-                # and 3 realisations respectively.
-                param_idx = floor(float(idx) / float(prod_idx)) % len(realisations)
-
-            param_set[param] = realisations[param_idx]
-
-            prod_idx *= len(realisations)
+        for index in range(*slice(start, stop, step).indices(self.__count)):
+            yield self.__realisation_at(index)
 
-        self.__index += 1
+    def shard(self, k: int, n: int) -> Iterator[dict]:
+        """
+        Iterates over the k-th of n disjoint, contiguous shards of the parameter pack's
+        realisations. Together the n shards cover every realisation exactly once, with
+        shard sizes differing by at most one.
+        """
+
+        if n < 1:
+            raise ValueError(f"Number of shards must be positive, got {n}.")
+
+        if k < 0 or k >= n:
+            raise ValueError(f"Shard index {k} out of range for {n} shards.")
+
+        self.__calculate_realisations()
+
+        return self.iter_slice(k * self.__count // n, (k + 1) * self.__count // n)
+
+    def __realisation_at(self, index: int) -> dict:
+        """
+        Builds the realisation at the given index, assuming realisations are calculated
+        and the index is in range.
+        """
+
+        # Once constraints have been applied, indices into the pack are indices into
+        # the combinations that satisfied them.
+        if self.__valid_indices is not None:
+            index = int(self.__valid_indices[index])
+
+        param_set = {}
+
+        for params, count, stride in self.__axes:
+            param_idx = (index // stride) % count
+
+            for param in params:
+                param_set[param] = self.__realisations[param][param_idx]
 
         return param_set
 
+    def to_columns(self) -> Tuple[Dict[str, ndarray], Dict[str, list]]:
+        """
+        Produces every realisation of the parameter pack in a single vectorised pass,
+        as one integer index column per parameter alongside a lookup table of values
+        per parameter. The value of a parameter in realisation idx is then:
+            lookups[param][columns[param][idx]]
+        Parameters in the same group share the same index column.
+        """
+
+        self.__calculate_realisations()
+
+        if self.__valid_indices is not None:
+            return self.__columns(self.__valid_indices)
+
+        return self.__columns(arange(self.__count, dtype=int64))
+
+    def __columns(self, indices: ndarray) -> Tuple[Dict[str, ndarray], Dict[str, list]]:
+        """
+        Produces the index columns and lookup tables for the given combinations of
+        realisations, ignoring any constraints.
+        """
+
+        columns: Dict[str, ndarray] = {}
+        lookups: Dict[str, list] = {}
+
+        for params, count, stride in self.__axes:
+            column = (indices // stride) % count
+
+            for param in params:
+                columns[param] = column
+                lookups[param] = self.__realisations[param][:count]
+
+        return columns, lookups
+
+    def to_array(self) -> ndarray:
+        """
+        Produces every realisation of the parameter pack in a single vectorised pass,
+        as a NumPy structured array with one field per parameter and one row per
+        realisation, in the same order as iterating over the pack.
+        """
+
+        fields = self.__fields(*self.to_columns())
+
+        table = empty(
+            self.__count,
+            dtype=[(param, field.dtype) for param, field in fields.items()],
+        )
+        for param, field in fields.items():
+            table[param] = field
+
+        return table
+
+    def __fields(
+        self, columns: Dict[str, ndarray], lookups: Dict[str, list]
+    ) -> Dict[str, ndarray]:
+        """
+        Converts index columns into columns of the values they index.
+        """
+
+        return {
+            param: self.__lookup_table(lookups[param])[column]
+            for param, column in columns.items()
+        }
+
+    @staticmethod
+    def __lookup_table(values: list) -> ndarray:
+        """
+        Converts a list of realisations of a parameter into an array, falling back to an
+        object array where NumPy would otherwise reshape, coerce or reject the values
+        (e.g. list valued parameters, or a mix of strings and numbers).
+        """
+
+        try:
+            table = asarray(values)
+
+            if table.ndim == 1 and (
+                table.dtype.kind != "U" or all(isinstance(x, str) for x in values)
+            ):
+                return table
+        except ValueError:
+            # Ragged list-valued parameters can't be made into an array directly.
+            pass
+
+        table = empty(len(values), dtype=object)
+        for idx, value in enumerate(values):
+            table[idx] = value
+
+        return table
+
     def __str__(self):
         return str(repr(self.__parameters))
@@ -0,0 +1,243 @@
+"""
+Fixed-width offset index over a register of named parameter sets, allowing the param
+set at any index (e.g. a job array index) to be looked up by seeking straight to it
+rather than scanning the register line by line.
+
+The index sits alongside the register with REGISTER_INDEX_SUFFIX appended to its name,
+and holds, for each of the N lines of the register plus the end of the register, the
+byte offset of the start of that line as a zero-padded decimal integer of
+OFFSET_WIDTH characters followed by a newline. The offsets of line i are then at
+byte (OFFSET_WIDTH + 1) * i of the index.
+"""
+
+from collections.abc import Mapping, Sequence
+from json import loads
+from mmap import ACCESS_READ, mmap
+from operator import index as operator_index
+from os.path import getmtime, getsize, isfile
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+REGISTER_INDEX_SUFFIX = ".idx"
+
+OFFSET_WIDTH = 20
+_RECORD_WIDTH = OFFSET_WIDTH + 1
+
+
+def register_index_filepath(register_filepath: str) -> str:
+    return f"{register_filepath}{REGISTER_INDEX_SUFFIX}"
+
+
+def has_register_index(register_filepath: str) -> bool:
+    """
+    Determines if an index exists for the register that is at least as new as it.
+    """
+
+    index_filepath = register_index_filepath(register_filepath)
+
+    return isfile(index_filepath) and getmtime(index_filepath) >= getmtime(
+        register_filepath
+    )
+
+
+def write_register_index_offsets(register_filepath: str, offsets: Iterable[int]):
+    """
+    Writes the index of a register given the byte offsets of the start of each of its
+    lines, followed by the offset of the end of the register.
+    """
+
+    with open(register_index_filepath(register_filepath), "w") as f:
+        for offset in offsets:
+            f.write(f"{offset:0{OFFSET_WIDTH}d}\n")
+
+
+def write_register_index(register_filepath: str):
+    """
+    Builds the index of an existing register in a single pass over it.
+    """
+
+    offsets = [0]
+    with open(register_filepath, "rb") as f:
+        for line in f:
+            offsets.append(offsets[-1] + len(line))
+
+    write_register_index_offsets(register_filepath, offsets)
+
+
+def _split_register_line(line: str) -> Tuple[str, str]:
+    parts = line.split(",", maxsplit=1)
+
+    # Should always be two parts, first being name of realisation and second the
+    # realisation itself.
+    assert len(parts) == 2
+
+    return parts[0].strip(), parts[1]
+
+
+class IndexedParameterSets(Sequence):
+    """
+    Read-only view of a register of named parameter sets, with the register and its
+    index memory-mapped such that only those param sets actually accessed are ever read
+    or parsed. Each item is a (name, param set) pair.
+    """
+
+    def __init__(self, register_filepath: str):
+        if not has_register_index(register_filepath):
+            write_register_index(register_filepath)
+
+        self._register_file = open(register_filepath, "rb")
+        self._index_file = open(register_index_filepath(register_filepath), "rb")
+
+        self._count = getsize(register_index_filepath(register_filepath))
+        self._count = self._count // _RECORD_WIDTH - 1
+
+        # Empty files can't be memory-mapped.
+        self._register: Optional[mmap] = None
+        self._index: Optional[mmap] = None
+        if self._count > 0:
+            self._register = mmap(self._register_file.fileno(), 0, access=ACCESS_READ)
+            self._index = mmap(self._index_file.fileno(), 0, access=ACCESS_READ)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        if self._register is not None:
+            self._register.close()
+            self._index.close()
+
+        self._register_file.close()
+        self._index_file.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _offset(self, index: int) -> int:
+        start = index * _RECORD_WIDTH
+
+        return int(self._index[start : start + OFFSET_WIDTH])
+
+    def _line(self, index: int) -> str:
+        try:
+            index = operator_index(index)
+        except TypeError:
+            raise TypeError(
+                f"Register indices must be integers, not {type(index).__name__}."
+            )
+
+        if index < 0:
+            index += self._count
+
+        if index < 0 or index >= self._count:
+            raise IndexError(
+                f"Register index {index} out of range for {self._count} param sets."
+            )
+
+        return self._register[self._offset(index) : self._offset(index + 1)].decode(
+            "utf-8"
+        )
+
+    def name_at(self, index: int) -> str:
+        """
+        Obtains just the name of the param set at the given index, without parsing the
+        param set itself.
+        """
+
+        return _split_register_line(self._line(index))[0]
+
+    def __getitem__(self, index: int) -> Tuple[str, dict]:
+        name, param_set = _split_register_line(self._line(index))
+
+        return name, loads(param_set)
+
+    def names(self) -> List[str]:
+        return [self.name_at(index) for index in range(self._count)]
+
+
+class IndexedParameterSetMapping(Mapping):
+    """
+    Read-only view of a register of named parameter sets as a mapping of names to param
+    sets, as read_named_parameter_sets would give. Only the names are read up front,
+    each param set being parsed once first accessed. Holds the register open until
+    closed, so is best used as a context manager.
+    """
+
+    def __init__(self, register_filepath: str):
+        self._param_sets = IndexedParameterSets(register_filepath)
+
+        # As for a dictionary built from the register, later param sets of the same
+        # name take precedence.
+        self._indices: Dict[str, int] = {
+            name: index for index, name in enumerate(self._param_sets.names())
+        }
+        self._parsed: Dict[str, dict] = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def close(self):
+        self._param_sets.close()
+
+    def __len__(self) -> int:
+        return len(self._indices)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._indices)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._indices
+
+    def __getitem__(self, name: str) -> dict:
+        if name not in self._parsed:
+            self._parsed[name] = self._param_sets[self._indices[name]][1]
+
+        return self._parsed[name]
+
+
+def lookup_named_parameter_set(register_filepath: str, index: int) -> Tuple[str, dict]:
+    """
+    Looks up the name and param set at the given index of a register.
+    """
+
+    with IndexedParameterSets(register_filepath) as param_sets:
+        return param_sets[index]
+
+
+def lookup_parameter_set_name(register_filepath: str, index: int) -> str:
+    """
+    Looks up the name of the param set at the given index of a register.
+    """
+
+    with IndexedParameterSets(register_filepath) as param_sets:
+        return param_sets.name_at(index)
+
+
+def bash_lookup_parameter_set_name(
+    register_filepath: str,
+    index_variable: str = "JOB_INDEX",
+    name_variable: str = "param_set_name",
+) -> str:
+    """
+    Produces a bash snippet, for use in job scripts, setting the named variable to the
+    name of the param set at the index given by another variable. Offsets are read from
+    the register's index, and both files are read by seeking to those offsets so the
+    cost of the lookup does not depend on the size of the register.
+    """
+
+    index_filepath = register_index_filepath(register_filepath)
+
+    return f"""read -r param_set_start param_set_end <<< "$(
+    tail -c +$((${{{index_variable}}} * {_RECORD_WIDTH} + 1)) {index_filepath} \\
+        | head -c {2 * _RECORD_WIDTH} | tr '\\n' ' '
+)"
+param_set="$(
+    tail -c +$((10#${{param_set_start}} + 1)) {register_filepath} \\
+        | head -c $((10#${{param_set_end}} - 10#${{param_set_start}}))
+)"
+IFS=',' read -ra param_set_parts <<< "$param_set"
+{name_variable}="${{param_set_parts[0]}}\""""
@@ -0,0 +1,60 @@
+"""
+Command line access to registers of named parameter sets, e.g. for job scripts to
+obtain the param set for their job index:
+
+    python -m phdscripts.register lookup <register> <index> [--params]
+    python -m phdscripts.register index <register>
+"""
+
+from argparse import ArgumentParser
+from json import dumps
+from typing import List, Optional
+
+from phdscripts.parameter_pack import (
+    lookup_named_parameter_set,
+    lookup_parameter_set_name,
+    write_register_index,
+)
+
+
+def main(args: Optional[List[str]] = None) -> int:
+    parser = ArgumentParser(
+        prog="python -m phdscripts.register",
+        description="Look up param sets in, or index, a param set register.",
+    )
+    commands = parser.add_subparsers(dest="command")
+
+    lookup_parser = commands.add_parser(
+        "lookup", help="Print the name of the param set at the given index."
+    )
+    lookup_parser.add_argument("register")
+    lookup_parser.add_argument("index", type=int)
+    lookup_parser.add_argument(
+        "--params",
+        action="store_true",
+        help="Print the param set as a JSON dictionary instead of its name.",
+    )
+
+    index_parser = commands.add_parser(
+        "index", help="(Re)build the offset index of an existing register."
+    )
+    index_parser.add_argument("register")
+
+    parsed = parser.parse_args(args)
+
+    if parsed.command == "lookup":
+        if parsed.params:
+            print(dumps(lookup_named_parameter_set(parsed.register, parsed.index)[1]))
+        else:
+            print(lookup_parameter_set_name(parsed.register, parsed.index))
+    elif parsed.command == "index":
+        write_register_index(parsed.register)
+    else:
+        parser.print_help()
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
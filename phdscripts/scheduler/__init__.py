@@ -1,4 +1,5 @@
 from .driver import SchedulerDriver
+from .graph import JobGraph
 from .register import SchedulerRegister, get_default_register
 
-__all__ = ["get_default_register", "SchedulerDriver", "SchedulerRegister"]
+__all__ = ["get_default_register", "JobGraph", "SchedulerDriver", "SchedulerRegister"]
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import List, Optional, Tuple
 
 
 class SchedulerDriver(ABC):
@@ -35,3 +35,32 @@ class SchedulerDriver(ABC):
         The job array ID is returned by this function.
         """
         pass
+
+    @staticmethod
+    @abstractmethod
+    def array_batch_tasks(
+        job_script: str,
+        indices: List[int],
+        jobs_parallel: int = 1,
+        after: List[str] = [],
+        after_tasks: List[Tuple[str, int]] = [],
+        after_corresponding: List[str] = [],
+    ) -> str:
+        """
+        Schedules the tasks of the given indices of an array of jobs, to be ran in
+        batches once:
+            - every job of each of the arrays in after has completed,
+            - each (array, index) task in after_tasks has completed,
+            - for each task, the task of the same index of each of the arrays in
+              after_corresponding has completed.
+        The job array ID is returned by this function.
+        """
+        pass
+
+    def array_batch_tasks_many(self, submissions: List[dict]) -> List[str]:
+        """
+        Schedules many arrays of tasks, each given as the keyword arguments of
+        array_batch_tasks, none of which depend on another. The job array IDs are
+        returned in the same order. Drivers may submit them concurrently.
+        """
+        return [self.array_batch_tasks(**submission) for submission in submissions]
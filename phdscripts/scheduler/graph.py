@@ -0,0 +1,243 @@
+"""
+Graph of job arrays with dependencies between individual tasks of those arrays, such
+that e.g. a JOREK time evolution need only wait on the one STARWALL task it needs rather
+than on every task of the STARWALL array.
+
+Arrays are submitted in dependency order. Tasks of an array with the same dependencies
+are submitted together as a sub-array keeping their indices, so that JOB_INDEX is the
+same as if the array were submitted whole. Tasks depending only on the corresponding
+task (i.e. of the same index) of an earlier array are submitted together with a
+corresponding dependency, such that the usual one-to-one chaining of arrays still needs
+only one submission.
+
+The ID of an array submitted in parts is the IDs of those parts joined by ":".
+"""
+
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+from .driver import SchedulerDriver
+
+# (array name, task index), with index None for a dependency on the whole array.
+TaskRef = Tuple[str, Optional[int]]
+
+# (IDs of whole arrays, (ID, index) of tasks, IDs of arrays with corresponding tasks) to
+# wait on.
+DependencyKey = Tuple[FrozenSet[str], FrozenSet[Tuple[str, int]], FrozenSet[str]]
+
+
+class _Array:
+    def __init__(self, job_script: str, job_count: int, jobs_parallel: int):
+        self.job_script = job_script
+        self.job_count = job_count
+        self.jobs_parallel = jobs_parallel
+        self.dependencies: List[Set[TaskRef]] = [set() for _ in range(job_count)]
+
+
+class JobGraph:
+    """
+    Graph of named job arrays, with dependencies declared per task.
+    """
+
+    def __init__(self):
+        self._arrays: Dict[str, _Array] = {}
+
+    def add_array(
+        self, name: str, job_script: str, job_count: int, jobs_parallel: int = 1
+    ) -> None:
+        if name in self._arrays:
+            raise ValueError(f"An array with the name {name} is already in the graph.")
+
+        self._arrays[name] = _Array(job_script, job_count, jobs_parallel)
+
+    def has_array(self, name: str) -> bool:
+        return name in self._arrays
+
+    def add_dependency(
+        self, name: str, index: int, on: str, on_index: Optional[int] = None
+    ) -> None:
+        """
+        Makes task index of the named array wait on task on_index of the array on, or
+        on the whole of that array if on_index is None.
+        """
+
+        if name not in self._arrays or on not in self._arrays:
+            raise ValueError(f"No array with the name {name} or {on} is in the graph.")
+
+        if on_index is not None and not 0 <= on_index < self._arrays[on].job_count:
+            raise ValueError(f"Array {on} has no task {on_index}.")
+
+        self._arrays[name].dependencies[index].add((on, on_index))
+
+    def add_array_dependency(
+        self, name: str, on: str, corresponding: bool = True
+    ) -> None:
+        """
+        Makes every task of the named array wait on the array on. If corresponding, each
+        task waits only on the task of the same index, where one exists, and otherwise
+        on the whole array.
+        """
+
+        for index in range(self._arrays[name].job_count):
+            if corresponding and index < self._arrays[on].job_count:
+                self.add_dependency(name, index, on, index)
+            else:
+                self.add_dependency(name, index, on)
+
+    def _order(self) -> List[str]:
+        """
+        Orders the arrays such that each comes after all arrays it depends on.
+        """
+
+        order = []
+        visiting = set()
+
+        def _visit(name: str):
+            if name in order:
+                return
+            if name in visiting:
+                raise ValueError(f"Array {name} depends on itself within the graph.")
+
+            visiting.add(name)
+            for dependencies in self._arrays[name].dependencies:
+                for on, _ in dependencies:
+                    _visit(on)
+            visiting.remove(name)
+
+            order.append(name)
+
+        for name in self._arrays.keys():
+            _visit(name)
+
+        return order
+
+    def _groups(
+        self,
+        name: str,
+        task_ids: Dict[str, List[Optional[str]]],
+        array_ids: Dict[str, str],
+        run_after: Optional[str],
+    ) -> Dict[DependencyKey, List[int]]:
+        """
+        Groups the tasks of the named array into those to be submitted together, given
+        the IDs of the arrays (and of the submissions of their tasks) it depends on.
+        """
+
+        array = self._arrays[name]
+
+        # Tasks are first grouped by the tasks they wait on. Tasks that would then be
+        # submitted alone, yet wait on the task of the same index of some array, are
+        # instead grouped by those arrays, waiting on corresponding tasks.
+        explicit_groups: Dict[DependencyKey, List[int]] = {}
+        corresponding_keys: Dict[int, DependencyKey] = {}
+
+        for index, dependencies in enumerate(array.dependencies):
+            after = set()
+            after_tasks = set()
+            after_corresponding = set()
+
+            for on, on_index in dependencies:
+                if on_index is None:
+                    # An empty array has no ID, nor anything to wait on.
+                    if array_ids[on] != "":
+                        after.add(array_ids[on])
+                elif on_index == index:
+                    after_corresponding.add(task_ids[on][on_index])
+                else:
+                    after_tasks.add((task_ids[on][on_index], on_index))
+
+            if len(dependencies) == 0 and run_after is not None:
+                after.add(run_after)
+
+            explicit_key = (
+                frozenset(after),
+                frozenset(
+                    after_tasks | {(job_id, index) for job_id in after_corresponding}
+                ),
+                frozenset(),
+            )
+            explicit_groups.setdefault(explicit_key, []).append(index)
+
+            corresponding_keys[index] = (
+                frozenset(after),
+                frozenset(after_tasks),
+                frozenset(after_corresponding),
+            )
+
+        groups: Dict[DependencyKey, List[int]] = {}
+
+        for key, indices in explicit_groups.items():
+            if len(indices) == 1:
+                key = corresponding_keys[indices[0]]
+
+            groups.setdefault(key, []).extend(indices)
+
+        return groups
+
+    def submit(
+        self, scheduler: SchedulerDriver, run_after: Optional[str] = None
+    ) -> Dict[str, str]:
+        """
+        Submits every array of the graph to the scheduler, with tasks that have no
+        dependencies within the graph waiting on run_after if given. Returns the ID of
+        each array.
+
+        Arrays are submitted in waves of those whose dependencies have all been
+        submitted, all submissions of a wave being given to the scheduler at once.
+        """
+
+        # ID of the submission each task of each array was part of.
+        task_ids: Dict[str, List[Optional[str]]] = {}
+        array_ids: Dict[str, str] = {}
+
+        remaining = self._order()
+
+        while len(remaining) > 0:
+            wave = [
+                name
+                for name in remaining
+                if all(
+                    on in array_ids
+                    for dependencies in self._arrays[name].dependencies
+                    for on, _ in dependencies
+                )
+            ]
+
+            submissions = []
+            submitted_indices = []
+
+            for name in wave:
+                array = self._arrays[name]
+
+                for (after, after_tasks, after_corresponding), indices in self._groups(
+                    name, task_ids, array_ids, run_after
+                ).items():
+                    submissions.append(
+                        {
+                            "job_script": array.job_script,
+                            "indices": indices,
+                            "jobs_parallel": array.jobs_parallel,
+                            "after": sorted(after),
+                            "after_tasks": sorted(after_tasks),
+                            "after_corresponding": sorted(after_corresponding),
+                        }
+                    )
+                    submitted_indices.append((name, indices))
+
+            job_ids = scheduler.array_batch_tasks_many(submissions)
+
+            for name in wave:
+                task_ids[name] = [None] * self._arrays[name].job_count
+
+            ids: Dict[str, List[str]] = {name: [] for name in wave}
+
+            for (name, indices), job_id in zip(submitted_indices, job_ids):
+                for index in indices:
+                    task_ids[name][index] = job_id
+                ids[name].append(job_id)
+
+            for name in wave:
+                array_ids[name] = ":".join(ids[name])
+
+            remaining = [name for name in remaining if name not in array_ids]
+
+        return array_ids
@@ -1,17 +1,74 @@
 """
 Functions that run locally as if using a scheduler.
+
+Submitted arrays are given synthetic job IDs and ran by an event loop in a background
+thread, each task starting as soon as the tasks it depends on have completed. Each array
+runs at most jobs_parallel tasks at a time and, if cpu_slots is given, at most that many
+tasks run at a time across all arrays. As with a scheduler, a task whose dependencies
+fail is never ran, and counts as failed. Dependencies on job IDs not given out by the
+driver are taken to be met.
+
+The background thread runs until no submitted task remains, so a script submitting jobs
+only exits once they are complete. Use wait to block until then within a script.
+
+Tasks are ran by LocalEngine, with the output of each written to
+    <job script>.<job ID>_<index>.out and .err
+in the directory of the job script (or log_dir if given), and their exit code, wall time
+and peak memory use available from task_stats once complete.
 """
 
-from functools import partial
-from multiprocessing import Pool
-from os import environ
-from subprocess import DEVNULL, run
-from typing import Optional
+from asyncio import Future, Semaphore, ensure_future, new_event_loop, set_event_loop
+from os.path import basename, dirname, join as join_path
+from threading import Condition, Lock, Thread
+from typing import Dict, List, Optional, Tuple
 
 from .. import SchedulerDriver
+from .engine import LocalEngine, TaskStats
+
+
+class _LocalArray:
+    def __init__(
+        self,
+        job_id: str,
+        job_script: str,
+        indices: List[int],
+        jobs_parallel: int,
+        after: List[str],
+        after_tasks: List[Tuple[str, int]],
+        after_corresponding: List[str],
+    ):
+        self.job_id = job_id
+        self.job_script = job_script
+        self.indices = indices
+        self.jobs_parallel = jobs_parallel
+        self.after = after
+        self.after_tasks = after_tasks
+        self.after_corresponding = after_corresponding
+
+        # Limit of tasks of the array running at a time, created once started.
+        self.semaphore: Optional[Semaphore] = None
+
+        # Futures of the success of each task, created once the array is started.
+        self.results: Dict[int, Future] = {}
+        self.succeeded: Dict[int, bool] = {}
+        self.stats: Dict[int, TaskStats] = {}
 
 
 class LocalDriver(SchedulerDriver):
+    def __init__(self, cpu_slots: Optional[int] = None, log_dir: Optional[str] = None):
+        self.cpu_slots = cpu_slots
+        self.log_dir = log_dir
+
+        self._lock = Lock()
+        self._completed = Condition(self._lock)
+
+        self._arrays: Dict[str, _LocalArray] = {}
+        self._incomplete_tasks = 0
+
+        self._loop = None
+        self._engine: Optional[LocalEngine] = None
+        self._cpu_slots_semaphore: Optional[Semaphore] = None
+
     @staticmethod
     def write_job_script(filename: str, contents: str, **kwargs):
         """
@@ -35,14 +92,12 @@ class LocalDriver(SchedulerDriver):
             f.write(contents)
 
     @staticmethod
-    def _execute_local_script(index: int, job_script: str):
-        env = environ.copy()
-        env["JOB_INDEX"] = f"{index}"
-        # TODO(Matthew): Probably want to optionally log the stdout/err streams.
-        run(["/bin/bash", f"{job_script}"], env=env, stdout=DEVNULL, stderr=DEVNULL)
+    def _job_ids(job_id: str) -> List[str]:
+        # IDs of arrays submitted in parts are joined by ":".
+        return [part for part in job_id.split(":") if part != ""]
 
-    @staticmethod
     def array_batch_jobs(
+        self,
         job_script: str,
         job_count: int,
         jobs_parallel: int = 1,
@@ -50,13 +105,202 @@ class LocalDriver(SchedulerDriver):
         blocking: bool = False,
     ) -> str:
         """
-        Handles running an array of jobs in sequence, locally, as if submitted as an
-        array job to a scheduler.
+        Handles running an array of jobs, locally, as if submitted as an array job to a
+        scheduler. The synthetic job array ID is returned by this function.
         """
-        # TODO(Matthew): array_dependency unused. Use map_async and watch for completion
-        #                of such coded array (this means coding this array ofc!).
-        with Pool(jobs_parallel) as thread_pool:
-            thread_pool.map(
-                partial(LocalDriver._execute_local_script, job_script=job_script),
-                list(range(0, job_count)),
+        dependencies = [] if array_dependency is None else [array_dependency]
+
+        return self.array_batch_tasks(
+            job_script,
+            list(range(job_count)),
+            jobs_parallel,
+            after=dependencies if blocking else [],
+            after_corresponding=[] if blocking else dependencies,
+        )
+
+    def array_batch_tasks(
+        self,
+        job_script: str,
+        indices: List[int],
+        jobs_parallel: int = 1,
+        after: List[str] = [],
+        after_tasks: List[Tuple[str, int]] = [],
+        after_corresponding: List[str] = [],
+    ) -> str:
+        """
+        Handles running the tasks of the given indices of an array of jobs, locally, as
+        if submitted as an array job to a scheduler. The synthetic job array ID is
+        returned by this function.
+        """
+        with self._lock:
+            job_id = f"{len(self._arrays) + 1}"
+
+            array = _LocalArray(
+                job_id,
+                job_script,
+                list(indices),
+                jobs_parallel,
+                [part for dep_id in after for part in self._job_ids(dep_id)],
+                list(after_tasks),
+                [
+                    part
+                    for dep_id in after_corresponding
+                    for part in self._job_ids(dep_id)
+                ],
+            )
+
+            self._arrays[job_id] = array
+            self._incomplete_tasks += len(array.indices)
+
+            if self._loop is None:
+                self._start_loop()
+
+            self._loop.call_soon_threadsafe(
+                self._start_array, self._loop, self._engine, array
+            )
+
+        return job_id
+
+    def wait(self, job_id: Optional[str] = None) -> bool:
+        """
+        Blocks until every task of the given job (or jobs, joined by ":"), or of every
+        job if none is given, has completed. Returns if all of those tasks succeeded.
+        """
+        with self._completed:
+            job_ids = (
+                list(self._arrays.keys()) if job_id is None else self._job_ids(job_id)
+            )
+            arrays = [self._arrays[job_id] for job_id in job_ids]
+
+            self._completed.wait_for(
+                lambda: all(
+                    len(array.succeeded) == len(array.indices) for array in arrays
+                )
             )
+
+            return all(all(array.succeeded.values()) for array in arrays)
+
+    def task_stats(self, job_id: str) -> Dict[int, TaskStats]:
+        """
+        Obtains the stats of each completed task of the given job (or jobs, joined by
+        ":"), by index. Tasks never ran, as their dependencies failed, have no stats.
+        """
+        with self._lock:
+            return {
+                index: stats
+                for part in self._job_ids(job_id)
+                for index, stats in self._arrays[part].stats.items()
+            }
+
+    def _log_path(self, array: _LocalArray, index: int, extension: str) -> str:
+        log_dir = (
+            self.log_dir if self.log_dir is not None else dirname(array.job_script)
+        )
+
+        return join_path(
+            log_dir, f"{basename(array.job_script)}.{array.job_id}_{index}.{extension}"
+        )
+
+    def _start_loop(self) -> None:
+        self._loop = new_event_loop()
+        # Each loop has its own engine, closed along with the loop.
+        self._engine = LocalEngine()
+
+        # Not a daemon, so that the interpreter only exits once submitted jobs complete.
+        Thread(target=self._run_loop, args=(self._loop, self._engine)).start()
+
+    def _run_loop(self, loop, engine: LocalEngine) -> None:
+        set_event_loop(loop)
+
+        self._cpu_slots_semaphore = (
+            Semaphore(self.cpu_slots) if self.cpu_slots is not None else None
+        )
+
+        loop.run_forever()
+        engine.close()
+        loop.close()
+
+    def _stop_loop_if_idle(self, loop) -> None:
+        with self._lock:
+            if self._incomplete_tasks == 0 and self._loop is loop:
+                # Later submissions start a new loop.
+                self._loop = None
+                self._engine = None
+                loop.call_soon(loop.stop)
+
+    def _start_array(self, loop, engine: LocalEngine, array: _LocalArray) -> None:
+        array.semaphore = Semaphore(
+            array.jobs_parallel if array.jobs_parallel > 0 else len(array.indices) + 1
+        )
+
+        for index in array.indices:
+            array.results[index] = loop.create_future()
+
+        for index in array.indices:
+            ensure_future(self._run_task(loop, engine, array, index), loop=loop)
+
+        self._stop_loop_if_idle(loop)
+
+    def _dependencies(self, array: _LocalArray, index: int) -> List[Future]:
+        dependencies = []
+
+        for job_id in array.after:
+            if job_id in self._arrays:
+                dependencies += list(self._arrays[job_id].results.values())
+
+        for job_id, task_index in array.after_tasks:
+            if job_id in self._arrays and task_index in self._arrays[job_id].results:
+                dependencies.append(self._arrays[job_id].results[task_index])
+
+        for job_id in array.after_corresponding:
+            if job_id in self._arrays and index in self._arrays[job_id].results:
+                dependencies.append(self._arrays[job_id].results[index])
+
+        return dependencies
+
+    async def _run_task(
+        self, loop, engine: LocalEngine, array: _LocalArray, index: int
+    ) -> None:
+        succeeded = True
+
+        # Arrays only stop their loop once complete, so futures of an earlier loop are
+        # always done, and their results can be taken without awaiting them.
+        for dependency in self._dependencies(array, index):
+            if not (dependency.result() if dependency.done() else await dependency):
+                succeeded = False
+                break
+
+        if succeeded:
+            await array.semaphore.acquire()
+            if self._cpu_slots_semaphore is not None:
+                await self._cpu_slots_semaphore.acquire()
+
+            try:
+                stats = await engine.start(
+                    loop,
+                    array.job_script,
+                    index,
+                    self._log_path(array, index, "out"),
+                    self._log_path(array, index, "err"),
+                )
+                succeeded = stats.exit_code == 0
+
+                with self._lock:
+                    array.stats[index] = stats
+            except OSError as err:
+                print(f"Could not run task {index} of job {array.job_id}:\n  {err}")
+                succeeded = False
+            finally:
+                if self._cpu_slots_semaphore is not None:
+                    self._cpu_slots_semaphore.release()
+                array.semaphore.release()
+
+        array.results[index].set_result(succeeded)
+
+        with self._completed:
+            array.succeeded[index] = succeeded
+            self._incomplete_tasks -= 1
+
+            self._completed.notify_all()
+
+        self._stop_loop_if_idle(loop)
@@ -0,0 +1,165 @@
+"""
+Runs tasks of job scripts locally as child processes, for LocalDriver.
+
+Tasks are forked by a small spawner process (see spawner.py), started once per engine,
+rather than by this process, so that their peak resident set size doesn't count this
+process' memory. Each task's output is written by the child straight to its own log
+files, so nothing is read back through pipes, and every task is given the environment
+the spawner started with, plus JOB_INDEX. The spawner reaps tasks with wait4, reporting
+their exit code, wall time and peak resident set size back over a pipe read by the
+event loop.
+"""
+
+from asyncio import Future
+from json import dumps, loads
+from os import getcwd, read
+from os.path import dirname, join as join_path
+from subprocess import PIPE, Popen
+from sys import executable
+from typing import Dict, Optional, Tuple
+
+_SPAWNER = join_path(dirname(__file__), "spawner.py")
+
+
+class TaskStats:
+    """
+    Stores the outcome and resource usage of a task ran locally.
+    """
+
+    def __init__(
+        self,
+        exit_code: int,
+        wall_time: float,
+        peak_rss: int,
+        stdout_path: str,
+        stderr_path: str,
+    ):
+        # Negative if the task was killed by a signal, as for Popen.returncode.
+        self.exit_code = exit_code
+        # In seconds.
+        self.wall_time = wall_time
+        # In kilobytes, the largest resident set size of any of the task's processes,
+        # as ru_maxrss of wait4 on Linux. Never below that of the spawner (a few MB),
+        # which the task is forked from.
+        self.peak_rss = peak_rss
+        self.stdout_path = stdout_path
+        self.stderr_path = stderr_path
+
+    def __repr__(self) -> str:
+        return (
+            f"TaskStats(exit_code={self.exit_code}, wall_time={self.wall_time:.3f}, "
+            f"peak_rss={self.peak_rss})"
+        )
+
+
+class LocalEngine:
+    """
+    Starts tasks as child processes of a spawner process, each completing an asyncio
+    future with its stats once reaped. An engine is used from a single event loop, and
+    closed once done with.
+    """
+
+    def __init__(self, shell: str = "/bin/bash"):
+        self.shell = shell
+
+        self._spawner: Optional[Popen] = None
+        self._loop = None
+
+        # Futures of the stats of each task started but not yet reaped, by task ID.
+        self._tasks: Dict[int, Tuple[Future, str, str]] = {}
+        self._task_count = 0
+        self._outcomes = b""
+
+    def start(
+        self,
+        loop,
+        job_script: str,
+        index: int,
+        stdout_path: str,
+        stderr_path: str,
+        cwd: Optional[str] = None,
+    ):
+        """
+        Starts the task of the given index of the job script, returning a future of its
+        TaskStats on the given event loop.
+        """
+
+        if self._spawner is None:
+            self._spawner = Popen(
+                [executable, "-I", "-S", _SPAWNER, self.shell],
+                stdin=PIPE,
+                stdout=PIPE,
+                close_fds=True,
+            )
+            self._loop = loop
+            loop.add_reader(self._spawner.stdout.fileno(), self._read_outcomes)
+
+        self._task_count += 1
+        task_id = self._task_count
+
+        stats = loop.create_future()
+        self._tasks[task_id] = (stats, stdout_path, stderr_path)
+
+        self._spawner.stdin.write(
+            (
+                dumps(
+                    {
+                        "id": task_id,
+                        "job_script": job_script,
+                        "index": index,
+                        "stdout": stdout_path,
+                        "stderr": stderr_path,
+                        "cwd": cwd if cwd is not None else getcwd(),
+                    }
+                )
+                + "\n"
+            ).encode("utf-8")
+        )
+        self._spawner.stdin.flush()
+
+        return stats
+
+    def _read_outcomes(self) -> None:
+        data = read(self._spawner.stdout.fileno(), 1 << 16)
+
+        if len(data) == 0:
+            self._loop.remove_reader(self._spawner.stdout.fileno())
+            for stats, _, _ in self._tasks.values():
+                stats.set_exception(OSError("Task spawner exited unexpectedly."))
+            self._tasks = {}
+            return
+
+        self._outcomes += data
+        while b"\n" in self._outcomes:
+            line, self._outcomes = self._outcomes.split(b"\n", 1)
+            outcome = loads(line.decode("utf-8"))
+
+            stats, stdout_path, stderr_path = self._tasks.pop(outcome["id"])
+            if "error" in outcome:
+                stats.set_exception(OSError(outcome["error"]))
+            else:
+                stats.set_result(
+                    TaskStats(
+                        outcome["exit_code"],
+                        outcome["wall_time"],
+                        outcome["peak_rss"],
+                        stdout_path,
+                        stderr_path,
+                    )
+                )
+
+    def close(self) -> None:
+        """
+        Stops the spawner, once every task started has been reaped.
+        """
+
+        if self._spawner is None:
+            return
+
+        self._loop.remove_reader(self._spawner.stdout.fileno())
+        self._spawner.stdin.close()
+        self._spawner.wait()
+        self._spawner.stdout.close()
+
+        self._spawner = None
+        self._loop = None
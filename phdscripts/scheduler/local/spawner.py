@@ -0,0 +1,153 @@
+"""
+Spawns and reaps the tasks of LocalEngine, ran as its own small Python process
+(python -I -S spawner.py <shell>) so as to only import the standard library.
+
+Tasks are forked from this process, rather than from the one submitting them, as a
+process' peak resident set size counts that of the process it was forked from, before
+it exec'd. Each line read from stdin requests a task, as JSON
+    {"id": ..., "job_script": ..., "index": ..., "stdout": ..., "stderr": ...,
+     "cwd": ...}
+and each line written to stdout gives the outcome of one, as JSON
+    {"id": ..., "exit_code": ..., "wall_time": ..., "peak_rss": ...}
+or {"id": ..., "error": ...} if it could not be started. Exits once stdin is closed and
+every task has been reaped.
+"""
+
+import json
+import os
+import select
+import signal
+import sys
+import time
+from typing import Dict, Tuple
+
+_LOG_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_APPEND
+
+
+def _exit_code(status: int) -> int:
+    if os.WIFEXITED(status):
+        return os.WEXITSTATUS(status)
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return status
+
+
+def _reply(outcome: dict, replies: bytearray) -> None:
+    replies += (json.dumps(outcome) + "\n").encode("utf-8")
+
+
+def _spawn(
+    shell: str,
+    env: Dict[str, str],
+    request: dict,
+    tasks: Dict[int, Tuple[int, float]],
+    replies: bytearray,
+) -> None:
+    try:
+        stdout_fd = os.open(request["stdout"], _LOG_FLAGS, 0o644)
+        stderr_fd = (
+            stdout_fd
+            if request["stderr"] == request["stdout"]
+            else os.open(request["stderr"], _LOG_FLAGS, 0o644)
+        )
+    except OSError as err:
+        _reply({"id": request["id"], "error": str(err)}, replies)
+        return
+
+    started = time.monotonic()
+    pid = os.fork()
+
+    if pid == 0:
+        try:
+            os.dup2(os.open(os.devnull, os.O_RDONLY), 0)
+            os.dup2(stdout_fd, 1)
+            os.dup2(stderr_fd, 2)
+            os.chdir(request["cwd"])
+            os.execve(
+                shell,
+                [shell, request["job_script"]],
+                {**env, "JOB_INDEX": str(request["index"])},
+            )
+        except BaseException as err:
+            os.write(2, f"Could not run task:\n  {err}\n".encode("utf-8"))
+        finally:
+            os._exit(127)
+
+    os.close(stdout_fd)
+    if stderr_fd != stdout_fd:
+        os.close(stderr_fd)
+
+    tasks[pid] = (request["id"], started)
+
+
+def _reap(tasks: Dict[int, Tuple[int, float]], replies: bytearray) -> None:
+    while len(tasks) > 0:
+        pid, status, rusage = os.wait4(-1, os.WNOHANG)
+        if pid == 0:
+            return
+
+        task_id, started = tasks.pop(pid)
+        _reply(
+            {
+                "id": task_id,
+                "exit_code": _exit_code(status),
+                "wall_time": time.monotonic() - started,
+                "peak_rss": rusage.ru_maxrss,
+            },
+            replies,
+        )
+
+
+def main(shell: str) -> None:
+    # The environment of every task, built once, to which only JOB_INDEX is added.
+    env = dict(os.environ)
+
+    # Children exiting wake the select below through this pipe.
+    wakeup_read, wakeup_write = os.pipe()
+    os.set_blocking(wakeup_read, False)
+    os.set_blocking(wakeup_write, False)
+    signal.set_wakeup_fd(wakeup_write)
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+
+    # Task ID and start time of each task, by process ID.
+    tasks: Dict[int, Tuple[int, float]] = {}
+    requests = b""
+    reading = True
+
+    # Replies are only written once they can be without blocking, so that requests keep
+    # being read even while the engine isn't reading replies.
+    replies = bytearray()
+    os.set_blocking(1, False)
+
+    while reading or len(tasks) > 0 or len(replies) > 0:
+        readable, writable, _ = select.select(
+            [0, wakeup_read] if reading else [wakeup_read],
+            [1] if len(replies) > 0 else [],
+            [],
+        )
+
+        if wakeup_read in readable:
+            try:
+                while os.read(wakeup_read, 4096):
+                    pass
+            except BlockingIOError:
+                pass
+
+        _reap(tasks, replies)
+
+        if 0 in readable:
+            data = os.read(0, 1 << 16)
+            if len(data) == 0:
+                reading = False
+
+            requests += data
+            while b"\n" in requests:
+                line, requests = requests.split(b"\n", 1)
+                _spawn(shell, env, json.loads(line.decode("utf-8")), tasks, replies)
+
+        if 1 in writable:
+            del replies[: os.write(1, replies)]
+
+
+if __name__ == "__main__":
+    main(sys.argv[1])
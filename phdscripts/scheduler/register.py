@@ -3,6 +3,7 @@ Register for schedulers.
 """
 
 from .driver import SchedulerDriver
+from .local import LocalDriver
 from .slurm import SlurmDriver
 
 
@@ -35,6 +36,7 @@ class SchedulerRegister:
 def get_default_register() -> SchedulerRegister:
     register = SchedulerRegister()
 
+    register.register_scheduler("local", LocalDriver)
     register.register_scheduler("slurm", SlurmDriver)
 
     return register
@@ -1,3 +1,4 @@
 from .driver import SlurmDriver
+from .submission import SbatchSubmitter
 
-__all__ = ["SlurmDriver"]
+__all__ = ["SbatchSubmitter", "SlurmDriver"]
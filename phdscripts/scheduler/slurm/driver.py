@@ -1,14 +1,45 @@
 """
 Functions for interacting with Slurm scheduler.
+
+Submissions go through SbatchSubmitter, retrying when the controller is busy. Arrays too
+large for Slurm (task IDs must be below MaxArraySize, and a user may only have so many
+jobs queued, MaxSubmitJobs) are split into chunks of fixed size, chunk k holding indices
+[k * size, (k + 1) * size) as task IDs offset by k * size, the offset being passed to
+the job script as JOB_INDEX_OFFSET. As the chunks of every array align in this way, a
+chunk waiting on corresponding tasks of another array waits on that array's chunk of
+the same number. The ID of a split array is the IDs of its chunks joined by ":".
+
+The limit on the tasks of an array running at once applies to the array as a whole, so
+is shared between its chunks, see _chunk_throttles.
 """
 
-from subprocess import PIPE, run
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
 
 from .. import SchedulerDriver
+from .submission import SbatchSubmitter
 
 
 class SlurmDriver(SchedulerDriver):
+    def __init__(
+        self,
+        submitter: Optional[SbatchSubmitter] = None,
+        max_array_size: Optional[int] = None,
+        submit_workers: int = 8,
+    ):
+        """
+        If max_array_size is not given, it is obtained from the Slurm configuration.
+        Up to submit_workers independent arrays are submitted at a time.
+        """
+        self.submitter = submitter if submitter is not None else SbatchSubmitter()
+        self.max_array_size = max_array_size
+        self.submit_workers = submit_workers
+
+        self._lock = Lock()
+        # IDs of the chunks of each array submitted, by chunk number.
+        self._chunks: Dict[str, Dict[int, str]] = {}
+
     @staticmethod
     def write_job_script(filename: str, contents: str, **kwargs):
         """
@@ -37,12 +68,14 @@ class SlurmDriver(SchedulerDriver):
                 f.write(f"#SBATCH --{key.replace('_', '-')}={val}\n")
             f.write("\n")
 
-            f.write("export JOB_INDEX=$SLURM_ARRAY_TASK_ID\n")
+            f.write(
+                "export JOB_INDEX=$((SLURM_ARRAY_TASK_ID + ${JOB_INDEX_OFFSET:-0}))\n"
+            )
 
             f.write(contents)
 
-    @staticmethod
     def array_batch_jobs(
+        self,
         job_script: str,
         job_count: int,
         jobs_parallel: int = 1,
@@ -53,24 +86,175 @@ class SlurmDriver(SchedulerDriver):
         Schedules an array of jobs and sends them to the scheduler to be ran in batches.
         The job array ID is returned by this function.
         """
-        cmd = ["sbatch", "--parsable"]
+        dependencies = [] if array_dependency is None else [array_dependency]
+
+        # NOTE: to have jobs follow individual tasks of an array, rather than the whole
+        #       array, see array_batch_tasks and JobGraph.
+        return self.array_batch_tasks(
+            job_script,
+            list(range(job_count)),
+            jobs_parallel,
+            after=dependencies if blocking else [],
+            after_corresponding=[] if blocking else dependencies,
+        )
+
+    @staticmethod
+    def _array_indices(indices: List[int]) -> str:
+        """
+        Writes indices as Slurm's array specification, e.g. "0-3,5,7-9".
+        """
+        indices = sorted(set(indices))
+
+        ranges = []
+        start = indices[0]
+        for prior, index in zip(indices, indices[1:] + [None]):
+            if index != prior + 1:
+                ranges.append(f"{start}" if start == prior else f"{start}-{prior}")
+                start = index
+
+        return ",".join(ranges)
+
+    @staticmethod
+    def _chunk_throttles(jobs_parallel: int, chunk_count: int) -> List[int]:
+        """
+        Shares the limit on the tasks of an array running at once between its chunks,
+        as evenly as possible. With fewer tasks allowed than chunks, chunks get a single
+        task each and those beyond the limit are left at zero, to instead wait on an
+        earlier chunk to finish.
+        """
+        return [
+            jobs_parallel // chunk_count
+            + (1 if position < jobs_parallel % chunk_count else 0)
+            for position in range(chunk_count)
+        ]
+
+    def _chunk_size(self) -> Optional[int]:
+        with self._lock:
+            if self.max_array_size is None:
+                # Zero if it can't be determined, so as not to look it up again.
+                self.max_array_size = self.submitter.max_array_size() or 0
+
+        limits = [
+            limit
+            for limit in [self.max_array_size, self.submitter.max_submit_jobs]
+            if limit is not None and limit > 0
+        ]
+
+        return min(limits) if len(limits) > 0 else None
+
+    def _task_id(self, job_id: str, index: int, chunk_size: Optional[int]) -> str:
+        chunks = self._chunks.get(job_id)
+
+        # Not submitted by this driver, so take the task ID to be the index.
+        if chunks is None:
+            return f"{job_id}_{index}"
+
+        if chunk_size is None:
+            return f"{chunks[0]}_{index}"
 
-        array_flag = f"--array=0-{job_count-1}"
-        if jobs_parallel > 0:
-            array_flag += f"%{jobs_parallel}"
-        cmd.append(array_flag)
+        return f"{chunks[index // chunk_size]}_{index % chunk_size}"
 
-        # TODO(Matthew): can we return sub array job IDs such that we can run e.g.
-        #                staged JOREK workflows with time evolution following the needed
-        #                STARWALL run?
-        if array_dependency is not None:
-            if blocking:
-                cmd.append(f"--dependency=afterok:{array_dependency}")
-            else:
-                cmd.append(f"--dependency=aftercorr:{array_dependency}")
+    def _corresponding_ids(self, job_id: str, chunk: int) -> List[str]:
+        chunks = self._chunks.get(job_id)
 
-        cmd.append(f"{job_script}")
+        if chunks is None:
+            return [part for part in job_id.split(":") if part != ""]
 
-        pipe = run(cmd, stdout=PIPE)
+        # No chunk of the same number means no corresponding tasks to wait on.
+        return [chunks[chunk]] if chunk in chunks else []
 
-        return pipe.stdout.decode(encoding="UTF8").replace("\n", "")
+    def array_batch_tasks(
+        self,
+        job_script: str,
+        indices: List[int],
+        jobs_parallel: int = 1,
+        after: List[str] = [],
+        after_tasks: List[Tuple[str, int]] = [],
+        after_corresponding: List[str] = [],
+    ) -> str:
+        """
+        Schedules the tasks of the given indices of an array of jobs, keeping those
+        indices as their JOB_INDEX. The job array ID is returned by this function.
+        Raises ValueError if there are no indices, as there would be nothing to submit
+        nor any job ID to return.
+        """
+        if len(indices) == 0:
+            raise ValueError(f"No tasks of job script to submit:\n  {job_script}")
+
+        chunk_size = self._chunk_size()
+
+        chunks: Dict[int, List[int]] = {}
+        for index in indices:
+            chunks.setdefault(
+                index // chunk_size if chunk_size is not None else 0, []
+            ).append(index)
+
+        with self._lock:
+            task_ids = [
+                self._task_id(job_id, index, chunk_size)
+                for job_id, index in after_tasks
+            ]
+
+        throttles = self._chunk_throttles(jobs_parallel, len(chunks))
+
+        chunk_ids = {}
+        chunk_order = sorted(chunks.keys())
+        for position, chunk in enumerate(chunk_order):
+            chunk_indices = chunks[chunk]
+            offset = chunk * chunk_size if chunk_size is not None else 0
+
+            array_flag = "--array=" + self._array_indices(
+                [index - offset for index in chunk_indices]
+            )
+            if jobs_parallel > 0:
+                array_flag += f"%{max(1, throttles[position])}"
+            args = [array_flag]
+
+            if offset > 0:
+                args.append(f"--export=ALL,JOB_INDEX_OFFSET={offset}")
+
+            with self._lock:
+                corresponding_ids = [
+                    part
+                    for job_id in after_corresponding
+                    for part in self._corresponding_ids(job_id, chunk)
+                ]
+
+            dependencies = []
+            if len(after) > 0 or len(task_ids) > 0:
+                dependencies.append(":".join(["afterok"] + list(after) + task_ids))
+            if len(corresponding_ids) > 0:
+                dependencies.append(":".join(["aftercorr"] + corresponding_ids))
+            # Chunks beyond the limit each run once one of those before them finishes,
+            # so that no more than jobs_parallel chunks of one task are running.
+            if jobs_parallel > 0 and throttles[position] == 0:
+                dependencies.append(
+                    f"afterany:{chunk_ids[chunk_order[position - jobs_parallel]]}"
+                )
+
+            if len(dependencies) > 0:
+                args.append(f"--dependency={','.join(dependencies)}")
+
+            args.append(f"{job_script}")
+
+            chunk_ids[chunk] = self.submitter.submit(args, len(chunk_indices))
+
+        job_id = ":".join([chunk_ids[chunk] for chunk in sorted(chunk_ids.keys())])
+
+        with self._lock:
+            self._chunks[job_id] = chunk_ids
+
+        return job_id
+
+    def array_batch_tasks_many(self, submissions: List[dict]) -> List[str]:
+        """
+        Schedules many arrays of tasks at once, submitting up to submit_workers of them
+        concurrently.
+        """
+        with ThreadPoolExecutor(max(1, self.submit_workers)) as executor:
+            return list(
+                executor.map(
+                    lambda submission: self.array_batch_tasks(**submission),
+                    submissions,
+                )
+            )
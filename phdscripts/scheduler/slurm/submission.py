@@ -0,0 +1,133 @@
+"""
+Submission of jobs to Slurm through sbatch, retrying submissions that fail while the
+controller is busy, and throttling submissions to stay within the number of jobs a user
+may have queued (MaxSubmitJobs).
+
+The sbatch, scontrol and squeue commands are configurable, so that submission can be
+exercised against fakes of them.
+"""
+
+from getpass import getuser
+from subprocess import PIPE, run
+from threading import Lock
+from time import sleep
+from typing import List, Optional
+
+# Fragments of sbatch errors that mean a submission may succeed if tried again later.
+TRANSIENT_SBATCH_ERRORS = [
+    "socket timed out",
+    "resource temporarily unavailable",
+    "temporarily unable",
+    "unable to contact slurm controller",
+    "rate limit",
+    "try again",
+    "maxsubmitjob",
+]
+
+
+class SbatchSubmitter:
+    """
+    Runs sbatch, retrying up to retries times on transient errors with exponential
+    backoff from backoff seconds, and if max_submit_jobs is given, waiting to submit
+    until the user's queued jobs leave room for those being submitted.
+    """
+
+    def __init__(
+        self,
+        sbatch: str = "sbatch",
+        scontrol: str = "scontrol",
+        squeue: str = "squeue",
+        retries: int = 5,
+        backoff: float = 1.0,
+        max_submit_jobs: Optional[int] = None,
+        poll_interval: float = 30.0,
+    ):
+        self.sbatch = sbatch
+        self.scontrol = scontrol
+        self.squeue = squeue
+        self.retries = retries
+        self.backoff = backoff
+        self.max_submit_jobs = max_submit_jobs
+        self.poll_interval = poll_interval
+
+        self._throttle_lock = Lock()
+
+    def max_array_size(self) -> Optional[int]:
+        """
+        Obtains MaxArraySize from the Slurm configuration, array task IDs being limited
+        to below it. None if it can't be determined.
+        """
+
+        try:
+            pipe = run([self.scontrol, "show", "config"], stdout=PIPE, stderr=PIPE)
+        except OSError:
+            return None
+
+        if pipe.returncode != 0:
+            return None
+
+        for line in pipe.stdout.decode(encoding="UTF8").splitlines():
+            key, _, value = line.partition("=")
+
+            if key.strip() == "MaxArraySize":
+                try:
+                    return int(value.strip())
+                except ValueError:
+                    return None
+
+        return None
+
+    def queued_jobs(self) -> int:
+        """
+        Counts the user's queued (pending or running) jobs, each array task counting as
+        a job.
+        """
+
+        pipe = run(
+            [self.squeue, "--noheader", "--array", "--user", getuser(), "--format=%i"],
+            stdout=PIPE,
+            stderr=PIPE,
+        )
+
+        return len(pipe.stdout.decode(encoding="UTF8").split())
+
+    def _is_transient(self, error: str) -> bool:
+        error = error.lower()
+
+        return any(fragment in error for fragment in TRANSIENT_SBATCH_ERRORS)
+
+    def submit(self, args: List[str], job_count: int = 1) -> str:
+        """
+        Submits with sbatch given the arguments, for job_count jobs, returning the job
+        ID. Raises RuntimeError if the submission fails.
+        """
+
+        if self.max_submit_jobs is not None:
+            while True:
+                # Waited for outside of the lock, so that concurrent submissions poll
+                # the queue independently rather than one after another.
+                while self.queued_jobs() + job_count > self.max_submit_jobs:
+                    sleep(self.poll_interval)
+
+                # Checked again and submitted under lock, so that concurrent
+                # submissions don't each see the same room in the queue.
+                with self._throttle_lock:
+                    if self.queued_jobs() + job_count <= self.max_submit_jobs:
+                        return self._submit(args)
+
+        return self._submit(args)
+
+    def _submit(self, args: List[str]) -> str:
+        for attempt in range(self.retries + 1):
+            pipe = run([self.sbatch, "--parsable"] + args, stdout=PIPE, stderr=PIPE)
+
+            if pipe.returncode == 0:
+                # Parsable output is "<job ID>[;<cluster>]".
+                return pipe.stdout.decode(encoding="UTF8").strip().split(";")[0].strip()
+
+            error = pipe.stderr.decode(encoding="UTF8").strip()
+
+            if not self._is_transient(error) or attempt == self.retries:
+                raise RuntimeError(f"sbatch failed:\n  {' '.join(args)}\n  {error}")
+
+            sleep(self.backoff * 2**attempt)
@@ -20,6 +20,8 @@ from .string import (
     replace_parameterised_fortran_number_in_list,
     replace_parameterised_fortran_numbers,
     replace_fortran_parameter,
+    replace_fortran_parameters,
+    FortranNamelistTemplate,
 )
 
 __all__ = [
@@ -45,4 +47,6 @@ __all__ = [
     "replace_parameterised_fortran_number_in_list",
     "replace_parameterised_fortran_numbers",
     "replace_fortran_parameter",
+    "replace_fortran_parameters",
+    "FortranNamelistTemplate",
 ]
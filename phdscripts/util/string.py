@@ -2,7 +2,8 @@
 Utility functions for operating on strings.
 """
 
-from typing import Any, List, Union
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
 
 import regex
 
@@ -288,3 +289,180 @@ def replace_fortran_parameter(value: Any, param: str, target: str) -> str:
         if has_parameterised_fortran_numbers(param, target):
             return replace_parameterised_fortran_numbers(param, value, target)
     return target
+
+
+_FORTRAN_BOOL_REGEX = regex.compile(_FORTRAN_BOOL_PATTERN)
+_FORTRAN_NUMBER_REGEX = regex.compile(_FORTRAN_NUMBER_PATTERN)
+
+
+@lru_cache(maxsize=None)
+def _fortran_numbers_regex(list_separator: str) -> "regex.Pattern":
+    return regex.compile(_OPTIONAL_FORTRAN_NUMBERS_PATTERN(list_separator))
+
+
+@lru_cache(maxsize=None)
+def _fortran_parameters_regex(
+    param_names: Tuple[str, ...], intermediate: str
+) -> "regex.Pattern":
+    """
+    Compiles a pattern finding, in one scan, every location at which any of the named
+    parameters is assigned a value.
+    """
+
+    # Longest names first, so that one parameter name being a prefix of another can't
+    # shadow it.
+    alternatives = "|".join(
+        regex.escape(param_name)
+        for param_name in sorted(param_names, key=len, reverse=True)
+    )
+
+    return regex.compile(
+        rf"{_PARAM_START}(?P<name>{alternatives}){intermediate}",
+    )
+
+
+class FortranNamelistTemplate:
+    """
+    A Fortran namelist (or similarly formatted input file) in which parameter values are
+    to be substituted.
+
+    The locations at which a set of parameters are assigned are found in a single scan
+    of the template, and indexed against those parameter names, so that rendering any
+    number of parameter sets naming the same parameters only scans the template once.
+    All of a parameter set's substitutions are then applied in a single pass.
+
+    Substitution follows replace_fortran_parameter: bools replace Fortran bools,
+    numbers replace Fortran numbers, and lists replace lists of Fortran numbers, while
+    parameters not assigned a value of the matching kind in the template are ignored.
+    """
+
+    def __init__(
+        self,
+        template: str,
+        intermediate: str = " *= *",
+        list_separator: str = ",? *",
+    ):
+        self.template = template
+        self._intermediate = intermediate
+        self._list_separator = list_separator
+        self._locations: Dict[Tuple[str, ...], Dict[str, List[Tuple[int, int]]]] = {}
+
+    def locations(self, param_names: Iterable[str]) -> Dict[str, List[Tuple[int, int]]]:
+        """
+        Obtains, for each of the named parameters, the start of each assignment to it in
+        the template along with the start of the value assigned.
+        """
+
+        key = tuple(sorted(set(param_names)))
+
+        if key not in self._locations:
+            locations: Dict[str, List[Tuple[int, int]]] = {name: [] for name in key}
+
+            if len(key) > 0:
+                pattern = _fortran_parameters_regex(key, self._intermediate)
+                for match in pattern.finditer(self.template):
+                    locations[match.group("name")].append(
+                        (match.start("name"), match.end())
+                    )
+
+            self._locations[key] = locations
+
+        return self._locations[key]
+
+    def __substitution(
+        self, param: str, value: Any, name_start: int, value_start: int
+    ) -> Optional[Tuple[int, int, str]]:
+        """
+        Determines the span of the template to replace, and what to replace it with, to
+        substitute the given value for the assignment found at the given location.
+        """
+
+        if isinstance(value, bool):
+            match = _FORTRAN_BOOL_REGEX.match(self.template, value_start)
+            if match is None:
+                return None
+
+            return value_start, match.end(), convert_standard_to_fortran_bool(value)
+        elif isinstance(value, (float, int)):
+            match = _FORTRAN_NUMBER_REGEX.match(self.template, value_start)
+            if match is None:
+                return None
+
+            return (
+                value_start,
+                match.end(),
+                convert_standard_to_fortran_number(str(value)),
+            )
+        elif isinstance(value, list):
+            if len(value) == 0:
+                return None
+
+            match = _fortran_numbers_regex(self._list_separator).match(
+                self.template, value_start
+            )
+            if match is None:
+                return None
+
+            return (
+                name_start,
+                match.end(),
+                f"{param} = " + ", ".join(str(sub) for sub in value),
+            )
+
+        return None
+
+    def substitutions(self, params: Dict[str, Any]) -> List[Tuple[int, int, str]]:
+        """
+        Obtains the spans of the template to replace, and what to replace each with, to
+        substitute the given parameters, ordered by position in the template.
+        """
+
+        locations = self.locations(params.keys())
+
+        substitutions = []
+        for param, value in params.items():
+            for name_start, value_start in locations[param]:
+                substitution = self.__substitution(
+                    param, value, name_start, value_start
+                )
+
+                if substitution is not None:
+                    substitutions.append(substitution)
+
+        substitutions.sort()
+
+        return substitutions
+
+    def has_parameter(self, param: str, value: Any) -> bool:
+        """
+        Determines if the template assigns the named parameter a value of the same kind
+        as that given, such that rendering with it would substitute the value.
+        """
+
+        return len(self.substitutions({param: value})) != 0
+
+    def render(self, params: Dict[str, Any]) -> str:
+        """
+        Substitutes the given parameters into the template in a single pass.
+        """
+
+        chunks = []
+        cursor = 0
+        for start, end, sub in self.substitutions(params):
+            chunks.append(self.template[cursor:start])
+            chunks.append(sub)
+            cursor = end
+        chunks.append(self.template[cursor:])
+
+        return "".join(chunks)
+
+
+def replace_fortran_parameters(
+    params: Dict[str, Any], target: str, intermediate: str = " *= *"
+) -> str:
+    """
+    Replaces the values of all of the given parameters in the target in a single pass,
+    equivalent to calling replace_fortran_parameter for each parameter in turn.
+    """
+
+    return FortranNamelistTemplate(target, intermediate).render(params)
@@ -1,8 +1,12 @@
 from .register import WorkflowRegister
+from .template import TEMPLATE_MANIFEST_FILENAME, TemplateCache, materialise_template
 from .workflow import PARAM_SET_REGISTER_FILENAME, Workflow, WorkflowSettings
 
 __all__ = [
+    "materialise_template",
     "PARAM_SET_REGISTER_FILENAME",
+    "TEMPLATE_MANIFEST_FILENAME",
+    "TemplateCache",
     "Workflow",
     "WorkflowSettings",
     "WorkflowRegister",
@@ -0,0 +1,207 @@
+"""
+Persistent, content-addressed store of artifacts produced by jobs of a workflow (e.g.
+STARWALL responses), allowing artifacts to be reused across runs rather than produced
+again.
+
+Entries are keyed by a canonical hash of everything that determines the artifacts, see
+canonical_hash. The job producing an entry's artifacts is registered when set up, by a
+manifest written to its working directory, and publishes them once finished, see
+bash_publish_artifacts. Publishing copies the artifacts into a read-only directory
+owned by the store, moved into place as a whole, so that an entry never changes once
+present even as the producer's working directory goes on being used (e.g. JOREK
+rewriting its restart file). Only jobs that succeeded publish their artifacts, marking
+the entry as complete, and only complete entries count as stored. Stored artifacts are
+then linked into the working directories of later jobs needing them.
+"""
+
+from hashlib import sha256
+from json import dumps
+from os import chmod, makedirs, remove, scandir, stat, symlink
+from os.path import abspath, getsize, isdir, isfile, join as join_path, lexists
+from shutil import copyfile, rmtree
+from stat import S_IWUSR
+from typing import Any, Iterable, List
+
+_CHUNK_SIZE = 1 << 20
+
+# Written to an entry once its producer has succeeded, last of all its files.
+COMPLETE_MARKER = "COMPLETE"
+
+
+def canonical_json(obj: Any) -> str:
+    """
+    Serialises an object (e.g. a param set) such that equal objects always give the
+    same string, whatever the order of their dictionaries' keys.
+    """
+
+    return dumps(obj, sort_keys=True, separators=(",", ":"), default=repr)
+
+
+def canonical_hash(*parts: Any) -> str:
+    """
+    Hashes the canonical serialisation of each of the given parts together.
+    """
+
+    digest = sha256()
+
+    for part in parts:
+        digest.update(canonical_json(part).encode("utf-8"))
+        digest.update(b"\0")
+
+    return digest.hexdigest()
+
+
+def file_digest(filepath: str) -> str:
+    digest = sha256()
+
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def directory_digest(directory: str, exclude: Iterable[str] = ()) -> str:
+    """
+    Hashes the relative paths and contents of every file within the directory, except
+    those whose relative paths are excluded.
+    """
+
+    exclude = set(exclude)
+
+    def _files(path: str, relative_dir: str) -> List[str]:
+        files = []
+        for entry in sorted(scandir(path), key=lambda entry: entry.name):
+            relative_path = join_path(relative_dir, entry.name)
+
+            if relative_path in exclude:
+                continue
+
+            if entry.is_dir():
+                files += _files(entry.path, relative_path)
+            elif entry.is_file():
+                files.append(relative_path)
+        return files
+
+    return canonical_hash(
+        [
+            (relative_path, file_digest(join_path(directory, relative_path)))
+            for relative_path in _files(directory, "")
+        ]
+    )
+
+
+class ArtifactStore:
+    """
+    Store of artifacts, keyed by canonical hash, in the given directory.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+        makedirs(self.directory, exist_ok=True)
+
+    def entry_dir(self, key: str) -> str:
+        return join_path(self.directory, key)
+
+    def has(self, key: str, filenames: Iterable[str]) -> bool:
+        """
+        Determines if all of the named artifacts of an entry have been published, by a
+        producer that succeeded.
+        """
+
+        for filename in [COMPLETE_MARKER, *filenames]:
+            filepath = join_path(self.entry_dir(key), filename)
+
+            if not isfile(filepath):
+                return False
+            if filename != COMPLETE_MARKER and getsize(filepath) == 0:
+                return False
+
+        return True
+
+    def register(
+        self,
+        key: str,
+        producer_dir: str,
+        filenames: Iterable[str],
+        manifest_filename: str,
+    ) -> None:
+        """
+        Registers the working directory in which the named artifacts of an entry will
+        be produced, by writing the manifest from which they are published once the
+        producing job has finished.
+        """
+
+        entry_dir = self.entry_dir(key)
+
+        # Entries missing artifacts would otherwise stop the entry being published.
+        if isdir(entry_dir) and not self.has(key, filenames):
+            chmod(entry_dir, stat(entry_dir).st_mode | S_IWUSR)
+            rmtree(entry_dir)
+
+        with open(join_path(producer_dir, manifest_filename), "w") as f:
+            f.write("\n".join([abspath(entry_dir), *filenames]) + "\n")
+
+    def link(
+        self,
+        key: str,
+        dest_dir: str,
+        filenames: Iterable[str],
+        copied: Iterable[str] = (),
+    ) -> None:
+        """
+        Links the named artifacts of an entry into the destination directory, replacing
+        any files of the same name there. Those artifacts also named in copied are
+        copied instead, e.g. as they will be modified in place.
+        """
+
+        copied = set(copied)
+
+        for filename in filenames:
+            src_path = abspath(join_path(self.entry_dir(key), filename))
+            dest_path = join_path(dest_dir, filename)
+
+            if lexists(dest_path):
+                remove(dest_path)
+
+            if filename in copied:
+                copyfile(src_path, dest_path)
+            else:
+                symlink(src_path, dest_path)
+
+
+def bash_publish_artifacts(manifest_filename: str) -> str:
+    """
+    Produces a bash snippet, for use in job scripts, publishing the artifacts listed by
+    the manifest in the working directory, if any, to the store entry it names. Must
+    directly follow the command producing the artifacts, as they are only published if
+    it succeeded. The artifacts are copied (reflinked where the file system allows) into
+    a temporary directory in the store, marked complete, made read-only, and moved into
+    place as a whole. An entry already published by another job is kept.
+    """
+
+    return f"""producer_status="${{PIPESTATUS[0]}}"
+if [ "$producer_status" -eq 0 ] && [ -f {manifest_filename} ]; then
+    {{
+        read -r entry_dir
+        mapfile -t artifacts
+    }} < {manifest_filename}
+
+    if [ ! -e "$entry_dir" ]; then
+        tmp_entry_dir="$(mktemp -d "${{entry_dir}}.XXXXXXXX.tmp")"
+
+        for artifact in "${{artifacts[@]}}"; do
+            if [ -f "$artifact" ]; then
+                cp --reflink=auto "$artifact" "$tmp_entry_dir/"
+            fi
+        done
+        touch "$tmp_entry_dir/{COMPLETE_MARKER}"
+
+        chmod -R a-w "$tmp_entry_dir"
+        if ! mv -T "$tmp_entry_dir" "$entry_dir" 2> /dev/null; then
+            chmod -R u+w "$tmp_entry_dir"
+            rm -rf "$tmp_entry_dir"
+        fi
+    fi
+fi"""
@@ -0,0 +1,198 @@
+"""
+Reuse of JOREK equilibria and STARWALL responses produced by previous runs.
+
+Equilibria (the outputs of the JOREK initialisation stage) are keyed by the template
+directory (holding namelists, boundary and profiles) and the JOREK parameters that
+determine the equilibrium, i.e. all but those considered STARWALL invariants.
+STARWALL responses are keyed by the same along with the STARWALL parameters.
+
+Param sets whose artifacts are already stored have them linked into their working
+directory, while all others register their working directory as where the artifacts
+will be produced, from which the JOREK initialisation and STARWALL job scripts publish
+them if they succeed. Param sets are ordered such that those that must run the JOREK
+initialisation come first, followed by those that must only run STARWALL, so that each
+stage's job array need only cover a prefix of the register.
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+from ..artifact_store import ArtifactStore, canonical_hash, directory_digest
+from .starwall_invariants import STARWALL_INVARIANTS
+
+# Outputs of the JOREK initialisation stage, of which only those listed as produced are
+# checked for to determine if an equilibrium is stored, as the others may also be
+# present in the template. Restart files are modified in place by JOREK, and so are
+# copied out of the store rather than linked.
+EQUILIBRIUM_ARTIFACTS = [
+    "boundary.txt",
+    "equilibrium.txt",
+    "jorek00000.h5",
+    "jorek_restart.h5",
+]
+EQUILIBRIUM_PRODUCED_ARTIFACTS = ["equilibrium.txt", "jorek00000.h5"]
+EQUILIBRIUM_COPIED_ARTIFACTS = ["jorek_restart.h5"]
+
+STARWALL_RESPONSE = "starwall-response.dat"
+
+# Manifests, written to the working directories of param sets producing artifacts, from
+# which the job scripts publish them, see bash_publish_artifacts.
+EQUILIBRIUM_MANIFEST = "equilibrium.publish"
+STARWALL_RESPONSE_MANIFEST = "starwall_response.publish"
+
+
+def _equilibrium_params(jorek_params: dict) -> dict:
+    return {k: v for k, v in jorek_params.items() if k not in STARWALL_INVARIANTS}
+
+
+def equilibrium_key(template_digest: str, jorek_params: dict) -> str:
+    return canonical_hash(
+        "equilibrium", template_digest, _equilibrium_params(jorek_params)
+    )
+
+
+def starwall_response_key(
+    template_digest: str, jorek_params: dict, starwall_params: dict
+) -> str:
+    return canonical_hash(
+        "starwall_response",
+        template_digest,
+        _equilibrium_params(jorek_params),
+        starwall_params,
+    )
+
+
+class _StoredArtifacts:
+    def __init__(self):
+        self.equilibrium_key: Optional[str] = None
+        self.equilibrium_stored = False
+        self.starwall_response_key: Optional[str] = None
+        self.starwall_response_stored = False
+
+
+class JorekArtifacts:
+    """
+    Tracks which param sets' equilibria and STARWALL responses are already stored in the
+    given stores, either of which may be omitted to always produce those artifacts.
+    """
+
+    def __init__(
+        self,
+        template_dir: str,
+        equilibrium_store: Optional[str] = None,
+        starwall_response_store: Optional[str] = None,
+    ):
+        self._equilibria: Optional[ArtifactStore] = None
+        self._starwall_responses: Optional[ArtifactStore] = None
+
+        if equilibrium_store is not None:
+            self._equilibria = ArtifactStore(equilibrium_store)
+        if starwall_response_store is not None:
+            self._starwall_responses = ArtifactStore(starwall_response_store)
+
+        self._template_digest: Optional[str] = None
+        if self._equilibria is not None or self._starwall_responses is not None:
+            self._template_digest = directory_digest(template_dir)
+
+        self._artifacts: Dict[str, _StoredArtifacts] = {}
+
+    def lookup(self, name: str, jorek_params: dict, starwall_params: dict) -> None:
+        """
+        Looks up the stored artifacts of the named param set given its (full) JOREK and
+        STARWALL parameters.
+        """
+
+        artifacts = _StoredArtifacts()
+
+        if self._equilibria is not None:
+            artifacts.equilibrium_key = equilibrium_key(
+                self._template_digest, jorek_params
+            )
+            artifacts.equilibrium_stored = self._equilibria.has(
+                artifacts.equilibrium_key, EQUILIBRIUM_PRODUCED_ARTIFACTS
+            )
+
+        if self._starwall_responses is not None:
+            artifacts.starwall_response_key = starwall_response_key(
+                self._template_digest, jorek_params, starwall_params
+            )
+            # STARWALL runs after the JOREK initialisation, so a stored response is only
+            # used alongside a stored equilibrium.
+            artifacts.starwall_response_stored = (
+                artifacts.equilibrium_stored or self._equilibria is None
+            ) and self._starwall_responses.has(
+                artifacts.starwall_response_key, [STARWALL_RESPONSE]
+            )
+
+        self._artifacts[name] = artifacts
+
+    def equilibrium_stored(self, name: str) -> bool:
+        return name in self._artifacts and self._artifacts[name].equilibrium_stored
+
+    def starwall_response_stored(self, name: str) -> bool:
+        return (
+            name in self._artifacts and self._artifacts[name].starwall_response_stored
+        )
+
+    def order(self, names: Iterable[str]) -> List[str]:
+        """
+        Orders the named param sets such that those needing the JOREK initialisation
+        come first, then those needing only STARWALL, then those needing neither.
+        """
+
+        return sorted(
+            names,
+            key=lambda name: (
+                self.equilibrium_stored(name),
+                self.starwall_response_stored(name),
+            ),
+        )
+
+    def init_instances(self, names: Iterable[str]) -> int:
+        return len([name for name in names if not self.equilibrium_stored(name)])
+
+    def starwall_instances(self, names: Iterable[str]) -> int:
+        return len([name for name in names if not self.starwall_response_stored(name)])
+
+    def prepare_working_directory(self, name: str, working_dir: str) -> None:
+        """
+        Links the stored artifacts of the named param set into its working directory,
+        and registers the working directory as where any others will be produced.
+        """
+
+        if name not in self._artifacts:
+            return
+
+        artifacts = self._artifacts[name]
+
+        if self._equilibria is not None:
+            if artifacts.equilibrium_stored:
+                self._equilibria.link(
+                    artifacts.equilibrium_key,
+                    working_dir,
+                    [
+                        artifact
+                        for artifact in EQUILIBRIUM_ARTIFACTS
+                        if self._equilibria.has(artifacts.equilibrium_key, [artifact])
+                    ],
+                    EQUILIBRIUM_COPIED_ARTIFACTS,
+                )
+            else:
+                self._equilibria.register(
+                    artifacts.equilibrium_key,
+                    working_dir,
+                    EQUILIBRIUM_ARTIFACTS,
+                    EQUILIBRIUM_MANIFEST,
+                )
+
+        if self._starwall_responses is not None:
+            if artifacts.starwall_response_stored:
+                self._starwall_responses.link(
+                    artifacts.starwall_response_key, working_dir, [STARWALL_RESPONSE]
+                )
+            else:
+                self._starwall_responses.register(
+                    artifacts.starwall_response_key,
+                    working_dir,
+                    [STARWALL_RESPONSE],
+                    STARWALL_RESPONSE_MANIFEST,
+                )
@@ -2,13 +2,22 @@
 Contains the general workflow for Jorek runs.
 """
 
-from shutil import copytree
 from os.path import join as join_path
-from typing import Optional
+from typing import List, Optional
 from uuid import uuid4
 
-from .. import Workflow, WorkflowSettings
+from phdscripts.scheduler import JobGraph
+
+from .. import Workflow, WorkflowSettings, materialise_template
+from .artifacts import (
+    EQUILIBRIUM_MANIFEST,
+    STARWALL_RESPONSE_MANIFEST,
+    JorekArtifacts,
+)
 from .input_file import (
+    WALL_GEOMETRY_CACHE_DIRNAME,
+    WallGeometryCache,
+    precalculate_wall_geometries,
     update_starwall_input_file,
     write_fresh_jorek_input_files,
     write_resuming_jorek_input_files,
@@ -30,6 +39,10 @@ STARWALL_INPUT = "input_starwall"
 JOREK_RZPSI_INPUT = "rz_boundary.txt"
 JOREK_EXTRUDE_FROM_INPUT = "extrude_from_boundary.txt"
 
+# Template files that are rewritten for each param set, or are modified in place by
+# JOREK, and so must be copied into working directories rather than linked.
+JOREK_REWRITTEN_FILES = [JOREK_INPUT % "*", STARWALL_INPUT, "jorek_restart.h5"]
+
 
 class JorekBasicWorkflow(Workflow):
     """
@@ -48,7 +61,21 @@ class JorekBasicWorkflow(Workflow):
         jorek_params: dict = {},
         starwall_exec: Optional[str] = None,
         starwall_params: dict = {},
+        store_wall_geometries: bool = False,
+        starwall_response_store: Optional[str] = None,
+        equilibrium_store: Optional[str] = None,
     ):
+        """
+        If store_wall_geometries is set, STARWALL wall geometries calculated during
+        setup are stored under the run root to be reused by later setups.
+
+        If equilibrium_store or starwall_response_store are given, they are the
+        directories of stores of equilibria (the outputs of the JOREK initialisation)
+        and STARWALL responses shared between runs. Param sets whose equilibrium or
+        response is already stored link to it rather than producing it again, and those
+        of all other param sets are added to the stores.
+        """
+
         super().__init__(run_id, settings, resume)
 
         self.template_dir = template_dir
@@ -59,6 +86,9 @@ class JorekBasicWorkflow(Workflow):
         self.jorek_params = jorek_params
         self.starwall_exec = starwall_exec
         self.starwall_params = starwall_params
+        self.store_wall_geometries = store_wall_geometries
+        self.starwall_response_store = starwall_response_store
+        self.equilibrium_store = equilibrium_store
 
     def run(self, run_after: Optional[str] = None) -> str:
         """
@@ -66,38 +96,60 @@ class JorekBasicWorkflow(Workflow):
         last-scheduled jobs so as to allow other workflows to follow on from this
         workflow.
         """
+        graph = JobGraph()
+
         if not self.resume and self.starwall_exec is not None:
-            # JOREK Initialisation
-            jorek_init_id = self.settings.scheduler.array_batch_jobs(
-                self._jorek_job_script() % "init",
-                self._job_instances,
-                self.settings.parallel_jobs,
-                array_dependency=run_after,
-            )
-            # STARWALL
-            starwall_id = self.settings.scheduler.array_batch_jobs(
-                self._starwall_job_script(),
-                self._job_instances,
-                self.settings.parallel_jobs,
-                array_dependency=jorek_init_id,
-            )
-        else:
-            # No dependency to chain JOREK run onto.
-            starwall_id = None
+            # JOREK Initialisation, only for those param sets whose equilibrium isn't
+            # already stored, which are registered first.
+            if self._init_instances > 0:
+                graph.add_array(
+                    "jorek_init",
+                    self._jorek_job_script() % "init",
+                    self._init_instances,
+                    self.settings.parallel_jobs,
+                )
+            # STARWALL, only for those param sets whose response isn't already stored,
+            # which are registered next.
+            if self._starwall_instances > 0:
+                graph.add_array(
+                    "starwall",
+                    self._starwall_job_script(),
+                    self._starwall_instances,
+                    self.settings.parallel_jobs,
+                )
+                for index in range(min(self._starwall_instances, self._init_instances)):
+                    graph.add_dependency("starwall", index, "jorek_init", index)
 
-        # JOREK Run
-        return self.settings.scheduler.array_batch_jobs(
+        # JOREK Run, each following only the STARWALL (or, failing that,
+        # initialisation) task of its own param set.
+        graph.add_array(
+            "jorek_run",
             self._jorek_job_script() % "resume"
             if self.resume
             else self._jorek_job_script() % "run",
             self._job_instances,
             self.settings.parallel_jobs,
-            array_dependency=starwall_id if starwall_id is not None else run_after,
         )
+        for index in range(self._job_instances):
+            if graph.has_array("starwall") and index < self._starwall_instances:
+                graph.add_dependency("jorek_run", index, "starwall", index)
+            elif graph.has_array("jorek_init") and index < self._init_instances:
+                graph.add_dependency("jorek_run", index, "jorek_init", index)
+
+        return graph.submit(self.settings.scheduler, run_after)["jorek_run"]
 
     def _input_jorek(self, name: str) -> str:
         return join_path(self._working_dir(name), JOREK_INPUT)
 
+    def _template_input_jorek(self) -> str:
+        return join_path(self.template_dir, JOREK_INPUT % "template")
+
+    def _template_input_starwall(self) -> str:
+        return join_path(self.template_dir, STARWALL_INPUT)
+
+    def _template_filepaths(self) -> List[str]:
+        return [self._template_input_jorek(), self._template_input_starwall()]
+
     def _input_starwall(self, name: str) -> str:
         return join_path(self._working_dir(name), STARWALL_INPUT)
 
@@ -107,6 +159,65 @@ class JorekBasicWorkflow(Workflow):
     def _input_jorek_extrude_from(self, name: str) -> str:
         return join_path(self._working_dir(name), JOREK_EXTRUDE_FROM_INPUT)
 
+    def _wall_geometry_cache_dir(self) -> str:
+        return join_path(self._root_dir(), WALL_GEOMETRY_CACHE_DIRNAME)
+
+    def _prepare_working_directories(self) -> None:
+        """
+        Calculates every distinct STARWALL wall among the registered param sets up
+        front, so that each is only calculated once however many working directories
+        share it. Also determines which param sets' equilibria and STARWALL responses
+        are already stored, ordering the param sets such that those that must still run
+        the JOREK initialisation come first, followed by those that must still run
+        STARWALL.
+        """
+
+        stores_used = not self.resume and self.starwall_exec is not None
+
+        self._artifacts = JorekArtifacts(
+            self.template_dir,
+            self.equilibrium_store if stores_used else None,
+            self.starwall_response_store if stores_used else None,
+        )
+
+        self._wall_geometry_cache = WallGeometryCache(
+            self._wall_geometry_cache_dir() if self.store_wall_geometries else None
+        )
+
+        if self.resume or self.starwall_exec is None:
+            return
+
+        precalculate_wall_geometries(
+            join_path(self.template_dir, JOREK_EXTRUDE_FROM_INPUT),
+            join_path(self.template_dir, JOREK_RZPSI_INPUT),
+            [
+                {**self.starwall_params, **self._param_namespace("starwall", param_set)}
+                for param_set in self._param_sets.values()
+            ],
+            self._wall_geometry_cache,
+        )
+
+        for name, param_set in self._param_sets.items():
+            self._artifacts.lookup(
+                name,
+                {**self.jorek_params, **self._param_namespace("jorek", param_set)},
+                {
+                    **self.starwall_params,
+                    **self._param_namespace("starwall", param_set),
+                },
+            )
+
+        self._param_sets = {
+            name: self._param_sets[name]
+            for name in self._artifacts.order(self._param_sets.keys())
+        }
+
+    def _complete_setup(self) -> None:
+        self._init_instances = self._artifacts.init_instances(self._param_sets.keys())
+        self._starwall_instances = self._artifacts.starwall_instances(
+            self._param_sets.keys()
+        )
+
     def _register_param_set(self, _: dict) -> str:
         # No registration needed, just return an ID to serve as name of the param set.
         return uuid4().hex
@@ -136,6 +247,7 @@ class JorekBasicWorkflow(Workflow):
                 JOREK_JOB_ERR % "init",
                 "jorek_init",
                 "00:10:00",
+                publish=EQUILIBRIUM_MANIFEST,
             )
 
             ############
@@ -155,6 +267,7 @@ class JorekBasicWorkflow(Workflow):
                 STARWALL_JOB_ERR,
                 "starwall",
                 "02:00:00",
+                publish=STARWALL_RESPONSE_MANIFEST,
             )
 
         ####################
@@ -179,7 +292,12 @@ class JorekBasicWorkflow(Workflow):
         )
 
     def _build_working_directory(self, name: str, param_set: dict) -> None:
-        copytree(self.template_dir, self._working_dir(name), symlinks=True)
+        materialise_template(
+            self.template_dir,
+            self._working_dir(name),
+            JOREK_REWRITTEN_FILES,
+            self.settings.template_link_method,
+        )
 
         self._write_jorek_input_files(name, self._param_namespace("jorek", param_set))
         if not self.resume and self.starwall_exec is not None:
@@ -191,8 +309,13 @@ class JorekBasicWorkflow(Workflow):
                     **self._starwall_params,
                     **self._param_namespace("starwall", param_set),
                 },
+                self._template_input_starwall(),
+                self._template_cache,
+                self._wall_geometry_cache,
             )
 
+        self._artifacts.prepare_working_directory(name, self._working_dir(name))
+
     def _write_jorek_input_files(self, name: str, param_set: dict) -> None:
         params = {**self._jorek_params, **param_set}
         if self._timestep is not None:
@@ -201,6 +324,16 @@ class JorekBasicWorkflow(Workflow):
             params = {**params, "nstep_n": self._timestep_count}
 
         if self.resume:
-            write_resuming_jorek_input_files(self._input_jorek(name), params)
+            write_resuming_jorek_input_files(
+                self._input_jorek(name),
+                params,
+                self._template_input_jorek(),
+                self._template_cache,
+            )
         else:
-            write_fresh_jorek_input_files(self._input_jorek(name), params)
+            write_fresh_jorek_input_files(
+                self._input_jorek(name),
+                params,
+                self._template_input_jorek(),
+                self._template_cache,
+            )
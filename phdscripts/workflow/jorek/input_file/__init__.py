@@ -3,12 +3,15 @@ from .jorek import (
     write_fresh_jorek_input_files,
     write_resuming_jorek_input_files,
 )
-from .starwall import update_starwall_input_file
-
+from .starwall import precalculate_wall_geometries, update_starwall_input_file
+from .wall_geometry import WALL_GEOMETRY_CACHE_DIRNAME, WallGeometryCache
 
 __all__ = [
+    "precalculate_wall_geometries",
     "update_starwall_input_file",
     "write_jorek_input_file",
     "write_fresh_jorek_input_files",
     "write_resuming_jorek_input_files",
+    "WALL_GEOMETRY_CACHE_DIRNAME",
+    "WallGeometryCache",
 ]
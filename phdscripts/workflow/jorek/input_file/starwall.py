@@ -1,8 +1,14 @@
 from os.path import exists
-from typing import List, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 
-from phdscripts.boundary import decomp_fourier_2d, extrude
-from phdscripts.util import replace_fortran_parameter
+from phdscripts.util import replace_fortran_parameters
+
+from ...template import TemplateCache
+from .wall_geometry import (
+    WallGeometryCache,
+    calculate_wall_coefficients,
+    wall_geometry_key,
+)
 
 
 def _read_extrude_from(filepath: str) -> List[Tuple[float, float]]:
@@ -23,31 +29,18 @@ def _read_rz_psi(filepath: str) -> List[Tuple[float, float, float]]:
     return rz_psi
 
 
-def _calculate_wall_geometry(
-    extrude_from_filepath: str, rz_psi_filepath: str, params: dict
-) -> None:
-    """
-    Calculate wall geometry in STARWALL parameterisation by taking one of two boundaries
-    (extrude_from first, and the rz_psi boundary file of JOREK if the former does not
-    exist), and extruding according to a parameterised wall distance.
-
-    NOTE: this currently only supports axisymmetric cases and enforces reordering of
-          poloidal modes in STARWALL's parameterisation to be monotonically increasing
-          from lowest to highest mode.
-    NOTE: this currently only supports numerical boundaries, and not the shaping
-          parameters otherwise used by JOREK.
-    """
-
-    # Determine what wall scaling is desired.
+def _wall_extrude_method(params: dict) -> str:
+    if "wall_extrude_method" in params.keys():
+        return params["wall_extrude_method"]
 
-    wall_distance = params["wall_distance"]
-    method = "scale"
+    return "scale"
 
-    if "wall_extrude_method" in params.keys():
-        method = params["wall_extrude_method"]
 
-    # Obtain lowest and highest poloidal modes if they have been provided, capping them
-    # as needed, otherwise default to the most poloidal modes STARWALL supports.
+def _wall_modes(params: dict) -> Tuple[int, int]:
+    """
+    Obtain lowest and highest poloidal modes if they have been provided, capping them as
+    needed, otherwise default to the most poloidal modes STARWALL supports.
+    """
 
     lowest_mode = 999
     highest_mode = -999
@@ -64,6 +57,71 @@ def _calculate_wall_geometry(
     lowest_mode = max(-99, lowest_mode)
     highest_mode = min(99, highest_mode)
 
+    return lowest_mode, highest_mode
+
+
+def _wall_boundary_filepath(
+    extrude_from_filepath: str, rz_psi_filepath: str
+) -> Optional[str]:
+    """
+    Determines which boundary file to extrude the wall from: the extrude_from file, or
+    else the rz_psi boundary file of JOREK.
+    """
+
+    if exists(extrude_from_filepath):
+        return extrude_from_filepath
+    elif exists(rz_psi_filepath):
+        return rz_psi_filepath
+
+    print(
+        (
+            "Trying to prepare a case with extruded wall, but no boundary"
+            " provided to extrude from."
+        )
+    )
+
+    return None
+
+
+def _read_wall_boundary(
+    boundary_filepath: Optional[str], extrude_from_filepath: str
+) -> List[Tuple[float, float]]:
+    if boundary_filepath is None:
+        return []
+    elif boundary_filepath == extrude_from_filepath:
+        return _read_extrude_from(boundary_filepath)
+
+    # Drop psi information.
+    return [(x[0], x[1]) for x in _read_rz_psi(boundary_filepath)]
+
+
+def _calculate_wall_geometry(
+    extrude_from_filepath: str,
+    rz_psi_filepath: str,
+    params: dict,
+    wall_geometry_cache: Optional[WallGeometryCache] = None,
+) -> None:
+    """
+    Calculate wall geometry in STARWALL parameterisation by taking one of two boundaries
+    (extrude_from first, and the rz_psi boundary file of JOREK if the former does not
+    exist), and extruding according to a parameterised wall distance. If a wall
+    geometry cache is given, the geometry is only calculated if no wall has been
+    calculated from the same boundary and wall parameters before.
+
+    NOTE: this currently only supports axisymmetric cases and enforces reordering of
+          poloidal modes in STARWALL's parameterisation to be monotonically increasing
+          from lowest to highest mode.
+    NOTE: this currently only supports numerical boundaries, and not the shaping
+          parameters otherwise used by JOREK.
+    """
+
+    # Determine what wall scaling is desired.
+
+    wall_distance = params["wall_distance"]
+    method = _wall_extrude_method(params)
+
+    lowest_mode, highest_mode = _wall_modes(params)
+
     params["mn_w"] = abs(lowest_mode) + highest_mode + 1
     params["m_w"] = [x for x in range(lowest_mode, highest_mode + 1, 1)]
     params["n_w"] = [0 for _ in range(lowest_mode, highest_mode + 1, 1)]
@@ -71,32 +129,88 @@ def _calculate_wall_geometry(
     # Read extrude_from date file, or else rz_boundary.txt, or else JOREK namelist
     # geometry parameters.
 
-    boundary = []
+    boundary_filepath = _wall_boundary_filepath(extrude_from_filepath, rz_psi_filepath)
 
-    if exists(extrude_from_filepath):
-        boundary = _read_extrude_from(extrude_from_filepath)
-    elif exists(rz_psi_filepath):
-        # Drop psi information.
-        boundary = [(x[0], x[1]) for x in _read_rz_psi(rz_psi_filepath)]
-    else:
-        print(
-            (
-                "Trying to prepare a case with extruded wall, but no boundary"
-                " provided to extrude from."
-            )
+    key = None
+    if wall_geometry_cache is not None:
+        key = wall_geometry_key(
+            boundary_filepath,
+            boundary_filepath == extrude_from_filepath,
+            wall_distance,
+            method,
+            (lowest_mode, highest_mode),
         )
 
+        coeffs = wall_geometry_cache.get(key)
+        if coeffs is not None:
+            params.update(coeffs)
+            return
+
+    boundary = _read_wall_boundary(boundary_filepath, extrude_from_filepath)
+
     # Perform extrusion and decomposition into Fourier terms, storing those back into
     # the parameters dict.
 
-    wall_boundary = extrude(method, boundary, wall_distance - 1.0)
+    coeffs = calculate_wall_coefficients(
+        boundary, method, [wall_distance], (lowest_mode, highest_mode)
+    )[0]
 
-    coeffs = decomp_fourier_2d(wall_boundary, (lowest_mode, highest_mode))
+    if wall_geometry_cache is not None:
+        wall_geometry_cache.put(key, coeffs)
 
-    params["rc_w"] = [coeffs[idx][0] for idx in range(lowest_mode, highest_mode + 1, 1)]
-    params["rs_w"] = [coeffs[idx][1] for idx in range(lowest_mode, highest_mode + 1, 1)]
-    params["zc_w"] = [coeffs[idx][2] for idx in range(lowest_mode, highest_mode + 1, 1)]
-    params["zs_w"] = [coeffs[idx][3] for idx in range(lowest_mode, highest_mode + 1, 1)]
+    params.update(coeffs)
+
+
+def precalculate_wall_geometries(
+    extrude_from_filepath: str,
+    rz_psi_filepath: str,
+    param_sets: Iterable[dict],
+    wall_geometry_cache: WallGeometryCache,
+) -> None:
+    """
+    Calculates the wall geometry of every distinct wall among the given STARWALL param
+    sets, all extruded from the same boundary, into the wall geometry cache. Walls
+    differing only in distance are extruded together in a single call.
+    """
+
+    boundary_filepath = _wall_boundary_filepath(extrude_from_filepath, rz_psi_filepath)
+    if boundary_filepath is None:
+        return
+
+    is_extrude_from = boundary_filepath == extrude_from_filepath
+
+    # Group distances of walls missing from the cache by extrusion method and modes.
+    missing: Dict[Tuple[str, Tuple[int, int]], Dict[float, str]] = {}
+    for params in param_sets:
+        if "wall_distance" not in params.keys():
+            continue
+
+        method = _wall_extrude_method(params)
+        modes = _wall_modes(params)
+
+        key = wall_geometry_key(
+            boundary_filepath,
+            is_extrude_from,
+            params["wall_distance"],
+            method,
+            modes,
+        )
+
+        if wall_geometry_cache.get(key) is None:
+            missing.setdefault((method, modes), {})[params["wall_distance"]] = key
+
+    if len(missing) == 0:
+        return
+
+    boundary = _read_wall_boundary(boundary_filepath, extrude_from_filepath)
+
+    for (method, modes), keys in missing.items():
+        all_coeffs = calculate_wall_coefficients(
+            boundary, method, list(keys.keys()), modes
+        )
+
+        for key, coeffs in zip(keys.values(), all_coeffs):
+            wall_geometry_cache.put(key, coeffs)
 
 
 def update_starwall_input_file(
@@ -104,23 +218,36 @@ def update_starwall_input_file(
     extrude_from_filepath: str,
     rz_psi_filepath: str,
     params: dict,
+    template_filepath: Optional[str] = None,
+    template_cache: Optional[TemplateCache] = None,
+    wall_geometry_cache: Optional[WallGeometryCache] = None,
 ) -> None:
     """
     Updates STARWALL input file with parameters provided to this function, in the
-    case that a wall distance is supplied, extrusion is performed first.
+    case that a wall distance is supplied, extrusion is performed first (or the wall
+    obtained from the wall geometry cache if given). The input file may instead be
+    rendered from a separate template, obtained from a template cache if one is given.
     """
 
     if "wall_distance" in params.keys():
-        _calculate_wall_geometry(extrude_from_filepath, rz_psi_filepath, params)
+        _calculate_wall_geometry(
+            extrude_from_filepath, rz_psi_filepath, params, wall_geometry_cache
+        )
+
+    if template_filepath is None:
+        template_filepath = starwall_filepath
+
+    # TODO(Matthew): this doesn't handle cases where a parameter has not been placed
+    #                in the STARWALL input file already, we may want to handle that
+    #                explicitly (i.e. closing "/" line).
+    if template_cache is not None:
+        template_cache.render(template_filepath, starwall_filepath, params)
+        return
 
-    with open(starwall_filepath, "r") as f:
+    with open(template_filepath, "r") as f:
         starwall_input = f.read()
 
-    for param, value in params.items():
-        # TODO(Matthew): this doesn't handle cases where a parameter has not been placed
-        #                in the STARWALL input file already, we may want to handle that
-        #                explicitly (i.e. closing "/" line).
-        starwall_input = replace_fortran_parameter(value, param, starwall_input)
+    starwall_input = replace_fortran_parameters(params, starwall_input)
 
     with open(starwall_filepath, "w") as f:
         f.write(starwall_input)
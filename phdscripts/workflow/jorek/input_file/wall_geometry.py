@@ -0,0 +1,127 @@
+"""
+Calculation and content-addressed caching of STARWALL wall geometries.
+
+A wall's geometry is determined entirely by the boundary it is extruded from and the
+parameters of that extrusion, so it is cached keyed by a hash of the boundary file's
+contents along with the wall distance, extrusion method and poloidal mode range. Walls
+are held in-process, and optionally also stored as JSON files in a directory (e.g.
+under the run root) so that they are shared between processes and later runs.
+"""
+
+from hashlib import sha256
+from json import dump, dumps, load
+from os import makedirs, replace
+from os.path import isfile, join as join_path
+from tempfile import NamedTemporaryFile
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from numpy import asarray
+
+from phdscripts.boundary import decomp_fourier_2d_array, extrude_array
+
+WALL_GEOMETRY_CACHE_DIRNAME = "wall_geometry_cache"
+
+WallCoefficients = Dict[str, List[float]]
+
+
+def wall_geometry_key(
+    boundary_filepath: Optional[str],
+    is_extrude_from: bool,
+    wall_distance: float,
+    method: Union[str, Callable],
+    modes: Tuple[int, int],
+) -> str:
+    """
+    Obtains the key of the wall extruded from the given boundary file (which is either
+    an extrude_from file, or an rz_psi file) with the given wall parameters.
+    """
+
+    digest = sha256()
+
+    if boundary_filepath is not None:
+        with open(boundary_filepath, "rb") as f:
+            digest.update(f.read())
+
+    wall_params = {
+        "boundary_format": "extrude_from" if is_extrude_from else "rz_psi",
+        "wall_distance": float(wall_distance),
+        "method": method if isinstance(method, str) else repr(method),
+        "modes": list(modes),
+    }
+    digest.update(dumps(wall_params, sort_keys=True).encode("utf-8"))
+
+    return digest.hexdigest()
+
+
+def calculate_wall_coefficients(
+    boundary: List[Tuple[float, float]],
+    method: Union[str, Callable],
+    wall_distances: List[float],
+    modes: Tuple[int, int],
+) -> List[WallCoefficients]:
+    """
+    Extrudes walls at each of the given distances (relative to the boundary, i.e. a
+    distance of 1.0 is the boundary itself) in a single call, and decomposes each into
+    the Fourier coefficients of STARWALL's wall parameterisation for the given modes.
+    """
+
+    walls = extrude_array(method, boundary, asarray(wall_distances) - 1.0)
+
+    all_coeffs = []
+    for wall in walls:
+        coeffs = decomp_fourier_2d_array(wall, modes)
+
+        all_coeffs.append(
+            {
+                "rc_w": coeffs[:, 0].tolist(),
+                "rs_w": coeffs[:, 1].tolist(),
+                "zc_w": coeffs[:, 2].tolist(),
+                "zs_w": coeffs[:, 3].tolist(),
+            }
+        )
+
+    return all_coeffs
+
+
+class WallGeometryCache:
+    """
+    Cache of calculated wall geometries, keyed by wall_geometry_key. If a directory is
+    given, walls are also stored there and looked up from there on a miss in-process.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory
+        self._walls: Dict[str, WallCoefficients] = {}
+
+        if self.directory is not None:
+            makedirs(self.directory, exist_ok=True)
+
+    def _filepath(self, key: str) -> str:
+        return join_path(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[WallCoefficients]:
+        if key in self._walls:
+            return self._walls[key]
+
+        if self.directory is not None and isfile(self._filepath(key)):
+            with open(self._filepath(key), "r") as f:
+                self._walls[key] = load(f)
+
+            return self._walls[key]
+
+        return None
+
+    def put(self, key: str, coeffs: WallCoefficients) -> None:
+        self._walls[key] = coeffs
+
+        if self.directory is None:
+            return
+
+        # Write to a temporary file first, so that concurrent readers never see a
+        # partially written wall.
+        with NamedTemporaryFile(
+            "w", dir=self.directory, suffix=".tmp", delete=False
+        ) as f:
+            dump(coeffs, f)
+
+        replace(f.name, self._filepath(key))
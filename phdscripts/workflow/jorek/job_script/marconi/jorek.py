@@ -1,4 +1,8 @@
+from typing import Optional
+
+from phdscripts.parameter_pack import bash_lookup_parameter_set_name
 from phdscripts.scheduler import SchedulerDriver
+from phdscripts.workflow.artifact_store import bash_publish_artifacts
 
 
 def write_jorek_job_script(
@@ -13,7 +17,11 @@ def write_jorek_job_script(
     error_filename: str,
     log_name: str,
     walltime: str,
+    publish: Optional[str] = None,
 ):
+    # Publish any artifacts the job is registered to produce, see JorekArtifacts.
+    publish_artifacts = bash_publish_artifacts(publish) if publish is not None else ""
+
     scheduler.write_array_job_script(
         job_script_filename,
         f"""
@@ -29,16 +37,15 @@ export I_MPI_PIN_DOMAIN=auto        # and have been useful for decreasing comput
 export KMP_HW_SUBSET=1t             # time on KNL
 
 # Obtain working directory name from reigster.
-line_num=$((${{JOB_INDEX}} + 1))
-param_set="$(sed -n ${{line_num}}p {register})"
-IFS=',' read -ra param_set_parts <<< "$param_set"
-param_set_name="${{param_set_parts[0]}}"
+{bash_lookup_parameter_set_name(register)}
 
 cd {root_dir}/${{param_set_name}}
 
 mpirun -n 2                                \\
     {jorek_exec} < {input_filename} \\
         | tee log.{log_name}
+
+{publish_artifacts}
         """,
         job_name=f"{run_id}_{log_name}",
         partition="skl_fua_prod",
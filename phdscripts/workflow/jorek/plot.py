@@ -6,6 +6,8 @@ from os.path import isdir
 from os.path import join as join_path
 from typing import Optional
 
+from phdscripts.parameter_pack import bash_lookup_parameter_set_name
+
 from .. import Workflow, WorkflowSettings
 
 PLOT_JOB_SCRIPT = "plot.job.run"
@@ -61,10 +63,7 @@ source $HOME/.loaders/load_2017_env.sh
 source $HOME/.loaders/load_nov1_21_jorek.sh
 
 # Obtain working directory name from reigster.
-line_num=$((${{JOB_INDEX}} + 1))
-param_set="$(sed -n ${{line_num}}p {self._param_set_register()})"
-IFS=',' read -ra param_set_parts <<< "$param_set"
-param_set_name="${{param_set_parts[0]}}"
+{bash_lookup_parameter_set_name(self._param_set_register())}
 
 # Enter working directory.
 cd {self._root_dir()}/${{param_set_name}}
@@ -21,14 +21,25 @@ Currently, JOREK parameters on which equilibrim and STARWALL are grouped are:
             D_imp_extra_p, D_imp_extra_neg, D_imp_extra_neg_thresh
 """
 
-from shutil import copytree
 from os import symlink
 from os.path import isdir, join as join_path
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 from uuid import uuid4
 
-from .. import Workflow, WorkflowSettings
+from phdscripts.scheduler import JobGraph
+
+from .. import TemplateCache, Workflow, WorkflowSettings, materialise_template
+from ..artifact_store import canonical_json
+from .artifacts import (
+    EQUILIBRIUM_MANIFEST,
+    STARWALL_RESPONSE,
+    STARWALL_RESPONSE_MANIFEST,
+    JorekArtifacts,
+)
 from .input_file import (
+    WALL_GEOMETRY_CACHE_DIRNAME,
+    WallGeometryCache,
+    precalculate_wall_geometries,
     update_starwall_input_file,
     write_fresh_jorek_input_files,
     write_resuming_jorek_input_files,
@@ -52,6 +63,10 @@ STARWALL_INPUT = "input_starwall"
 JOREK_RZPSI_INPUT = "rz_boundary.txt"
 JOREK_EXTRUDE_FROM_INPUT = "extrude_from_boundary.txt"
 
+# Template files that are rewritten for each param set, or are modified in place by
+# JOREK, and so must be copied into working directories rather than linked.
+JOREK_REWRITTEN_FILES = [JOREK_INPUT % "*", STARWALL_INPUT, "jorek_restart.h5"]
+
 
 class _JorekStagedTimeEvolWorkflow(Workflow):
     """
@@ -86,18 +101,44 @@ class _JorekStagedTimeEvolWorkflow(Workflow):
         workflow.
         """
 
+        graph = JobGraph()
+
+        self.add_jobs(graph, self.run_id)
+
+        return graph.submit(self.settings.scheduler, run_after)[self.run_id]
+
+    def add_jobs(
+        self,
+        graph: JobGraph,
+        name: str,
+        depends_on: Optional[Tuple[str, int]] = None,
+    ) -> None:
+        """
+        Adds the jobs of this workflow to the job graph as an array of the given name,
+        each job waiting on the (array name, index) task depends_on if given.
+        """
+
         # JOREK Run
-        return self.settings.scheduler.array_batch_jobs(
+        graph.add_array(
+            name,
             self._jorek_job_script() % "resume",
             self._job_instances,
             self.settings.parallel_jobs,
-            array_dependency=run_after,
-            blocking=True,
         )
 
+        if depends_on is not None:
+            for index in range(self._job_instances):
+                graph.add_dependency(name, index, *depends_on)
+
     def _input_jorek(self, name: str) -> str:
         return join_path(self._working_dir(name), JOREK_INPUT)
 
+    def _template_input_jorek(self) -> str:
+        return join_path(self.template_dir, JOREK_INPUT % "template")
+
+    def _template_filepaths(self) -> List[str]:
+        return [self._template_input_jorek()]
+
     def _register_param_set(self, _: dict) -> str:
         # No registration needed, just return an ID to serve as name of the param set.
         return uuid4().hex
@@ -135,7 +176,7 @@ class _JorekStagedTimeEvolWorkflow(Workflow):
             "equilibrium.txt",
             "jorek00000.h5",
             "jorek_restart.h5",
-            "starwall-response.dat",
+            STARWALL_RESPONSE,
         ]
 
         for file in files:
@@ -145,7 +186,12 @@ class _JorekStagedTimeEvolWorkflow(Workflow):
             symlink(src_path, dest_path)
 
     def _build_working_directory(self, name: str, param_set: dict) -> None:
-        copytree(self.template_dir, self._working_dir(name), symlinks=True)
+        materialise_template(
+            self.template_dir,
+            self._working_dir(name),
+            JOREK_REWRITTEN_FILES,
+            self.settings.template_link_method,
+        )
 
         self.__create_symlinks_for_equil_and_starwall(
             self.parent_dir, self._working_dir(name)
@@ -158,7 +204,12 @@ class _JorekStagedTimeEvolWorkflow(Workflow):
             params = {**params, "nstep_n": self.timestep_count}
         params = {**params, "freeboundary": True}
 
-        write_resuming_jorek_input_files(self._input_jorek(name), params)
+        write_resuming_jorek_input_files(
+            self._input_jorek(name),
+            params,
+            self._template_input_jorek(),
+            self._template_cache,
+        )
 
 
 class StarwallInvariantClass:
@@ -174,18 +225,24 @@ class StarwallInvariantClass:
     def append_param_set(self, param_set: dict):
         self._param_sets.append(param_set)
 
-    def setup(self, subworkflow: _JorekStagedTimeEvolWorkflow):
+    def setup(
+        self,
+        subworkflow: _JorekStagedTimeEvolWorkflow,
+        template_cache: Optional[TemplateCache] = None,
+    ):
         # We only need to specify the template directory here, everything else is the
         # same for all invariant classes.
         self._subworkflow = subworkflow
 
-        self._subworkflow.setup(self._param_sets)
+        self._subworkflow.setup(self._param_sets, template_cache)
 
-    def run(self, run_after: Optional[str] = None):
+    def add_jobs(
+        self, graph: JobGraph, depends_on: Optional[Tuple[str, int]] = None
+    ) -> None:
         if self._subworkflow is None:
             return
 
-        self._subworkflow.run(run_after)
+        self._subworkflow.add_jobs(graph, self.name, depends_on)
 
 
 class JorekStagedWorkflow(Workflow):
@@ -205,7 +262,24 @@ class JorekStagedWorkflow(Workflow):
         jorek_params: dict = {},
         starwall_exec: Optional[str] = None,
         starwall_params: dict = {},
+        store_wall_geometries: bool = False,
+        starwall_response_store: Optional[str] = None,
+        equilibrium_store: Optional[str] = None,
     ):
+        """
+        If store_wall_geometries is set, STARWALL wall geometries calculated during
+        setup are stored under the run root to be reused by later setups.
+
+        If starwall_response_store is given, it is the directory of a store of STARWALL
+        responses shared between runs. Classes whose response is already in the store
+        link to it rather than running STARWALL, and the responses of all other classes
+        are added to it.
+
+        Likewise, if equilibrium_store is given, it is the directory of a store of
+        equilibria (the outputs of the JOREK initialisation) shared between runs, and
+        classes whose equilibrium is already in the store skip the initialisation.
+        """
+
         super().__init__(run_id, settings, resume)
 
         self.template_dir = template_dir
@@ -216,6 +290,9 @@ class JorekStagedWorkflow(Workflow):
         self.jorek_params = jorek_params
         self.starwall_exec = starwall_exec
         self.starwall_params = starwall_params
+        self.store_wall_geometries = store_wall_geometries
+        self.starwall_response_store = starwall_response_store
+        self.equilibrium_store = equilibrium_store
         self._starwall_invariant_classes: Dict[str, StarwallInvariantClass] = {}
 
     def run(self, run_after: Optional[str] = None) -> str:
@@ -224,27 +301,57 @@ class JorekStagedWorkflow(Workflow):
         last-scheduled jobs so as to allow other workflows to follow on from this
         workflow.
         """
+        graph = JobGraph()
+
         if not self.resume and self.starwall_exec is not None:
-            # JOREK Initialisation
-            jorek_init_id = self.settings.scheduler.array_batch_jobs(
-                self._jorek_job_script() % "init",
-                self._job_instances,
-                self.settings.parallel_jobs,
-                array_dependency=run_after,
-            )
-            # STARWALL
-            starwall_id = self.settings.scheduler.array_batch_jobs(
-                self._starwall_job_script(),
-                self._job_instances,
-                self.settings.parallel_jobs,
-                array_dependency=jorek_init_id,
-            )
-        else:
-            # No dependency to chain JOREK run onto.
-            starwall_id = None
+            # JOREK Initialisation, only for those classes whose equilibrium isn't
+            # already stored, which are registered first.
+            if self._init_instances > 0:
+                graph.add_array(
+                    "jorek_init",
+                    self._jorek_job_script() % "init",
+                    self._init_instances,
+                    self.settings.parallel_jobs,
+                )
+            # STARWALL, only for those classes whose response isn't already stored,
+            # which are registered next. Each follows the initialisation of its own
+            # class, where there is one.
+            if self._starwall_instances > 0:
+                graph.add_array(
+                    "starwall",
+                    self._starwall_job_script(),
+                    self._starwall_instances,
+                    self.settings.parallel_jobs,
+                )
+                for index in range(min(self._starwall_instances, self._init_instances)):
+                    graph.add_dependency("starwall", index, "jorek_init", index)
 
-        for starwall_invariant_class in self._starwall_invariant_classes.values():
-            starwall_invariant_class.run(starwall_id)
+        starwall_invariant_classes = {
+            starwall_invariant_class.name: starwall_invariant_class
+            for starwall_invariant_class in self._starwall_invariant_classes.values()
+        }
+
+        # Time evolution of each class follows only the STARWALL (or, failing that,
+        # initialisation) task of that class.
+        for index, name in enumerate(self._param_sets.keys()):
+            if graph.has_array("starwall") and index < self._starwall_instances:
+                depends_on = ("starwall", index)
+            elif graph.has_array("jorek_init") and index < self._init_instances:
+                depends_on = ("jorek_init", index)
+            else:
+                depends_on = None
+
+            starwall_invariant_classes[name].add_jobs(graph, depends_on)
+
+        array_ids = graph.submit(self.settings.scheduler, run_after)
+
+        return ":".join(
+            [
+                array_ids[name]
+                for name in self._param_sets.keys()
+                if name in array_ids and array_ids[name] != ""
+            ]
+        )
 
     def _starwall_variant_params(self, param_set: dict) -> dict:
         """
@@ -267,6 +374,15 @@ class JorekStagedWorkflow(Workflow):
     def _input_jorek(self, name: str) -> str:
         return join_path(self._working_dir(name), JOREK_INPUT)
 
+    def _template_input_jorek(self) -> str:
+        return join_path(self.template_dir, JOREK_INPUT % "template")
+
+    def _template_input_starwall(self) -> str:
+        return join_path(self.template_dir, STARWALL_INPUT)
+
+    def _template_filepaths(self) -> List[str]:
+        return [self._template_input_jorek(), self._template_input_starwall()]
+
     def _input_starwall(self, name: str) -> str:
         return join_path(self._working_dir(name), STARWALL_INPUT)
 
@@ -276,6 +392,59 @@ class JorekStagedWorkflow(Workflow):
     def _input_jorek_extrude_from(self, name: str) -> str:
         return join_path(self._working_dir(name), JOREK_EXTRUDE_FROM_INPUT)
 
+    def _wall_geometry_cache_dir(self) -> str:
+        return join_path(self._root_dir(), WALL_GEOMETRY_CACHE_DIRNAME)
+
+    def _prepare_working_directories(self) -> None:
+        """
+        Calculates every distinct STARWALL wall among the registered param sets up
+        front, so that each is only calculated once however many working directories
+        share it. Also determines which classes' equilibria and STARWALL responses are
+        already stored, ordering the param sets such that those classes that must still
+        run the JOREK initialisation come first, followed by those that must still run
+        STARWALL.
+        """
+
+        stores_used = not self.resume and self.starwall_exec is not None
+
+        self._artifacts = JorekArtifacts(
+            self.template_dir,
+            self.equilibrium_store if stores_used else None,
+            self.starwall_response_store if stores_used else None,
+        )
+
+        self._wall_geometry_cache = WallGeometryCache(
+            self._wall_geometry_cache_dir() if self.store_wall_geometries else None
+        )
+
+        if self.resume or self.starwall_exec is None:
+            return
+
+        precalculate_wall_geometries(
+            join_path(self.template_dir, JOREK_EXTRUDE_FROM_INPUT),
+            join_path(self.template_dir, JOREK_RZPSI_INPUT),
+            [
+                {**self.starwall_params, **self._param_namespace("starwall", param_set)}
+                for param_set in self._param_sets.values()
+            ],
+            self._wall_geometry_cache,
+        )
+
+        for name, param_set in self._param_sets.items():
+            self._artifacts.lookup(
+                name,
+                {**self.jorek_params, **self._param_namespace("jorek", param_set)},
+                {
+                    **self.starwall_params,
+                    **self._param_namespace("starwall", param_set),
+                },
+            )
+
+        self._param_sets = {
+            name: self._param_sets[name]
+            for name in self._artifacts.order(self._param_sets.keys())
+        }
+
     def _register_param_set(self, param_set: dict) -> str:
         """
         Each param set has a shared canonical name with all other parmaeter sets that
@@ -294,12 +463,16 @@ class JorekStagedWorkflow(Workflow):
             },
         }
 
-        if str(variant_params) not in self._starwall_invariant_classes:
-            self._starwall_invariant_classes[
-                str(variant_params)
-            ] = StarwallInvariantClass(uuid4().hex)
+        # Canonical, so that param sets are classed together however their parameters
+        # are ordered.
+        variant_key = canonical_json(variant_params)
+
+        if variant_key not in self._starwall_invariant_classes:
+            self._starwall_invariant_classes[variant_key] = StarwallInvariantClass(
+                uuid4().hex
+            )
 
-        starwall_invariant_class = self._starwall_invariant_classes[str(variant_params)]
+        starwall_invariant_class = self._starwall_invariant_classes[variant_key]
 
         starwall_invariant_class.append_param_set(param_set)
 
@@ -311,7 +484,16 @@ class JorekStagedWorkflow(Workflow):
         STARWALL-invariant classes, set up corresponding workflows
         """
 
+        self._init_instances = self._artifacts.init_instances(self._param_sets.keys())
+        self._starwall_instances = self._artifacts.starwall_instances(
+            self._param_sets.keys()
+        )
+
         for starwall_invariant_class in self._starwall_invariant_classes.values():
+            # Nothing to evolve from if the class' own working directory failed.
+            if starwall_invariant_class.name in self._setup_failures:
+                continue
+
             starwall_invariant_class.setup(
                 _JorekStagedTimeEvolWorkflow(
                     run_id="time_evol",
@@ -324,14 +506,19 @@ class JorekStagedWorkflow(Workflow):
                         self.settings.parallel_jobs,
                         self.settings.machine,
                         self.settings.scheduler,
+                        self.settings.setup_workers,
+                        self.settings.setup_executor,
+                        self.settings.template_link_method,
                     ),
+                    resume=False,
                     template_dir=self.template_dir,
                     parent_dir=self._working_dir(starwall_invariant_class.name),
                     jorek_exec=self.jorek_exec,
                     timestep=self.timestep,
                     timestep_count=self.timestep_count,
                     jorek_params=self.jorek_params,
-                )
+                ),
+                self._template_cache,
             )
 
     def _jorek_job_script(self) -> str:
@@ -363,6 +550,7 @@ class JorekStagedWorkflow(Workflow):
             "00:20:00",
             nodes=2,
             ntasks=16,
+            publish=EQUILIBRIUM_MANIFEST,
         )
 
         ############
@@ -382,6 +570,7 @@ class JorekStagedWorkflow(Workflow):
             STARWALL_JOB_ERR,
             "starwall",
             "02:00:00",
+            publish=STARWALL_RESPONSE_MANIFEST,
         )
 
     def _build_working_directory(self, name: str, param_set: dict) -> None:
@@ -390,7 +579,12 @@ class JorekStagedWorkflow(Workflow):
         if isdir(self._working_dir(name)):
             return
 
-        copytree(self.template_dir, self._working_dir(name), symlinks=True)
+        materialise_template(
+            self.template_dir,
+            self._working_dir(name),
+            JOREK_REWRITTEN_FILES,
+            self.settings.template_link_method,
+        )
 
         self._write_jorek_input_files(name, self._param_namespace("jorek", param_set))
         if not self.resume and self.starwall_exec is not None:
@@ -402,8 +596,13 @@ class JorekStagedWorkflow(Workflow):
                     **self.starwall_params,
                     **self._param_namespace("starwall", param_set),
                 },
+                self._template_input_starwall(),
+                self._template_cache,
+                self._wall_geometry_cache,
             )
 
+        self._artifacts.prepare_working_directory(name, self._working_dir(name))
+
     def _write_jorek_input_files(self, name: str, param_set: dict) -> None:
         params = {**self.jorek_params, **param_set}
         if self.timestep is not None:
@@ -412,6 +611,16 @@ class JorekStagedWorkflow(Workflow):
             params = {**params, "nstep_n": self.timestep_count}
 
         if self.resume:
-            write_resuming_jorek_input_files(self._input_jorek(name), params)
+            write_resuming_jorek_input_files(
+                self._input_jorek(name),
+                params,
+                self._template_input_jorek(),
+                self._template_cache,
+            )
         else:
-            write_fresh_jorek_input_files(self._input_jorek(name), params)
+            write_fresh_jorek_input_files(
+                self._input_jorek(name),
+                params,
+                self._template_input_jorek(),
+                self._template_cache,
+            )
@@ -1,3 +1,4 @@
+from phdscripts.parameter_pack import bash_lookup_parameter_set_name
 from phdscripts.scheduler import SchedulerDriver
 
 
@@ -18,10 +19,7 @@ source $HOME/.loaders/load_2017_env.sh
 source $HOME/.loaders/load_nov1_21_jorek.sh
 
 # Obtain working directory name from reigster.
-line_num=$((${{JOB_INDEX}} + 1))
-param_set="$(sed -n ${{line_num}}p {register})"
-IFS=',' read -ra param_set_parts <<< "$param_set"
-param_set_name="${{param_set_parts[0]}}"
+{bash_lookup_parameter_set_name(register)}
 
 cd {root_dir}/${{param_set_name}}
 
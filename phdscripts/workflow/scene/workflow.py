@@ -2,19 +2,12 @@
 Contains the general workflow for Mishka runs.
 """
 
-from shutil import copytree
 from os.path import join as join_path
-from typing import Optional
+from typing import List, Optional
 
-from phdscripts.util import (  # replace_parameterised_decimal_number_in_list,
-    convert_standard_to_fortran_number,
-    has_parameterised_fortran_bool,
-    has_parameterised_fortran_number,
-    replace_parameterised_fortran_bool,
-    replace_parameterised_fortran_number,
-)
+from phdscripts.util import convert_standard_to_fortran_number
 
-from .. import Workflow, WorkflowSettings
+from .. import Workflow, WorkflowSettings, materialise_template
 from .job_script import write_scene_job_script
 
 MISHKA_JOB_SCRIPT = "scene.job.run"
@@ -23,6 +16,10 @@ MISHKA_JOB_ERR = "scene.job.err"
 MISHKA_TEMPLATE_INPUT = "fort.10"
 MISHKA_INPUT = "fort.10"
 
+# Template files that are rewritten for each param set, and so must be copied into
+# working directories rather than linked.
+SCENE_REWRITTEN_FILES = [MISHKA_INPUT]
+
 
 class SceneWorkflow(Workflow):
     """
@@ -58,8 +55,8 @@ class SceneWorkflow(Workflow):
             array_dependency=run_after,
         )
 
-    def _input_scene_template(self, name: str) -> str:
-        return join_path(self._working_dir(name), MISHKA_TEMPLATE_INPUT)
+    def _input_scene_template(self) -> str:
+        return join_path(self._template_dir, MISHKA_TEMPLATE_INPUT)
 
     def _input_scene(self, name: str) -> str:
         return join_path(self._working_dir(name), MISHKA_INPUT)
@@ -77,6 +74,9 @@ class SceneWorkflow(Workflow):
 
         return canonical_param_set_name
 
+    def _template_filepaths(self) -> List[str]:
+        return [self._input_scene_template()]
+
     def _scene_job_script(self) -> str:
         return join_path(self._root_dir(), MISHKA_JOB_SCRIPT)
 
@@ -95,7 +95,12 @@ class SceneWorkflow(Workflow):
         )
 
     def _build_working_directory(self, name: str, param_set: dict) -> None:
-        copytree(self._template_dir, self._working_dir(name), symlinks=True)
+        materialise_template(
+            self._template_dir,
+            self._working_dir(name),
+            SCENE_REWRITTEN_FILES,
+            self.settings.template_link_method,
+        )
 
         params = {**param_set, **self._scene_params}
 
@@ -104,30 +109,37 @@ class SceneWorkflow(Workflow):
     def _write_scene_input_file(
         self, name: str, output_filepath: str, param_set: dict
     ) -> None:
-        with open(self._input_scene_template(name), "r") as f:
-            scene_input = f.read()
+        # Parameters are looked for assigned with "=", but substituted as if assigned
+        # by whitespace alone.
+        assigned = self._template_cache.get(self._input_scene_template())
+        template = self._template_cache.get(self._input_scene_template(), " *")
 
         # TODO(Matthew): Handle species information at end of SCENE dat file.
 
-        for param, value in param_set.items():
-            if isinstance(value, bool):
-                if has_parameterised_fortran_bool(param, scene_input):
-                    scene_input = replace_parameterised_fortran_bool(
-                        param, value, scene_input, intermediate=" *"
-                    )
-            elif isinstance(value, (float, int)):
-                if has_parameterised_fortran_number(param, scene_input):
-                    scene_input = replace_parameterised_fortran_number(
-                        param, value, scene_input, intermediate=" *"
-                    )
-                else:
-                    # TODO(Matthew): this actually breaks for now as there is a
-                    #                structure to Mishka inputs that we need to handle
-                    #                (i.e. closing "&END" line).
-                    scene_input += (
-                        f"\n{param} = "
-                        f"{convert_standard_to_fortran_number(str(value))}"
-                    )
+        # Only bools and numbers are substituted into SCENE inputs.
+        params = {
+            param: value
+            for param, value in param_set.items()
+            if isinstance(value, (bool, float, int))
+        }
+        substituted = {
+            param: value
+            for param, value in params.items()
+            if assigned.has_parameter(param, value)
+        }
+
+        scene_input = template.render(substituted)
+
+        for param, value in params.items():
+            if isinstance(value, bool) or param in substituted:
+                continue
+
+            # TODO(Matthew): this actually breaks for now as there is a structure to
+            #                SCENE inputs that we need to handle (i.e. closing "&END"
+            #                line).
+            scene_input += (
+                f"\n{param} = {convert_standard_to_fortran_number(str(value))}"
+            )
 
         with open(output_filepath, "w") as f:
             f.write(scene_input)
@@ -0,0 +1,194 @@
+"""
+Materialisation of template directories into working directories.
+
+Rather than copying every file of a template, only those files that will be rewritten
+for a param set (or modified in place by the jobs run in the working directory) are
+copied, while all others are linked to the template's copy by one of:
+    - "reflink": a copy-on-write clone of the file, where the filesystem supports it,
+    - "hardlink": a hard link to the file,
+    - "symlink": a symbolic link to the file,
+    - "copy": a plain copy of the file, as copytree would make.
+Where a link can't be made (e.g. reflinks on a filesystem without support for them, or
+hard links across devices), the file is copied instead.
+
+NOTE: hard and symbolic links share data with the template, so any file that will be
+      modified in place must be listed as rewritten when using them. Reflinks and copies
+      are always safe.
+
+A manifest recording how each file was materialised is written into the working
+directory as TEMPLATE_MANIFEST_FILENAME.
+
+Input files rewritten for each param set are rendered from a TemplateCache, which reads
+and indexes each template once rather than once per working directory.
+"""
+
+from fnmatch import fnmatch
+from json import dump
+from os import link, makedirs, readlink, remove, scandir, stat, symlink
+from os.path import abspath, join as join_path
+from shutil import copy2, copystat
+from typing import Dict, Iterable, Tuple
+
+from phdscripts.util import FortranNamelistTemplate
+
+TEMPLATE_MANIFEST_FILENAME = "template_manifest.json"
+
+LINK_METHODS = ["reflink", "hardlink", "symlink", "copy"]
+
+# Linux ioctl request for cloning a file's extents into another file, see ioctl_ficlone.
+_FICLONE = 0x40049409
+
+
+def __reflink(src: str, dest: str) -> None:
+    from fcntl import ioctl
+
+    with open(src, "rb") as src_file, open(dest, "wb") as dest_file:
+        ioctl(dest_file.fileno(), _FICLONE, src_file.fileno())
+
+    copystat(src, dest)
+
+
+def __materialise_file(src: str, dest: str, link_method: str) -> str:
+    """
+    Materialises a single file by the given method, falling back to a copy if that
+    method fails, and returns the method that was actually used.
+    """
+
+    try:
+        if link_method == "reflink":
+            __reflink(src, dest)
+            return "reflink"
+        elif link_method == "hardlink":
+            link(src, dest)
+            return "hardlink"
+        elif link_method == "symlink":
+            symlink(abspath(src), dest)
+            return "symlink"
+    except (OSError, ImportError):
+        try:
+            remove(dest)
+        except FileNotFoundError:
+            pass
+
+    copy2(src, dest)
+    return "copy"
+
+
+def __materialise_directory(
+    src: str,
+    dest: str,
+    relative_dir: str,
+    rewritten: Iterable[str],
+    link_method: str,
+    manifest: Dict[str, str],
+) -> None:
+    makedirs(dest)
+
+    for entry in scandir(src):
+        relative_path = join_path(relative_dir, entry.name)
+        dest_path = join_path(dest, entry.name)
+
+        if entry.is_symlink():
+            # As with copytree(..., symlinks=True), symlinks in the template are kept
+            # as symlinks rather than having their targets materialised.
+            symlink(readlink(entry.path), dest_path)
+            manifest[relative_path] = "symlink"
+        elif entry.is_dir():
+            __materialise_directory(
+                entry.path, dest_path, relative_path, rewritten, link_method, manifest
+            )
+        elif any(fnmatch(relative_path, pattern) for pattern in rewritten):
+            copy2(entry.path, dest_path)
+            manifest[relative_path] = "copy"
+        else:
+            manifest[relative_path] = __materialise_file(
+                entry.path, dest_path, link_method
+            )
+
+    copystat(src, dest)
+
+
+def materialise_template(
+    template_dir: str,
+    dest_dir: str,
+    rewritten: Iterable[str] = (),
+    link_method: str = "reflink",
+) -> Dict[str, str]:
+    """
+    Materialises the template directory at the destination, which must not already
+    exist. Files whose path relative to the template directory matches any of the
+    rewritten glob patterns are copied, all other files are linked by the given method.
+    Returns the manifest of how each file was materialised, keyed by relative path.
+    """
+
+    if link_method not in LINK_METHODS:
+        raise ValueError(
+            f"Template link method must be one of {LINK_METHODS}, not {link_method}."
+        )
+
+    rewritten = list(rewritten)
+
+    manifest: Dict[str, str] = {}
+
+    __materialise_directory(
+        template_dir, dest_dir, "", rewritten, link_method, manifest
+    )
+
+    with open(join_path(dest_dir, TEMPLATE_MANIFEST_FILENAME), "w") as f:
+        dump(manifest, f, indent=4)
+
+    return manifest
+
+
+class TemplateCache:
+    """
+    Cache of parsed namelist templates keyed by path, such that each template is read
+    and indexed once however many param sets are rendered from it. Entries are
+    invalidated if the template's modification time or size change.
+    """
+
+    def __init__(self):
+        self._templates: Dict[
+            str, Tuple[Tuple[int, int], str, Dict[str, FortranNamelistTemplate]]
+        ] = {}
+
+    def get(
+        self, filepath: str, intermediate: str = " *= *"
+    ) -> FortranNamelistTemplate:
+        key = abspath(filepath)
+
+        template_stat = stat(filepath)
+        version = (template_stat.st_mtime_ns, template_stat.st_size)
+
+        if key not in self._templates or self._templates[key][0] != version:
+            with open(filepath, "r") as f:
+                self._templates[key] = (version, f.read(), {})
+
+        _, text, templates = self._templates[key]
+
+        # Templates are indexed separately for each form of assignment they are
+        # searched for.
+        if intermediate not in templates:
+            templates[intermediate] = FortranNamelistTemplate(text, intermediate)
+
+        return templates[intermediate]
+
+    def render(
+        self,
+        template_filepath: str,
+        output_filepath: str,
+        params: dict,
+        intermediate: str = " *= *",
+    ) -> None:
+        """
+        Renders the given parameters into the template, writing the result to the
+        output file in a single write.
+        """
+
+        rendered = self.get(template_filepath, intermediate).render(params)
+
+        with open(output_filepath, "w") as f:
+            f.write(rendered)
+
+    def clear(self) -> None:
+        self._templates.clear()
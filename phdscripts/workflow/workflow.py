@@ -4,6 +4,7 @@ Abstract definition of a workflow.
 
 import logging
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from os import makedirs
 from os.path import isdir, isfile
 from os.path import join as join_path
@@ -12,13 +13,22 @@ from typing import Dict, List, Optional, Union
 
 from phdscripts.parameter_pack import (
     ParameterPack,
+    has_register_index,
     write_named_parameter_sets,
+    write_register_index,
     read_named_parameter_sets,
 )
 from phdscripts.scheduler import SchedulerDriver
 
+from .template import LINK_METHODS, TemplateCache
+
 PARAM_SET_REGISTER_FILENAME = "param_set_register"
 
+# Building working directories in a pool of processes isn't offered, as that would
+# require pickling the workflow, whose scheduler drivers hold locks and threads, and
+# anything the builds set on the workflow would be lost with the processes.
+SETUP_EXECUTORS = {"thread": ThreadPoolExecutor}
+
 
 class WorkflowSettings:
     def __init__(
@@ -27,11 +37,37 @@ class WorkflowSettings:
         parallel_jobs: int,
         machine: str,
         scheduler: SchedulerDriver,
+        setup_workers: int = 1,
+        setup_executor: str = "thread",
+        template_link_method: str = "reflink",
     ):
+        """
+        setup_workers sets how many working directories are built concurrently during
+        setup, using a pool of the kind named by setup_executor (only "thread").
+
+        template_link_method sets how template files that aren't rewritten for a param
+        set are materialised in working directories, see materialise_template.
+        """
+
+        if setup_executor not in SETUP_EXECUTORS:
+            raise ValueError(
+                f"Setup executor must be one of {list(SETUP_EXECUTORS.keys())}, not "
+                f"{setup_executor}."
+            )
+
+        if template_link_method not in LINK_METHODS:
+            raise ValueError(
+                f"Template link method must be one of {LINK_METHODS}, not "
+                f"{template_link_method}."
+            )
+
         self.base_dir = base_dir
         self.parallel_jobs = parallel_jobs
         self.machine = machine
         self.scheduler = scheduler
+        self.setup_workers = setup_workers
+        self.setup_executor = setup_executor
+        self.template_link_method = template_link_method
 
 
 class Workflow(ABC):
@@ -62,24 +98,53 @@ class Workflow(ABC):
 
         self.run_id = run_id
 
-    def setup(self, param_pack: Union[ParameterPack, List[dict]]):
+    def setup(
+        self,
+        param_pack: Union[ParameterPack, List[dict]],
+        template_cache: Optional[TemplateCache] = None,
+    ):
+        """
+        Sets up the working directory of each param set in the param pack. Input files
+        are rendered from templates held in the given template cache, or else one made
+        for this setup, so that each template is only read and parsed once.
+        """
+
         if self.resume:
             print("setup(param_pack) should only be called if not resuming.")
             return
 
+        self._template_cache = (
+            template_cache if template_cache is not None else TemplateCache()
+        )
+
+        # Parse templates up front, so that they are parsed once and shared by all param
+        # sets rather than raced for by the threads building working directories.
+        for template_filepath in self._template_filepaths():
+            if isfile(template_filepath):
+                self._template_cache.get(template_filepath)
+
         self._build_root_working_directory()
 
         self._write_job_scripts()
 
         self._param_sets: Dict[str, dict] = {}
 
+        # Registration happens in order, so that the register (and so job indices) is
+        # deterministic however the working directories end up being built.
         for param_set in param_pack:
             name = self._register_param_set(param_set)
 
             if name not in self._param_sets:
                 self._param_sets[name] = param_set
 
-                self._build_working_directory(name, param_set)
+        self._prepare_working_directories()
+
+        # Param sets whose working directories could not be built are reported and
+        # dropped, rather than failing the whole setup.
+        self._setup_failures = self._build_working_directories()
+
+        for name in self._setup_failures.keys():
+            del self._param_sets[name]
 
         self._job_instances = len(self._param_sets)
 
@@ -97,7 +162,16 @@ class Workflow(ABC):
                 "Param set register file not found at:\n  " + self._param_set_register()
             )
 
-        self._param_sets = read_named_parameter_sets(self._param_set_register())
+        # Registers written before job scripts looked up param sets by offset won't
+        # have an index, so make sure one exists for the resumed jobs. Built before the
+        # register is read, as the param sets are then looked up through it.
+        if not has_register_index(self._param_set_register()):
+            write_register_index(self._param_set_register())
+
+        # Read in full, as the workflow holds on to its param sets, so that the register
+        # isn't left open.
+        with read_named_parameter_sets(self._param_set_register()) as param_sets:
+            self._param_sets = dict(param_sets.items())
 
         self._job_instances = len(self._param_sets)
 
@@ -125,6 +199,44 @@ class Workflow(ABC):
     def _build_root_working_directory(self) -> None:
         makedirs(self._root_dir(), exist_ok=True)
 
+    def _build_working_directories(self) -> Dict[str, BaseException]:
+        """
+        Builds the working directory of every registered param set, concurrently if so
+        configured, returning the exception raised for each param set that failed.
+        """
+
+        failures: Dict[str, BaseException] = {}
+
+        if self.settings.setup_workers <= 1:
+            for name, param_set in self._param_sets.items():
+                try:
+                    self._build_working_directory(name, param_set)
+                except Exception as e:
+                    failures[name] = e
+        else:
+            executor = SETUP_EXECUTORS[self.settings.setup_executor]
+
+            with executor(max_workers=self.settings.setup_workers) as pool:
+                futures = {
+                    name: pool.submit(self._build_working_directory, name, param_set)
+                    for name, param_set in self._param_sets.items()
+                }
+
+                for name, future in futures.items():
+                    if future.exception() is not None:
+                        failures[name] = future.exception()
+
+        for name, e in failures.items():
+            logging.error(
+                (
+                    f"Failed to build working directory for param set {name}:\n"
+                    f"    {e!r}\n"
+                    f"Param set was:\n    {self._param_sets[name]}"
+                )
+            )
+
+        return failures
+
     def _param_namespace(self, namespace: str, param_set: dict) -> dict:
         subset = {}
 
@@ -143,9 +255,24 @@ class Workflow(ABC):
     def _register_param_set(self, param_set: dict) -> str:
         pass
 
+    def _prepare_working_directories(self) -> None:
+        """
+        Called once all param sets are registered and before any working directories
+        are built, e.g. to prepare anything shared between working directories.
+        """
+
+        pass
+
     def _complete_setup(self) -> None:
         pass
 
+    def _template_filepaths(self) -> List[str]:
+        """
+        Paths of the templates from which input files are rendered for each param set.
+        """
+
+        return []
+
     @abstractmethod
     def _write_job_scripts(self) -> None:
         pass